@@ -0,0 +1,323 @@
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import tracemalloc
+import contextlib
+
+from hx_util import __version__
+from hx_util import Make_Course_Sheet
+from hx_util import json2srt
+from hx_util import SrtRename
+from hx_util import GetWordLinks
+from hx_util import GetExcelLinks
+from hx_util import GetPPTLinks
+from hx_util import GetPDFLinks
+from hx_util import MakeTestCourse
+
+instructions = """
+To use:
+python3 Benchmark.py (options)
+
+Makes test courses with MakeTestCourse and times the scripts on them:
+Make_Course_Sheet in each mode (and all four sheets at once, like HXLiveTools),
+with and without -stream on a course that's all inline in one file,
+json2srt, SrtRename, and each Get*Links script.
+Each case runs a few times and keeps the fastest and median times,
+then runs once more to measure its peak memory use.
+
+Results go in a json file, so you can compare runs from different versions.
+With -compare, prints how each case changed since an older results file,
+and exits with an error if anything got slower than the -threshold.
+
+Valid options:
+  -h Help. Print this message.
+  -size S        small, medium, or large test course. Default is medium.
+  -repeat N      How many timed runs for each case. Default is 3.
+  -cases A,B     Only run these cases (comma-separated). Default is all of them.
+  -args "X"      Extra options for Make_Course_Sheet, like "-jobs 4".
+  -tar           Also time Make_Course_Sheet on a .tar.gz of the course.
+  -o FILE        Where to save results. Default is benchmark_results.json.
+  -compare FILE  Compare with an older results file.
+  -threshold X   How much slower counts as a regression. Default is 1.25 (25% slower).
+  -keep          Keep the test courses instead of deleting them.
+
+Last update: October 17th 2026
+"""
+
+# Arguments for MakeTestCourse.makeTestCourse for each size.
+course_sizes = {
+    "small": {
+        "chapters": 2,
+        "sequentials": 2,
+        "verticals": 2,
+        "components": 3,
+        "documents": 1,
+    },
+    "medium": {
+        "chapters": 6,
+        "sequentials": 4,
+        "verticals": 4,
+        "components": 5,
+        "documents": 2,
+    },
+    "large": {
+        "chapters": 16,
+        "sequentials": 6,
+        "verticals": 5,
+        "components": 6,
+        "documents": 4,
+    },
+}
+
+# Make_Course_Sheet modes we time.
+sheet_modes = {
+    "sheet video": [],
+    "sheet problems": ["-problems"],
+    "sheet html": ["-html"],
+    "sheet links": ["-links"],
+    "sheet alttext": ["-alttext"],
+    "sheet all": ["-all"],
+}
+
+# Get*Links scripts, by the file extension they read.
+link_scripts = {
+    "docx": GetWordLinks.getWordLinks,
+    "xlsx": GetExcelLinks.getExcelLinks,
+    "pptx": GetPPTLinks.getPPTLinks,
+    "pdf": GetPDFLinks.getPDFLinks,
+}
+
+
+def makeLiveToolsSheets(course_folder: str, sheet_args: list) -> None:
+    """Makes the same four sheets HXLiveTools does, from one read of the course."""
+    Make_Course_Sheet.Make_Course_Sheets(
+        [course_folder] + sheet_args,
+        [
+            ["-o", "Course_Video_Sheet.tsv"],
+            ["-links", "-o", "Course_Link_Sheet.tsv"],
+            ["-alttext", "-o", "Course_Image_Sheet.tsv"],
+            ["-all", "-o", "Course_Full_Sheet.tsv"],
+        ],
+    )
+
+
+def getCases(course_folder: str, inline_folder: str, args: argparse.Namespace) -> dict:
+    """
+    Makes a function for each thing we time.
+
+    Args:
+        course_folder (str): The test course.
+        inline_folder (str): The same size of test course, all inline in one file.
+        args (argparse.Namespace): The command line arguments passed to the script.
+
+    Returns:
+        dict: Functions that take no arguments, by case name.
+    """
+    cases = {}
+    sheet_args = args.args.split()
+
+    for name, mode in sheet_modes.items():
+        cases[name] = lambda mode=mode: Make_Course_Sheet.Make_Course_Sheet(
+            [course_folder] + mode + sheet_args
+        )
+    for mode in [[], ["-stream"]]:
+        name = " ".join(["inline sheet all"] + mode)
+        cases[name] = lambda mode=mode: Make_Course_Sheet.Make_Course_Sheet(
+            [inline_folder, "-all"] + mode + sheet_args
+        )
+    cases["sheets live tools"] = lambda: makeLiveToolsSheets(course_folder, sheet_args)
+    if args.tar:
+        tar_path = course_folder + ".tar.gz"
+        cases["sheet links tar.gz"] = lambda: Make_Course_Sheet.Make_Course_Sheet(
+            [tar_path, "-links"] + sheet_args
+        )
+
+    cases["json2srt"] = lambda: json2srt.json2srt([course_folder, "-r"])
+    # After the first run, everything is up to date.
+    cases["json2srt -u"] = lambda: json2srt.json2srt([course_folder, "-r", "-u"])
+    # Copies, so we can run it again. Needs the video sheet from makeLiveToolsSheets.
+    cases["SrtRename"] = lambda: SrtRename.SrtRename(
+        [course_folder, "-c", "-n", "-z", "-i", "Course_Video_Sheet.tsv"]
+    )
+
+    static_folder = os.path.join(course_folder, "static")
+    for extension, script in link_scripts.items():
+        cases["Get links " + extension] = lambda extension=extension, script=script: [
+            script([os.path.join(static_folder, f), "-l"])
+            for f in sorted(os.listdir(static_folder))
+            if f.endswith("." + extension)
+        ]
+
+    return cases
+
+
+def quietly(function) -> float:
+    """Runs a function without printing anything, and returns how many seconds it took."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        started = time.perf_counter()
+        function()
+        return time.perf_counter() - started
+
+
+def runCase(function, repeat: int) -> dict:
+    """
+    Times a function a few times, then runs it once more to measure memory.
+
+    Returns:
+        dict: The fastest, median, and all times in seconds, and the peak memory in bytes.
+    """
+    times = sorted(quietly(function) for x in range(repeat))
+
+    # tracemalloc slows things down, so this run isn't timed.
+    tracemalloc.start()
+    try:
+        quietly(function)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "min_seconds": times[0],
+        "median_seconds": times[len(times) // 2],
+        "runs": times,
+        "peak_memory_bytes": peak,
+    }
+
+
+def compareResults(old: dict, new: dict, threshold: float) -> list[str]:
+    """
+    Prints how each case changed between two results files.
+
+    Args:
+        old (dict): The older results.
+        new (dict): The newer results.
+        threshold (float): How many times slower counts as a regression.
+
+    Returns:
+        list: The names of cases that got slower than the threshold.
+    """
+    slower = []
+    print("")
+    print(
+        "Compared with version "
+        + str(old.get("version"))
+        + " ("
+        + str(old.get("size"))
+        + "):"
+    )
+    print(
+        "    %-24s %10s %10s %8s %10s" % ("case", "old s", "new s", "ratio", "memory")
+    )
+    for name, result in new["cases"].items():
+        if name not in old["cases"]:
+            print("    %-24s %10s %10.3f" % (name, "-", result["min_seconds"]))
+            continue
+        before = old["cases"][name]
+        ratio = result["min_seconds"] / max(before["min_seconds"], 1e-9)
+        memory = result["peak_memory_bytes"] / max(before["peak_memory_bytes"], 1)
+        note = ""
+        if ratio > threshold:
+            note = "  SLOWER"
+            slower.append(name)
+        print(
+            "    %-24s %10.3f %10.3f %7.2fx %9.2fx%s"
+            % (name, before["min_seconds"], result["min_seconds"], ratio, memory, note)
+        )
+    return slower
+
+
+# Main function.
+def Benchmark(arguments) -> None:
+
+    parser = argparse.ArgumentParser(usage=instructions, add_help=False)
+    parser.add_argument("--help", "-h", action="store_true")
+    parser.add_argument("-size", choices=list(course_sizes), default="medium")
+    parser.add_argument("-repeat", type=int, default=3)
+    parser.add_argument("-cases", default="")
+    parser.add_argument("-args", default="")
+    parser.add_argument("-tar", action="store_true")
+    parser.add_argument("-o", default="benchmark_results.json")
+    parser.add_argument("-compare", default=None)
+    parser.add_argument("-threshold", type=float, default=1.25)
+    parser.add_argument("-keep", action="store_true")
+
+    args = parser.parse_args(arguments)
+
+    if args.help:
+        sys.exit(instructions)
+
+    work_folder = tempfile.mkdtemp(prefix="hx_util_benchmark_")
+    course_folder = os.path.join(work_folder, "course")
+    print("Making " + args.size + " test course in " + course_folder)
+    course_info = MakeTestCourse.makeTestCourse(
+        course_folder, **course_sizes[args.size]
+    )
+    if args.tar:
+        MakeTestCourse.makeTarball(course_folder)
+    inline_folder = os.path.join(work_folder, "inline_course")
+    MakeTestCourse.makeTestCourse(inline_folder, inline=True, **course_sizes[args.size])
+
+    cases = getCases(course_folder, inline_folder, args)
+    if args.cases:
+        wanted = [x.strip() for x in args.cases.split(",")]
+        unknown = [x for x in wanted if x not in cases]
+        if unknown:
+            sys.exit(
+                "Unknown cases: " + ", ".join(unknown) + "\nCases: " + ", ".join(cases)
+            )
+        cases = {name: cases[name] for name in wanted}
+
+    results = {
+        "version": __version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "size": args.size,
+        "course": course_info,
+        "sheet_args": args.args,
+        "repeat": args.repeat,
+        "cases": {},
+    }
+
+    try:
+        # SrtRename needs the video sheet, so make it first.
+        if "SrtRename" in cases:
+            quietly(lambda: makeLiveToolsSheets(course_folder, args.args.split()))
+        for name, function in cases.items():
+            result = runCase(function, args.repeat)
+            results["cases"][name] = result
+            print(
+                "%-24s %9.3f s  (median %.3f s)  peak %.1f MB"
+                % (
+                    name,
+                    result["min_seconds"],
+                    result["median_seconds"],
+                    result["peak_memory_bytes"] / 1e6,
+                )
+            )
+    finally:
+        if args.keep:
+            print("Kept test course in " + work_folder)
+        else:
+            shutil.rmtree(work_folder)
+
+    with open(args.o, "w", encoding="utf8") as outfile:
+        json.dump(results, outfile, indent=4)
+    print("Results saved to " + args.o)
+
+    if args.compare:
+        with open(args.compare, encoding="utf8") as infile:
+            old = json.load(infile)
+        slower = compareResults(old, results, args.threshold)
+        if slower:
+            sys.exit("Slower than " + args.compare + ": " + ", ".join(slower))
+
+
+if __name__ == "__main__":
+    # this won't be run when imported
+    Benchmark(sys.argv[1:])
@@ -0,0 +1,279 @@
+import sqlite3
+import datetime
+import urllib.parse
+
+from hx_util.CourseModel import CourseNode
+
+######################################
+# SQLite output for Make_Course_Sheet (-sqlite)
+#
+# Saves the course structure in normalized tables, so big courses
+# (or lots of courses in one database) can be searched with SQL
+# instead of re-running Make_Course_Sheet:
+#
+#   courses      One row per course, by course_id (org+nickname+run).
+#   nodes        Every chapter, sequential, vertical, component, and file,
+#                with the id of its parent node and its position in the parent.
+#   videos       Duration, YouTube ID, edX video ID, and upload name for each video.
+#   transcripts  The transcript files for each video.
+#   links        Every link, with its domain split out.
+#   images       Every image, with its alt text.
+#
+# Each course gets written in a single transaction. Writing a course
+# that's already in the database replaces it.
+#
+# For example, every vertical that links to example.com:
+#
+#   SELECT DISTINCT vertical.name, vertical.url
+#   FROM links
+#   JOIN nodes AS component ON links.node = component.id
+#   JOIN nodes AS vertical ON component.parent = vertical.id
+#   WHERE links.domain = 'example.com' AND vertical.type = 'vertical';
+######################################
+
+schema_version = 1
+
+schema = """
+CREATE TABLE IF NOT EXISTS courses (
+    id INTEGER PRIMARY KEY,
+    course_id TEXT NOT NULL UNIQUE,
+    org TEXT,
+    nickname TEXT,
+    run TEXT,
+    name TEXT,
+    source TEXT,
+    updated TEXT
+);
+CREATE TABLE IF NOT EXISTS nodes (
+    id INTEGER PRIMARY KEY,
+    course INTEGER NOT NULL REFERENCES courses(id) ON DELETE CASCADE,
+    parent INTEGER REFERENCES nodes(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    type TEXT NOT NULL,
+    name TEXT,
+    url_name TEXT,
+    filename TEXT,
+    url TEXT,
+    inner_xml TEXT
+);
+CREATE TABLE IF NOT EXISTS videos (
+    node INTEGER PRIMARY KEY REFERENCES nodes(id) ON DELETE CASCADE,
+    duration TEXT,
+    youtube TEXT,
+    edx_video_id TEXT,
+    upload_name TEXT,
+    download_url TEXT
+);
+CREATE TABLE IF NOT EXISTS transcripts (
+    node INTEGER NOT NULL REFERENCES nodes(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    filename TEXT
+);
+CREATE TABLE IF NOT EXISTS links (
+    node INTEGER NOT NULL REFERENCES nodes(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    href TEXT,
+    text TEXT,
+    domain TEXT
+);
+CREATE TABLE IF NOT EXISTS images (
+    node INTEGER NOT NULL REFERENCES nodes(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    src TEXT,
+    alt TEXT
+);
+CREATE INDEX IF NOT EXISTS nodes_course ON nodes(course);
+CREATE INDEX IF NOT EXISTS nodes_parent ON nodes(parent);
+CREATE INDEX IF NOT EXISTS nodes_type ON nodes(type);
+CREATE INDEX IF NOT EXISTS nodes_url_name ON nodes(url_name);
+CREATE INDEX IF NOT EXISTS videos_edx_video_id ON videos(edx_video_id);
+CREATE INDEX IF NOT EXISTS transcripts_node ON transcripts(node);
+CREATE INDEX IF NOT EXISTS links_node ON links(node);
+CREATE INDEX IF NOT EXISTS links_href ON links(href);
+CREATE INDEX IF NOT EXISTS links_domain ON links(domain);
+CREATE INDEX IF NOT EXISTS images_node ON images(node);
+"""
+
+# Node fields that go in the videos table.
+video_columns = ["duration", "youtube", "edx_video_id", "upload_name", "download_url"]
+
+
+def linkDomain(href: str):
+    """Gets the domain from a link, like "www.example.com", or None for relative links."""
+    try:
+        return urllib.parse.urlsplit(href).hostname
+    except ValueError:
+        return None
+
+
+class CourseDatabase:
+    """
+    A SQLite database of course structures.
+
+    Args:
+        path (str): The database file. Made if it doesn't exist.
+        url_maker (function): Makes the url column, with the same arguments as Make_Course_Sheet.makeURL.
+    """
+
+    def __init__(self, path: str, url_maker):
+        self.path = path
+        self.url_maker = url_maker
+        self.course = None
+        # Several processes can write to one database. Wait for each other's transactions.
+        self.connection = sqlite3.connect(path, timeout=300, isolation_level=None)
+        self.connection.execute("PRAGMA foreign_keys = ON")
+        version = self.connection.execute("PRAGMA user_version").fetchone()[0]
+        if version not in (0, schema_version):
+            raise ValueError(
+                path + " was made by a different version of Make_Course_Sheet."
+            )
+        self.connection.executescript(schema)
+        self.connection.execute("PRAGMA user_version = %d" % schema_version)
+
+    def startCourse(self, course_dict: dict, source: str = "") -> None:
+        """
+        Starts the transaction for one course and replaces anything already saved for it.
+        Add the course's contents with addNodes, then call finishCourse.
+
+        Args:
+            course_dict (dict): The course. Only needs the name, url, nickname, and org.
+            source (str): The course folder or tarball we read.
+        """
+        self.org = course_dict["org"]
+        self.nickname = course_dict["nickname"]
+        self.run = course_dict["url"]
+        self.course_url = course_dict["url"]
+        course_id = self.org + "+" + self.nickname + "+" + self.run
+
+        self.connection.execute("BEGIN IMMEDIATE")
+        self.connection.execute("DELETE FROM courses WHERE course_id = ?", (course_id,))
+        cursor = self.connection.execute(
+            "INSERT INTO courses (course_id, org, nickname, run, name, source, updated) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                course_id,
+                self.org,
+                self.nickname,
+                self.run,
+                course_dict["name"],
+                source,
+                datetime.datetime.now().isoformat(timespec="seconds"),
+            ),
+        )
+        self.course = cursor.lastrowid
+        self.next_id = (
+            self.connection.execute(
+                "SELECT COALESCE(MAX(id), 0) FROM nodes"
+            ).fetchone()[0]
+            + 1
+        )
+        # Top-level items are numbered in the order they're added.
+        self.top_position = 0
+
+    def addNodes(self, nodes: list[CourseNode]) -> None:
+        """Saves some of the top-level items in the course, and everything inside them."""
+        tables = {
+            "nodes": [],
+            "videos": [],
+            "transcripts": [],
+            "links": [],
+            "images": [],
+        }
+        for node in nodes:
+            self.collectNode(node, None, self.top_position, self.course_url, tables)
+            self.top_position += 1
+
+        self.connection.executemany(
+            "INSERT INTO nodes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", tables["nodes"]
+        )
+        self.connection.executemany(
+            "INSERT INTO videos VALUES (?, ?, ?, ?, ?, ?)", tables["videos"]
+        )
+        self.connection.executemany(
+            "INSERT INTO transcripts VALUES (?, ?, ?)", tables["transcripts"]
+        )
+        self.connection.executemany(
+            "INSERT INTO links VALUES (?, ?, ?, ?, ?)", tables["links"]
+        )
+        self.connection.executemany(
+            "INSERT INTO images VALUES (?, ?, ?, ?)", tables["images"]
+        )
+
+    def collectNode(
+        self, node: CourseNode, parent, position: int, parent_url: str, tables: dict
+    ) -> None:
+        """Recursion function for addNodes. Adds rows for a node and its contents to tables."""
+        node_id = self.next_id
+        self.next_id += 1
+        extra = node.extra if node.extra is not None else {}
+        url = self.url_maker(
+            node.type,
+            node.filename if node.filename is not None else node.url,
+            parent_url,
+            self.org,
+            self.nickname,
+            self.run,
+        )
+        tables["nodes"].append(
+            (
+                node_id,
+                self.course,
+                parent,
+                position,
+                node.type,
+                node.name,
+                node.url,
+                node.filename,
+                url,
+                extra.get("inner_xml"),
+            )
+        )
+
+        if node.type == "video" and "upload_name" in extra:
+            tables["videos"].append(
+                tuple([node_id] + [extra.get(key) for key in video_columns])
+            )
+        for i, sub in enumerate(node.sub or []):
+            tables["transcripts"].append((node_id, i, sub))
+        for i, link in enumerate(node.links or []):
+            tables["links"].append(
+                (node_id, i, link["href"], link["text"], linkDomain(link["href"]))
+            )
+        for i, image in enumerate(node.images or []):
+            tables["images"].append((node_id, i, image["src"], image["alt"]))
+
+        for i, child in enumerate(node.contents or []):
+            self.collectNode(child, node_id, i, url, tables)
+
+    def finishCourse(self) -> None:
+        """Commits the course's transaction."""
+        self.connection.execute("COMMIT")
+        self.course = None
+
+    def close(self) -> None:
+        """Closes the database, throwing away any course that wasn't finished."""
+        if self.course is not None:
+            self.connection.execute("ROLLBACK")
+            self.course = None
+        self.connection.close()
+
+
+def writeCourseDatabase(
+    path: str, course_dict: dict, url_maker, source: str = ""
+) -> None:
+    """
+    Saves a whole course in a SQLite database, replacing it if it's already there.
+
+    Args:
+        path (str): The database file. Made if it doesn't exist.
+        course_dict (dict): The course structure from Make_Course_Sheet, with the auxiliary folders.
+        url_maker (function): Makes the url column, like Make_Course_Sheet.makeURL.
+        source (str): The course folder or tarball we read.
+    """
+    database = CourseDatabase(path, url_maker)
+    try:
+        database.startCourse(course_dict, source)
+        database.addNodes(course_dict["contents"])
+        database.finishCourse()
+    finally:
+        database.close()
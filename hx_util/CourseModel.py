@@ -0,0 +1,410 @@
+import sys
+import itertools
+from typing import Union, Iterator
+
+######################################
+# Compact types for the course structure that Make_Course_Sheet builds.
+#
+# CourseNode is one item in the course: a chapter, a vertical, a component,
+# a file in the static folder, etc.
+# CourseRow is one row of a course spreadsheet.
+#
+# Both use __slots__ instead of dicts, since big courses have a lot of them.
+# Empty lists are all the same shared, read-only object.
+#
+# CourseModel is a whole course, for other Python code to search.
+# Make_Course_Sheet.loadCourse reads one from a course folder or tarball.
+######################################
+
+
+class EmptyList(tuple):
+    """A shared, read-only empty list. Prints and saves to json as []."""
+
+    __slots__ = ()
+
+    def __repr__(self):
+        return "[]"
+
+    def __reduce__(self):
+        # Stay a single shared object when sent between processes.
+        return "no_items"
+
+
+no_items = EmptyList()
+
+
+def itemList(items) -> list:
+    """Returns the shared empty list for empty lists, and the list itself otherwise."""
+    return items if len(items) > 0 else no_items
+
+
+# Every column that can show up in a course spreadsheet.
+row_columns = [
+    "chapter",
+    "sequential",
+    "vertical",
+    "component",
+    "type",
+    "url",
+    "filename",
+    "inner_xml",
+    "href",
+    "linktext",
+    "src",
+    "alt",
+    "duration",
+    "sub",
+    "youtube",
+    "edx_video_id",
+    "upload_name",
+    "download_url",
+]
+
+
+class CourseNode:
+    """
+    One item in the course structure.
+    Fields set to None are left out of to_dict(), which gives the same
+    dictionary Make_Course_Sheet used to build, for course.json.
+
+    Args:
+        type (str): The tag or file extension, like "chapter", "html", or "pdf".
+        name (str): The display name.
+        url (str): The url_name, or the filename for files in auxiliary folders. Can be None.
+        index (int): Position within the parent. Only for nodes from the course outline.
+        filename (str): The file this came from, if any.
+        contents (list): Child nodes. None for components and files.
+        links (list): Dictionaries with "href" and "text".
+        images (list): Dictionaries with "src" and "alt".
+        sub (list): Transcript filenames.
+        extra (dict): Anything else, like youtube IDs or problem XML.
+    """
+
+    __slots__ = (
+        "index",
+        "type",
+        "name",
+        "url",
+        "filename",
+        "contents",
+        "links",
+        "images",
+        "sub",
+        "extra",
+    )
+
+    def __init__(
+        self,
+        type: str,
+        name: str = "",
+        url=None,
+        index=None,
+        filename=None,
+        contents=None,
+        links=None,
+        images=None,
+        sub=None,
+        extra=None,
+    ):
+        self.index = index
+        self.type = sys.intern(type)
+        self.name = name
+        self.url = url
+        self.filename = filename
+        self.contents = contents
+        self.links = links
+        self.images = images
+        self.sub = sub
+        self.extra = extra
+
+    def update(self, info: dict) -> None:
+        """Adds information from a dictionary, like the ones from getComponentInfo."""
+        for key, value in info.items():
+            if key in ("links", "images", "sub"):
+                setattr(self, key, itemList(value))
+            elif key in ("type", "name", "url", "filename", "index"):
+                setattr(self, key, value)
+            else:
+                if self.extra is None:
+                    self.extra = {}
+                self.extra[sys.intern(key)] = value
+
+    def items(self):
+        """
+        Yields (key, value) pairs in the same order as to_dict(), without contents.
+        Nodes from the course outline (the ones with an index) also get
+        a key named after their type, like "chapter": "Week 1".
+        """
+        if self.index is not None:
+            yield "index", self.index
+        yield "type", self.type
+        yield "name", self.name
+        yield "url", self.url
+        if self.filename is not None:
+            yield "filename", self.filename
+        if self.links is not None:
+            yield "links", self.links
+        if self.images is not None:
+            yield "images", self.images
+        if self.sub is not None:
+            yield "sub", self.sub
+        if self.extra is not None:
+            yield from self.extra.items()
+        if self.index is not None:
+            yield self.type, self.name
+
+    def to_dict(self, recursive: bool = True) -> dict:
+        """
+        Returns this node as a dictionary, in the format course.json has always used.
+
+        Args:
+            recursive (bool): Whether to turn the contents into dictionaries too, or leave them as nodes.
+        """
+        node_dict = {}
+        for key, value in self.items():
+            node_dict[key] = value
+            if key == "filename" or (key == "url" and self.filename is None):
+                # Contents go right after the filename, or the url if there's no filename.
+                if self.contents is not None:
+                    node_dict["contents"] = (
+                        [x.to_dict() for x in self.contents]
+                        if recursive
+                        else self.contents
+                    )
+        return node_dict
+
+    def copy(self) -> "CourseNode":
+        """Returns a shallow copy."""
+        node = CourseNode.__new__(CourseNode)
+        for key in CourseNode.__slots__:
+            setattr(node, key, getattr(self, key))
+        if self.extra is not None:
+            node.extra = self.extra.copy()
+        return node
+
+
+def nodeToJSON(node: CourseNode) -> dict:
+    """For json.dump(default=...), so course.json can hold CourseNodes."""
+    return node.to_dict(recursive=False)
+
+
+class CourseRow:
+    """
+    One row of a course spreadsheet. Works with csv.DictWriter.
+    Unset columns are blank.
+    """
+
+    __slots__ = tuple(row_columns)
+
+    def __init__(self):
+        for key in row_columns:
+            setattr(self, key, "")
+
+    def get(self, key: str, default=None):
+        return getattr(self, key, default)
+
+    def copy(self) -> "CourseRow":
+        row = CourseRow.__new__(CourseRow)
+        for key in row_columns:
+            setattr(row, key, getattr(self, key))
+        return row
+
+
+def mergeAuxFolders(aux_links: list, aux_images: list) -> list[CourseNode]:
+    """
+    Puts the link and image trees for the auxiliary folders together,
+    with one node for each folder and each file. Doesn't change the nodes passed in.
+
+    Args:
+        aux_links (list): Folder nodes for links in the auxiliary folders.
+        aux_images (list): Folder nodes for images in the auxiliary folders.
+
+    Returns:
+        list: The merged folder nodes.
+    """
+    folders = {}
+    files = {}
+    for folder in itertools.chain(aux_links, aux_images):
+        if folder.name not in folders:
+            folders[folder.name] = CourseNode(
+                folder.type,
+                name=folder.name,
+                url=folder.url,
+                contents=[],
+                extra=folder.extra,
+            )
+        for f in folder.contents:
+            node = files.get(f.filename)
+            if node is None:
+                node = CourseNode(
+                    f.type,
+                    name=f.name,
+                    url=f.url,
+                    filename=f.filename,
+                    links=f.links,
+                    images=f.images,
+                    sub=f.sub,
+                    extra=f.extra,
+                )
+                files[f.filename] = node
+                folders[folder.name].contents.append(node)
+            else:
+                node.links = node.links or f.links
+                node.images = node.images or f.images
+    return list(folders.values())
+
+
+class CourseModel:
+    """
+    A course that's been read, with lookups by url_name, type, parent, and edx_video_id.
+    The indexes are built the first time you look something up, so code that
+    only writes sheets doesn't pay for them.
+
+    Args:
+        course_dict (dict): The course structure from Make_Course_Sheet, without the auxiliary folders.
+        aux_links (list): Folder nodes for links in the auxiliary folders (tabs, info, static).
+        aux_images (list): Folder nodes for images in the auxiliary folders.
+        source (str): The course folder or tarball we read.
+        root_file (str): The course.xml file.
+        extractors (tuple): Which details we read from components,
+            by name from Make_Course_Sheet.component_extractors, like "video" or "problem_xml".
+        read_links (bool): Whether we read links.
+        read_alttext (bool): Whether we read images and alt text.
+    """
+
+    def __init__(
+        self,
+        course_dict: dict,
+        aux_links: list = no_items,
+        aux_images: list = no_items,
+        source: str = "",
+        root_file: str = "course.xml",
+        extractors: tuple = (),
+        read_links: bool = True,
+        read_alttext: bool = True,
+    ):
+        self.course_dict = course_dict
+        self.aux_links = aux_links
+        self.aux_images = aux_images
+        self.source = source
+        self.root_file = root_file
+        self.extractors = extractors
+        self.read_links = read_links
+        self.read_alttext = read_alttext
+        self.aux_folders = None
+        self.by_url_name = None
+        self.by_type = None
+        self.by_video_id = None
+        self.parents = None
+
+    @property
+    def name(self) -> str:
+        return self.course_dict["name"]
+
+    @property
+    def course_id(self) -> str:
+        """The org, course number, and run, like "HarvardX+HX0+2026_Fall"."""
+        return (
+            self.course_dict["org"]
+            + "+"
+            + self.course_dict["nickname"]
+            + "+"
+            + self.course_dict["url"]
+        )
+
+    def walk(self) -> Iterator[tuple]:
+        """
+        Yields (node, parent) for everything in the course, in courseware order,
+        then the auxiliary folders and their files. Top-level nodes have no parent.
+        """
+        # Stack of iterators over (node, parent) pairs
+        top_level = itertools.chain(self.course_dict["contents"], self.auxFolders())
+        stack = [zip(top_level, itertools.repeat(None))]
+        while stack:
+            entry = next(stack[-1], None)
+            if entry is None:
+                stack.pop()
+                continue
+            yield entry
+            node = entry[0]
+            if node.contents:
+                stack.append(zip(node.contents, itertools.repeat(node)))
+
+    def auxFolders(self) -> list[CourseNode]:
+        """
+        Gets the auxiliary folders, with one node for each file in them.
+        Files with both links and images are in aux_links and aux_images,
+        so this puts each file's links and images together with mergeAuxFolders.
+        """
+        if self.aux_folders is None:
+            self.aux_folders = mergeAuxFolders(self.aux_links, self.aux_images)
+        return self.aux_folders
+
+    def buildIndexes(self) -> None:
+        """Builds the lookup tables. Called automatically by the lookup functions."""
+        self.by_url_name = {}
+        self.by_type = {}
+        self.by_video_id = {}
+        self.parents = {}
+        for node, parent in self.walk():
+            if node.url is not None:
+                self.by_url_name.setdefault(node.url, []).append(node)
+            self.by_type.setdefault(node.type, []).append(node)
+            # Things that are used in more than one place keep their first parent.
+            self.parents.setdefault(id(node), parent)
+            if node.type == "video" and node.extra is not None:
+                video_id = node.extra.get("edx_video_id")
+                if video_id:
+                    self.by_video_id.setdefault(video_id, []).append(node)
+
+    def get(self, url_name: str) -> Union[CourseNode, None]:
+        """Gets the node with this url_name (or filename, for files), or None."""
+        nodes = self.getAll(url_name)
+        return nodes[0] if nodes else None
+
+    def getAll(self, url_name: str) -> list[CourseNode]:
+        """Gets every node with this url_name, for things that are used in more than one place."""
+        if self.by_url_name is None:
+            self.buildIndexes()
+        return self.by_url_name.get(url_name, no_items)
+
+    def ofType(self, type: str) -> list[CourseNode]:
+        """Gets every node of a type, like "problem" or "vertical", in courseware order."""
+        if self.by_type is None:
+            self.buildIndexes()
+        return self.by_type.get(type, no_items)
+
+    def parentOf(self, node: CourseNode) -> Union[CourseNode, None]:
+        """Gets the node that contains this one, or None for chapters and auxiliary folders."""
+        if self.parents is None:
+            self.buildIndexes()
+        return self.parents.get(id(node))
+
+    def childrenOf(self, url_name: str) -> list[CourseNode]:
+        """Gets the contents of the node with this url_name."""
+        node = self.get(url_name)
+        if node is None or node.contents is None:
+            return no_items
+        return node.contents
+
+    def videosById(self, edx_video_id: str) -> list[CourseNode]:
+        """Gets every video component that uses this edX video ID."""
+        if self.by_video_id is None:
+            self.buildIndexes()
+        return self.by_video_id.get(edx_video_id, no_items)
+
+    def videos(self) -> Iterator[CourseNode]:
+        """Yields every video component, in courseware order."""
+        yield from self.ofType("video")
+
+    def links(self) -> Iterator[tuple]:
+        """Yields (node, link) for every link, where link has "href" and "text"."""
+        for node, parent in self.walk():
+            for link in node.links or no_items:
+                yield node, link
+
+    def images(self) -> Iterator[tuple]:
+        """Yields (node, image) for every image, where image has "src" and "alt"."""
+        for node, parent in self.walk():
+            for image in node.images or no_items:
+                yield node, image
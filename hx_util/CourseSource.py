@@ -0,0 +1,226 @@
+import io
+import os
+import tarfile
+import tempfile
+from lxml import etree
+
+######################################
+# Where Make_Course_Sheet reads a course from.
+#
+# CourseFolder reads an exported course folder from disk.
+# CourseArchive reads an export .tar.gz without extracting it.
+# It goes through the tarball once, keeping the XML, HTML and json
+# in memory. Word, Excel, PowerPoint and PDF files can be kept
+# in a temporary folder, since the tools that read them need a file.
+#
+# Both take the same paths, so the rest of the code doesn't need to know
+# which one it has. Paths inside an archive start with the archive's path,
+# like exports/course.tar.gz/course/chapter/week1.xml
+######################################
+
+# Files we read while making a course sheet.
+text_types = [".xml", ".html", ".htm", ".json"]
+# Files that the Get*Links scripts read.
+document_types = [".docx", ".xlsx", ".pptx", ".pdf"]
+archive_types = (".tar.gz", ".tgz", ".tar")
+
+
+def isCourseArchive(name: str) -> bool:
+    """Checks whether a path looks like a course export tarball."""
+    return name.lower().endswith(archive_types) and os.path.isfile(name)
+
+
+def decodeText(data: bytes) -> str:
+    """Decodes utf8 with the same line endings we'd get from reading a file in text mode."""
+    return data.decode("utf8").replace("\r\n", "\n").replace("\r", "\n")
+
+
+class CourseFolder:
+    """Reads a course from an exported folder on disk."""
+
+    def read(self, path: str) -> bytes:
+        with open(path, "rb") as file:
+            return file.read()
+
+    def readText(self, path: str) -> str:
+        with open(path, encoding="utf8") as file:
+            return file.read()
+
+    def parseXML(self, path: str) -> etree._Element:
+        return etree.parse(path).getroot()
+
+    def openFile(self, path: str):
+        """Opens a file for reading as bytes, like for etree.iterparse."""
+        return open(path, "rb")
+
+    def size(self, path: str) -> int:
+        return os.path.getsize(path)
+
+    def isfile(self, path: str) -> bool:
+        return os.path.isfile(path)
+
+    def isdir(self, path: str) -> bool:
+        return os.path.isdir(path)
+
+    def listdir(self, path: str) -> list[str]:
+        return os.listdir(path)
+
+    def localPath(self, path: str) -> str:
+        """Returns a path that other programs can open."""
+        return path
+
+    def xmlIndex(self, rootFileDir: str) -> dict:
+        """
+        Lists the XML files in each folder of the course.
+
+        Returns:
+            dict: The path to each XML file, by (folder name, filename without .xml).
+        """
+        index = {}
+        # The folder is "" when we're run on course.xml from inside the course.
+        with os.scandir(rootFileDir or ".") as folders:
+            for folder in folders:
+                if not folder.is_dir():
+                    continue
+                with os.scandir(folder.path) as entries:
+                    for entry in entries:
+                        if entry.name.endswith(".xml"):
+                            index[(folder.name, entry.name[:-4])] = os.path.join(
+                                rootFileDir, folder.name, entry.name
+                            )
+        return index
+
+    def close(self) -> None:
+        pass
+
+
+class CourseArchive(CourseFolder):
+    """
+    Reads a course from an export tarball, without extracting it.
+
+    Args:
+        path (str): The .tar.gz file.
+        keep_documents (bool): Whether to copy Word, Excel, PowerPoint and PDF files to a temporary folder for link checking.
+    """
+
+    def __init__(self, path: str, keep_documents: bool = False):
+        self.path = path
+        self.files = {}
+        self.documents = {}
+        self.folders = {}
+        self.temp_folder = None
+
+        # Streaming mode, so we go through the tarball from start to end once.
+        with tarfile.open(path, "r|*") as tar:
+            for member in tar:
+                if not member.isfile():
+                    continue
+                name = os.path.normpath(member.name).replace(os.sep, "/")
+                folder, filename = name.rpartition("/")[::2]
+                self.addFolder(folder)
+                self.folders[folder].append(filename)
+
+                extension = os.path.splitext(filename)[1].lower()
+                if extension in text_types:
+                    self.files[name] = tar.extractfile(member).read()
+                elif keep_documents and extension in document_types:
+                    if self.temp_folder is None:
+                        self.temp_folder = tempfile.TemporaryDirectory()
+                    local_path = os.path.join(self.temp_folder.name, *name.split("/"))
+                    os.makedirs(os.path.dirname(local_path), exist_ok=True)
+                    with open(local_path, "wb") as local_file:
+                        local_file.write(tar.extractfile(member).read())
+                    self.documents[name] = local_path
+
+        # The course is the folder with the top-most course.xml file.
+        roots = [
+            folder
+            for folder, filenames in self.folders.items()
+            if "course.xml" in filenames
+        ]
+        if len(roots) == 0:
+            raise ValueError("No course.xml found in " + path)
+        self.root = min(roots, key=lambda x: (x.count("/"), x))
+
+    def __getstate__(self):
+        # The temporary folder stays with the process that made it.
+        state = self.__dict__.copy()
+        state["temp_folder"] = None
+        return state
+
+    def addFolder(self, folder: str) -> None:
+        """Adds a folder and its parent folders to our listings."""
+        if folder in self.folders:
+            return
+        self.folders[folder] = []
+        if folder != "":
+            parent, name = folder.rpartition("/")[::2]
+            self.addFolder(parent)
+            self.folders[parent].append(name)
+
+    def rootFileDir(self) -> str:
+        """The path to the folder inside the archive with course.xml in it."""
+        if self.root == "":
+            return self.path
+        return os.path.join(self.path, *self.root.split("/"))
+
+    def memberName(self, path: str) -> str:
+        """Turns a path that starts with the archive's path into a member name."""
+        name = os.path.relpath(path, self.path).replace(os.sep, "/")
+        return "" if name == "." else name
+
+    def read(self, path: str) -> bytes:
+        name = self.memberName(path)
+        if name not in self.files:
+            raise FileNotFoundError("Not found in " + self.path + ": " + name)
+        return self.files[name]
+
+    def readText(self, path: str) -> str:
+        return decodeText(self.read(path))
+
+    def parseXML(self, path: str) -> etree._Element:
+        return etree.fromstring(self.read(path))
+
+    def openFile(self, path: str):
+        return io.BytesIO(self.read(path))
+
+    def size(self, path: str) -> int:
+        return len(self.read(path))
+
+    def isfile(self, path: str) -> bool:
+        name = self.memberName(path)
+        folder, filename = name.rpartition("/")[::2]
+        return filename in self.folders.get(folder, []) and name not in self.folders
+
+    def isdir(self, path: str) -> bool:
+        return self.memberName(path) in self.folders
+
+    def listdir(self, path: str) -> list[str]:
+        name = self.memberName(path)
+        if name not in self.folders:
+            raise FileNotFoundError("Not found in " + self.path + ": " + name)
+        return list(self.folders[name])
+
+    def localPath(self, path: str) -> str:
+        name = self.memberName(path)
+        if name not in self.documents:
+            raise FileNotFoundError("Not kept from " + self.path + ": " + name)
+        return self.documents[name]
+
+    def xmlIndex(self, rootFileDir: str) -> dict:
+        index = {}
+        root = self.memberName(rootFileDir)
+        prefix = root + "/" if root != "" else ""
+        for name in self.files:
+            if not name.startswith(prefix) or not name.endswith(".xml"):
+                continue
+            parts = name[len(prefix) :].split("/")
+            if len(parts) == 2:
+                index[(parts[0], parts[1][:-4])] = os.path.join(rootFileDir, *parts)
+        return index
+
+    def close(self) -> None:
+        """Deletes the temporary folder, if we made one."""
+        if self.temp_folder is not None:
+            self.temp_folder.cleanup()
+            self.temp_folder = None
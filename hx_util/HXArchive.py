@@ -20,8 +20,8 @@ from hx_util import SrtRename
 def runArchive(args):
     # Make the video spreadsheet
     Make_Course_Sheet.Make_Course_Sheet(args)
-    # Transform all the .sjson files to .srt
-    json2srt.json2srt(args + ['-r'])
+    # Transform the new and changed .sjson files to .srt
+    json2srt.json2srt(args + ['-r', '-u'])
     # Rename (copy) the SRT files to match our upload names
     SrtRename.SrtRename(args + ['-c','-n'])
     #Done!
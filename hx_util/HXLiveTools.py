@@ -6,6 +6,7 @@ import os
 from hx_util import Make_Course_Sheet
 from hx_util import json2srt
 from hx_util import SrtRename
+from hx_util import Profiler
 
 ######################################
 # HarvardX Live Tools
@@ -13,27 +14,76 @@ from hx_util import SrtRename
 # Usage: python3 HXLiveTools.py path/to/course/folder
 # Calls multiple scripts to help with the archive process for HarvardX courses.
 # Passes all arguments through to the scripts, but you probably don't want to.
+# With --profile, prints one timing report for the whole run
+# and saves it as HXLiveTools_profile.json in the course folder.
 #
 # Last update: Sept 26th 2018
 ######################################
 
+# Options that json2srt and SrtRename understand too, so we pass them along.
+shared_options = ['-h', '--help', '-o', '-profile', '--profile']
+
+
+def getSheetOptions():
+    # Make_Course_Sheet's other options, and how many values each one takes.
+    # The other scripts would choke on these, so we don't pass them along.
+    # Comes from Make_Course_Sheet's own parser, so new options get left out automatically.
+    options = {}
+    parser = Make_Course_Sheet.makeArgumentParser()
+    for option, action in parser._option_string_actions.items():
+        if option not in shared_options:
+            options[option] = 0 if action.nargs == 0 else 1
+    return options
+
+
+sheet_options = getSheetOptions()
+
+
+def removeSheetOptions(args):
+    other_args = []
+    skip = 0
+    for arg in args:
+        if skip:
+            skip -= 1
+        elif arg in sheet_options:
+            skip = sheet_options[arg]
+        else:
+            other_args.append(arg)
+    return other_args
+
+
 def runLiveTools(args):
-    # Make the video spreadsheet
-    Make_Course_Sheet.Make_Course_Sheet(args + ['-o', 'Course_Video_Sheet.tsv'])
-    # Transform all the .sjson files to .srt
-    json2srt.json2srt(args + ['-r'])
-    # Rename (copy) the SRT files to match our upload names and make a zip file.
-    # Put this in the course folder.
-    SrtRename.SrtRename(args + ['-c', '-n', '-z', '-i', 'Course_Video_Sheet.tsv', '-o', 'Course_SRT_Files.zip'])
-    # Make the link spreadsheet.
-    Make_Course_Sheet.Make_Course_Sheet(args + ['-links', '-o', 'Course_Link_Sheet.tsv'])
-    # Make the image spreadsheet.
-    Make_Course_Sheet.Make_Course_Sheet(args + ['-alttext', '-o', 'Course_Image_Sheet.tsv'])
-    # Make the full spreadsheet.
-    Make_Course_Sheet.Make_Course_Sheet(args + ['-all', '-o', 'Course_Full_Sheet.tsv'])
-    #Done!
-    print('SRT archive prep complete.')
-    print('Your renamed SRT files are a zip file, in the same directory as your course folder.')
+    # The other scripts add to this profile instead of starting their own.
+    new_profile = ('-profile' in args or '--profile' in args) and Profiler.start('HXLiveTools')
+
+    try:
+        # Make the video, link, image, and full spreadsheets.
+        # These all come from a single read-through of the course.
+        with Profiler.phase('Make_Course_Sheet'):
+            Make_Course_Sheet.Make_Course_Sheets(args, [
+                ['-o', 'Course_Video_Sheet.tsv'],
+                ['-links', '-o', 'Course_Link_Sheet.tsv'],
+                ['-alttext', '-o', 'Course_Image_Sheet.tsv'],
+                ['-all', '-o', 'Course_Full_Sheet.tsv'],
+            ])
+        args = removeSheetOptions(args)
+        # Transform the new and changed .sjson files to .srt
+        with Profiler.phase('json2srt'):
+            json2srt.json2srt(args + ['-r', '-u'])
+        # Rename (copy) the SRT files to match our upload names and make a zip file.
+        # Put this in the course folder.
+        with Profiler.phase('SrtRename'):
+            SrtRename.SrtRename(args + ['-c', '-n', '-z', '-i', 'Course_Video_Sheet.tsv', '-o', 'Course_SRT_Files.zip'])
+        #Done!
+        print('SRT archive prep complete.')
+        print('Your renamed SRT files are a zip file, in the same directory as your course folder.')
+
+        if new_profile:
+            folders = [arg for arg in args if os.path.isdir(arg)]
+            Profiler.finish(folders[0] if folders else '.')
+    finally:
+        if new_profile:
+            Profiler.stop()
 
 
 def main():
@@ -43,7 +93,10 @@ def main():
     if 'course.xml' in [os.path.basename(word) for word in sys.argv]:
         print('Please run me on a course folder, not the course.xml file.')
 
-    for directory in sys.argv:
+    for directory in removeSheetOptions(sys.argv):
+        # Options like --profile aren't folders.
+        if directory.startswith('-'):
+            continue
         if not os.path.exists(directory):
             sys.exit('Directory not found: ' + directory)
         if os.path.isdir(directory):
@@ -0,0 +1,310 @@
+import re
+import html.entities
+from lxml import etree
+from bs4 import BeautifulSoup
+
+from hx_util import Profiler
+
+######################################
+# Link and alt text extraction
+#
+# Gets links ({"href", "text"}) and images ({"src", "alt"}) out of
+# HTML pages, XML files, and problem XML.
+#
+# There are two backends:
+#   lxml - Parses with lxml directly and uses precompiled XPath. Fast.
+#   soup - Parses with BeautifulSoup. Slow, but forgiving.
+# The lxml backend hands anything it can't be sure about over to BeautifulSoup,
+# so both give the same results.
+#
+# "markup" says which BeautifulSoup parser the text would normally get:
+#   html - html.parser, used for .html files and inline html components.
+#   xml  - lxml's HTML parser, used for .xml files and problem XML.
+######################################
+
+soup_parsers = {"html": "html.parser", "xml": "lxml"}
+
+find_links = etree.XPath("//a | //iframe")
+find_images = etree.XPath("//img | //drag_and_drop_input")
+find_strings = etree.XPath("descendant::text() | descendant::comment()")
+
+# html.parser and lxml only disagree about certain kinds of markup:
+# CDATA sections, processing instructions, self-closed tags like <a/>,
+# repeated attributes (html.parser keeps the last one, lxml the first),
+# and tags or entities inside elements that lxml treats as raw text.
+# Let BeautifulSoup handle those.
+soup_only = re.compile(
+    r"<!\[|<\?|<plaintext\b"
+    r"|<(?!(?:area|base|br|col|embed|hr|img|input|link|meta|param|source|track|wbr)\b)[a-z][^<>]*/>"
+    r"|\s(href|src|alt|img)\b[^<>]*\s\1\s*[=/>\s]"
+    r"|<(iframe|noscript|xmp|noembed|noframes)\b[^>]*>[^<&]*(&|<(?!/\2\s*>))"
+    r"|<(textarea|title|script|style)\b[^>]*>[^<]*<(?!/\4\s*>)",
+    re.IGNORECASE,
+)
+
+# Start and end tags for links. lxml closes a link when another one starts,
+# and moves or closes unfinished ones, but html.parser keeps everything up to
+# the matching </a> as link text. Links like that go to BeautifulSoup.
+anchor_tags = re.compile(r"<(/?)a(?=[\s/>])", re.IGNORECASE)
+
+# html.parser also mangles unknown or unfinished entities (like "&foo;" or "a&b")
+# in text, so those go to BeautifulSoup too. Entities in attributes are fine.
+text_with_entities = re.compile(r"(?:^|>)([^<]*&[^<]*)")
+entity_refs = re.compile(r"&(#[0-9]+;|#[xX][0-9a-fA-F]+;|[a-zA-Z][a-zA-Z0-9]*;)?")
+
+# BeautifulSoup turns strings that are all whitespace into a single
+# newline or space, except inside these tags.
+ascii_spaces = "\x20\x0a\x09\x0c\x0d"
+preserve_whitespace_tags = ["pre", "textarea"]
+
+# libxml2 versions before 2.14 complain about HTML5 tags. That's fine.
+harmless_errors = [etree.ErrorTypes.HTML_UNKNOWN_TAG]
+
+
+def describeLinkData(newlink: dict) -> dict:
+    """Adds notes to links based on file type, like (image link) or (PDF file)."""
+    image_types = [
+        ".png",
+        ".gif",
+        ".jpg",
+        ".jpeg",
+        ".svg",
+        ".tiff",
+        ".tif",
+        ".bmp",
+        ".jp2",
+        ".jif",
+        ".pict",
+        ".webp",
+    ]
+
+    if newlink["href"].endswith(tuple(image_types)):
+        newlink["text"] += " (image link)"
+    if newlink["href"].endswith(".pdf"):
+        newlink["text"] += " (PDF file)"
+    if newlink["href"].endswith(".ps"):
+        newlink["text"] += " (PostScript file)"
+    if newlink["href"].endswith(".zip"):
+        newlink["text"] += " (zip file)"
+    if newlink["href"].endswith(".tar.gz"):
+        newlink["text"] += " (tarred gzip file)"
+    if newlink["href"].endswith(".gz"):
+        newlink["text"] += " (gzip file)"
+    return newlink
+
+
+def getHTMLLinks(soup: BeautifulSoup) -> list[dict]:
+    """Gets a list of links from HTML pages, with href and link text."""
+    links = []
+
+    all_links = soup.find_all(["a", "iframe"])
+
+    for link in all_links:
+        if link.has_attr("href"):
+            # It's a link and not just an anchor.
+            if len(link.contents) > 0:
+                link_text = "".join(link.find_all(string=True))
+            else:
+                link_text = ""
+            links.append({"href": link.get("href"), "text": link_text})
+
+        if link.has_attr("src"):
+            # It's an iframe.
+            links.append({"href": link.get("src"), "text": "(iframe)"})
+
+    betterlinks = [describeLinkData(x) for x in links]
+    return betterlinks
+
+
+def getAltText(soup: BeautifulSoup) -> list[dict]:
+    """Gets a list of images from HTML pages, with src and alt text."""
+    image_list = []
+
+    all_images = soup.find_all(["img", "drag_and_drop_input"])
+    temp_alt = "No alt attribute"
+    temp_src = "No source attribute"
+
+    for img in all_images:
+        if img.has_attr("img"):
+            # This is a version-1 drag-and-drop problem.
+            temp_src = "¡Drag-and-drop v1 problem, replace!"
+            temp_alt = "¡Drag-and-drop v1 problem, replace!"
+        elif img.has_attr("src"):
+            temp_src = img.get("src")
+            if img.has_attr("alt"):
+                temp_alt = img.get("alt")
+        image_list.append({"src": temp_src, "alt": temp_alt})
+
+    return image_list
+
+
+def hasOddEntities(text: str) -> bool:
+    """Checks for entities in text that html.parser and lxml would read differently."""
+    if "&" not in text:
+        return False
+    for segment in text_with_entities.findall(text):
+        for ref in entity_refs.finditer(segment):
+            name = ref.group(1)
+            if name is None:
+                # A bare & is fine as long as it isn't the start of something.
+                next_char = segment[ref.end() : ref.end() + 1]
+                if next_char.isalnum() or next_char == "#":
+                    return True
+            elif not name.startswith("#") and name not in html.entities.html5:
+                return True
+    return False
+
+
+def hasOpenAnchors(text: str) -> bool:
+    """Checks for links that start inside another link, or that never get closed."""
+    is_open = False
+    for tag in anchor_tags.finditer(text):
+        if tag.group(1) == "":
+            if is_open:
+                return True
+            is_open = True
+        else:
+            # A stray </a> is a parse error, which sends it to BeautifulSoup anyway.
+            is_open = False
+    return is_open
+
+
+def getLxmlString(node) -> str:
+    """Gets the text of a string or comment from find_strings, the way BeautifulSoup would see it."""
+    if isinstance(node, str):
+        text = node
+        parent = node.getparent()
+        if node.is_tail:
+            parent = parent.getparent()
+    else:
+        # Comments
+        text = node.text or ""
+        parent = node.getparent()
+
+    if text.strip(ascii_spaces) != "":
+        return text
+
+    while parent is not None:
+        if parent.tag in preserve_whitespace_tags:
+            return text
+        parent = parent.getparent()
+    return "\n" if "\n" in text else " "
+
+
+def getLxmlLinks(root: etree._Element) -> list[dict]:
+    """Same as getHTMLLinks, for a tree from parseWithLxml."""
+    links = []
+
+    for link in find_links(root):
+        if "href" in link.attrib:
+            # Comments count as link text, same as with BeautifulSoup.
+            link_text = "".join(getLxmlString(x) for x in find_strings(link))
+            links.append(
+                describeLinkData({"href": link.get("href"), "text": link_text})
+            )
+
+        if "src" in link.attrib:
+            # It's an iframe.
+            links.append(
+                describeLinkData({"href": link.get("src"), "text": "(iframe)"})
+            )
+
+    return links
+
+
+def getLxmlAltText(root: etree._Element) -> list[dict]:
+    """Same as getAltText, for a tree from parseWithLxml."""
+    image_list = []
+
+    # Like getAltText, images without alt or src attributes
+    # carry over the values from the previous image.
+    temp_alt = "No alt attribute"
+    temp_src = "No source attribute"
+
+    for img in find_images(root):
+        if "img" in img.attrib:
+            # This is a version-1 drag-and-drop problem.
+            temp_src = "¡Drag-and-drop v1 problem, replace!"
+            temp_alt = "¡Drag-and-drop v1 problem, replace!"
+        elif "src" in img.attrib:
+            temp_src = img.get("src")
+            if "alt" in img.attrib:
+                temp_alt = img.get("alt")
+        image_list.append({"src": temp_src, "alt": temp_alt})
+
+    return image_list
+
+
+def parseWithSoup(text: str, markup: str = "html"):
+    """Parses text with BeautifulSoup."""
+    return BeautifulSoup(text, soup_parsers[markup])
+
+
+def parseWithLxml(text: str, markup: str = "html"):
+    """
+    Parses text with lxml's HTML parser. Falls back to BeautifulSoup
+    for malformed markup or anything else where the two might disagree.
+    """
+    if markup == "html" and (
+        soup_only.search(text) or hasOddEntities(text) or hasOpenAnchors(text)
+    ):
+        return parseWithSoup(text, markup)
+
+    if text.strip() == "":
+        # lxml won't parse an empty document. There's nothing in it anyway.
+        return etree.Element("html")
+
+    parser = etree.HTMLParser()
+    try:
+        root = etree.fromstring(text, parser)
+    except (ValueError, etree.ParserError):
+        # Things like encoding declarations or documents with no elements.
+        return parseWithSoup(text, markup)
+    if root is None:
+        return parseWithSoup(text, markup)
+
+    # BeautifulSoup's "lxml" parser is this same parser, so only html.parser
+    # can give different results when the markup is broken.
+    if markup == "html":
+        for error in parser.error_log:
+            if error.type not in harmless_errors:
+                return parseWithSoup(text, markup)
+
+    return root
+
+
+# Which function parses text for each backend.
+backends = {"lxml": parseWithLxml, "soup": parseWithSoup}
+
+
+def parseMarkup(text: str, markup: str = "html", backend: str = "lxml"):
+    """
+    Parses HTML or XML text for getLinks and getImages.
+
+    Args:
+        text (str): The HTML or XML.
+        markup (str): "html" for html pages and inline html, "xml" for xml files and problem XML.
+        backend (str): "lxml" or "soup".
+
+    Returns:
+        Either an lxml element or a BeautifulSoup object.
+    """
+    doc = backends[backend](text, markup)
+    if Profiler.active is not None:
+        parsed_with = "soup" if isinstance(doc, BeautifulSoup) else "lxml"
+        Profiler.count("parse " + markup + " with " + parsed_with)
+    return doc
+
+
+def getLinks(doc) -> list[dict]:
+    """Gets links from a document made by parseMarkup."""
+    if isinstance(doc, BeautifulSoup):
+        return getHTMLLinks(doc)
+    return getLxmlLinks(doc)
+
+
+def getImages(doc) -> list[dict]:
+    """Gets images and alt text from a document made by parseMarkup."""
+    if isinstance(doc, BeautifulSoup):
+        return getAltText(doc)
+    return getLxmlAltText(doc)
@@ -0,0 +1,437 @@
+import os
+import sys
+import json
+import random
+import shutil
+import tarfile
+import argparse
+
+instructions = """
+To use:
+python3 MakeTestCourse.py output_folder (options)
+
+Writes a made-up course export for testing and benchmarking.
+It has chapters, sequentials and verticals, html, problem, video and
+discussion components (some in their own files and some inline),
+a split test, tabs, course info, Word/Excel/PowerPoint/PDF files
+in the static folder, and .srt.sjson transcripts for every video.
+The same options and seed always give the same course.
+
+Valid options:
+  -h Help. Print this message.
+  -chapters N      How many chapters. Default is 4.
+  -sequentials N   How many sequentials in each chapter. Default is 3.
+  -verticals N     How many verticals in each sequential. Default is 3.
+  -components N    How many components in each vertical. Default is 4.
+  -documents N     How many copies of each kind of document in /static/. Default is 1.
+  -seed N          Seed for the random choices. Default is 0.
+  -inline          Puts the whole course inline in one big course/[run].xml file.
+  -tar             Also makes a .tar.gz of the course next to the folder.
+
+Last update: October 17th 2026
+"""
+
+# Where the sample Word, Excel, PowerPoint and PDF files live.
+samples_folder = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "doc_link_samples"
+)
+sample_documents = {
+    "docx": "SampleWordDoc.docx",
+    "xlsx": "SampleExcelDoc.xlsx",
+    "pptx": "SamplePowerPointDoc.pptx",
+    "pdf": "SamplePDF.pdf",
+}
+
+# How often each kind of component shows up.
+component_weights = {"html": 4, "problem": 3, "video": 2, "discussion": 1}
+
+# Transcript languages for each video.
+transcript_languages = ["en", "es"]
+
+words = (
+    "the course video problem answer learning students week unit energy "
+    "molecule history policy economics function graph theorem evidence "
+    "review reading lecture example practice summary question data model"
+).split()
+
+
+def writeFile(path: str, text: str) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf8") as file:
+        file.write(text)
+
+
+def sentence(rnd: random.Random, length: int) -> str:
+    return " ".join(rnd.choice(words) for x in range(length)).capitalize()
+
+
+def htmlPage(rnd: random.Random, n: int, documents: int) -> str:
+    """Makes the text of an html component, with a few links and images."""
+    parts = []
+    for p in range(rnd.randint(2, 6)):
+        parts.append("<p>" + sentence(rnd, rnd.randint(8, 30)) + "</p>")
+    parts.append(
+        '<p>Read <a href="https://example.com/reading/%d">%s</a> &amp; more.</p>'
+        % (n, sentence(rnd, 3))
+    )
+    if documents > 0:
+        kind = rnd.choice(list(sample_documents))
+        parts.append(
+            '<p><a href="/static/handout%d.%s">Handout (%s)</a></p>'
+            % (rnd.randint(1, documents), kind, kind)
+        )
+    parts.append('<img src="/static/figure%d.png" alt="%s"/>' % (n, sentence(rnd, 4)))
+    if rnd.random() < 0.3:
+        parts.append('<img src="/static/decoration%d.png"/>' % n)
+    if rnd.random() < 0.2:
+        parts.append(
+            '<iframe src="https://www.youtube.com/embed/yt%d" title="Video"></iframe>'
+            % n
+        )
+    return "\n".join(parts) + "\n"
+
+
+def problemXML(rnd: random.Random, n: int) -> str:
+    """Makes a multiple-choice problem, with a link and an image."""
+    choices = "".join(
+        '<choice correct="%s">%s</choice>'
+        % ("true" if c == 0 else "false", sentence(rnd, 3))
+        for c in range(rnd.randint(2, 5))
+    )
+    return (
+        '<problem display_name="Problem %d" max_attempts="2" rerandomize="never">\n'
+        "<p>%s</p>\n"
+        '<p>See <a href="https://example.org/problems/%d">this page</a>.</p>\n'
+        '<img src="/static/problem%d.png" alt="%s"/>\n'
+        "<multiplechoiceresponse><choicegroup>%s</choicegroup></multiplechoiceresponse>\n"
+        "</problem>\n" % (n, sentence(rnd, 20), n, n, sentence(rnd, 3), choices)
+    )
+
+
+def videoXML(n: int, video_id: str, duration: float) -> str:
+    transcripts = "".join(
+        '<transcript language_code="%s"/>' % x for x in transcript_languages
+    )
+    return (
+        '<video url_name="video%d" display_name="Video %d" youtube_id_1_0="yt%d" '
+        'edx_video_id="%s" sub="">\n'
+        '<video_asset client_video_id="uploads/Lecture_%d.mp4" duration="%.1f">\n'
+        '<encoded_video profile="desktop_mp4" url="https://videos.example.com/v%d.mp4"/>\n'
+        "<transcripts>%s</transcripts>\n"
+        "</video_asset>\n</video>\n" % (n, n, n, video_id, n, duration, n, transcripts)
+    )
+
+
+def transcriptJSON(rnd: random.Random, duration: float) -> str:
+    """Makes an .srt.sjson transcript with a caption every few seconds."""
+    start, end, text = [], [], []
+    time = 0
+    while time < duration * 1000:
+        length = rnd.randint(1500, 6000)
+        start.append(time)
+        end.append(time + length - 100)
+        # Some captions are long enough that json2srt splits them.
+        text.append(sentence(rnd, rnd.randint(3, 16)).replace("The", "The &quot;", 1))
+        time += length
+    return json.dumps({"start": start, "end": end, "text": text})
+
+
+def placeElement(
+    folder: str, tag: str, url_name: str, attributes: str, inner: str, inline: bool
+) -> str:
+    """
+    Puts an element in its own file and returns a pointer to it,
+    or returns the whole element for courses where everything is inline.
+    Html components get their text in a separate .html file, like edX does.
+    """
+    if inline and tag == "html":
+        return '<html url_name="%s" %s><![CDATA[%s]]></html>' % (
+            url_name,
+            attributes,
+            inner,
+        )
+    if inline:
+        return '<%s url_name="%s" %s>\n%s\n</%s>' % (
+            tag,
+            url_name,
+            attributes,
+            inner,
+            tag,
+        )
+    if tag == "html":
+        writeFile(os.path.join(folder, "html", url_name + ".html"), inner)
+        writeFile(
+            os.path.join(folder, "html", url_name + ".xml"),
+            '<html filename="%s" %s/>\n' % (url_name, attributes),
+        )
+    else:
+        writeFile(
+            os.path.join(folder, tag, url_name + ".xml"),
+            "<%s %s>\n%s\n</%s>\n" % (tag, attributes, inner, tag),
+        )
+    return '<%s url_name="%s"/>' % (tag, url_name)
+
+
+def makeTestCourse(
+    folder: str,
+    chapters: int = 4,
+    sequentials: int = 3,
+    verticals: int = 3,
+    components: int = 4,
+    documents: int = 1,
+    seed: int = 0,
+    inline: bool = False,
+) -> dict:
+    """
+    Writes a made-up course export. Replaces the folder if it's already there.
+
+    Args:
+        folder (str): Where to put the course. This is the folder with course.xml in it.
+        chapters (int): How many chapters.
+        sequentials (int): How many sequentials in each chapter.
+        verticals (int): How many verticals in each sequential.
+        components (int): How many components in each vertical.
+        documents (int): How many copies of each kind of document in the static folder.
+        seed (int): Seed for the random choices.
+        inline (bool): Put the whole course inline in course/[run].xml, instead of a file for each part.
+
+    Returns:
+        dict: How many of each kind of thing we made, plus the number of files and bytes.
+    """
+    rnd = random.Random(seed)
+    if os.path.exists(folder):
+        shutil.rmtree(folder)
+
+    run = "2026_Fall"
+    counts = {"chapter": 0, "sequential": 0, "vertical": 0, "transcript": 0}
+    counts.update({kind: 0 for kind in component_weights})
+    kinds = list(component_weights)
+    weights = list(component_weights.values())
+    n = 0
+
+    writeFile(
+        os.path.join(folder, "course.xml"),
+        '<course url_name="%s" org="HarvardX" course="HX%d"/>\n' % (run, seed),
+    )
+
+    chapter_elements = []
+    for c in range(chapters):
+        sequential_elements = []
+        for s in range(sequentials):
+            vertical_elements = []
+            for v in range(verticals):
+                vertical_url = "vertical%d_%d_%d" % (c, s, v)
+                children = []
+                for k in range(components):
+                    n += 1
+                    kind = rnd.choices(kinds, weights)[0]
+                    counts[kind] += 1
+                    # About one in ten components is declared inline anyway.
+                    declared_inline = kind != "video" and rnd.random() < 0.1
+
+                    if kind == "html" and (inline or declared_inline):
+                        # edX puts inline html in CDATA.
+                        children.append(
+                            '<html url_name="html%d" display_name="Text %d">'
+                            "<![CDATA[%s]]></html>"
+                            % (n, n, htmlPage(rnd, n, documents))
+                        )
+                    elif kind == "html":
+                        children.append('<html url_name="html%d"/>' % n)
+                        writeFile(
+                            os.path.join(folder, "html", "html%d.xml" % n),
+                            '<html filename="html%d" display_name="Text %d"/>\n'
+                            % (n, n),
+                        )
+                        writeFile(
+                            os.path.join(folder, "html", "html%d.html" % n),
+                            htmlPage(rnd, n, documents),
+                        )
+                    elif kind == "problem" and (inline or declared_inline):
+                        children.append(problemXML(rnd, n).strip())
+                    elif kind == "problem":
+                        children.append('<problem url_name="problem%d"/>' % n)
+                        writeFile(
+                            os.path.join(folder, "problem", "problem%d.xml" % n),
+                            problemXML(rnd, n),
+                        )
+                    elif kind == "video":
+                        video_id = "%08x-%04d" % (rnd.getrandbits(32), n)
+                        duration = rnd.uniform(60, 900)
+                        if inline:
+                            children.append(videoXML(n, video_id, duration).strip())
+                        else:
+                            children.append('<video url_name="video%d"/>' % n)
+                            writeFile(
+                                os.path.join(folder, "video", "video%d.xml" % n),
+                                videoXML(n, video_id, duration),
+                            )
+                        for language in transcript_languages:
+                            writeFile(
+                                os.path.join(
+                                    folder,
+                                    "static",
+                                    video_id + "-" + language + ".srt.sjson",
+                                ),
+                                transcriptJSON(rnd, duration),
+                            )
+                            counts["transcript"] += 1
+                    else:
+                        children.append(
+                            '<discussion url_name="discussion%d" display_name="Discuss %d" '
+                            'discussion_category="Week %d"/>' % (n, n, c + 1)
+                        )
+
+                # One split test per chapter, with its own group vertical.
+                if s == 0 and v == 0:
+                    group_url = vertical_url + "_group"
+                    group_text = placeElement(
+                        folder,
+                        "html",
+                        group_url + "_html",
+                        'display_name="Group text"',
+                        htmlPage(rnd, n, documents),
+                        inline,
+                    )
+                    group = placeElement(
+                        folder,
+                        "vertical",
+                        group_url,
+                        'display_name="Group A"',
+                        group_text,
+                        inline,
+                    )
+                    children.append(
+                        '<split_test url_name="split%d" display_name="Split test %d">'
+                        "%s</split_test>" % (c, c, group)
+                    )
+
+                vertical_elements.append(
+                    placeElement(
+                        folder,
+                        "vertical",
+                        vertical_url,
+                        'display_name="Unit %d.%d.%d"' % (c + 1, s + 1, v + 1),
+                        "\n".join(children),
+                        inline,
+                    )
+                )
+                counts["vertical"] += 1
+            sequential_elements.append(
+                placeElement(
+                    folder,
+                    "sequential",
+                    "sequential%d_%d" % (c, s),
+                    'display_name="Subsection %d.%d"' % (c + 1, s + 1),
+                    "\n".join(vertical_elements),
+                    inline,
+                )
+            )
+            counts["sequential"] += 1
+        chapter_elements.append(
+            placeElement(
+                folder,
+                "chapter",
+                "chapter%d" % c,
+                'display_name="Week %d"' % (c + 1),
+                "\n".join(sequential_elements),
+                inline,
+            )
+        )
+        counts["chapter"] += 1
+
+    writeFile(
+        os.path.join(folder, "course", run + ".xml"),
+        '<course display_name="Test Course %d">\n%s\n<wiki slug="HX%d"/>\n</course>\n'
+        % (seed, "\n".join(chapter_elements), seed),
+    )
+
+    # Tabs, course info, and other things in the auxiliary folders.
+    policy = {
+        "course/"
+        + run: {
+            "tabs": [
+                {"type": "courseware"},
+                {"type": "static_tab", "url_slug": "syllabus", "name": "Syllabus"},
+            ]
+        }
+    }
+    writeFile(os.path.join(folder, "policies", run, "policy.json"), json.dumps(policy))
+    writeFile(
+        os.path.join(folder, "tabs", "syllabus.html"), htmlPage(rnd, 0, documents)
+    )
+    writeFile(
+        os.path.join(folder, "info", "updates.xml"),
+        '<section><article><h2>Welcome</h2><p><a href="https://example.com/welcome">'
+        'Start here</a></p><img src="/static/banner.png"/></article></section>\n',
+    )
+    writeFile(
+        os.path.join(folder, "static", "syllabus.html"),
+        "<html><body>" + htmlPage(rnd, 0, documents) + "</body></html>\n",
+    )
+    for kind, sample in sample_documents.items():
+        for d in range(documents):
+            shutil.copyfile(
+                os.path.join(samples_folder, sample),
+                os.path.join(folder, "static", "handout%d.%s" % (d + 1, kind)),
+            )
+    counts["documents"] = documents * len(sample_documents)
+
+    counts["files"] = 0
+    counts["bytes"] = 0
+    for dirpath, dirnames, filenames in os.walk(folder):
+        for filename in filenames:
+            counts["files"] += 1
+            counts["bytes"] += os.path.getsize(os.path.join(dirpath, filename))
+    return counts
+
+
+def makeTarball(folder: str) -> str:
+    """Packs a course folder into a .tar.gz next to it, the way edX exports do."""
+    tar_path = folder.rstrip(os.sep) + ".tar.gz"
+    with tarfile.open(tar_path, "w:gz") as tar:
+        tar.add(folder, arcname="course")
+    return tar_path
+
+
+# Main function.
+def MakeTestCourse(arguments) -> None:
+
+    parser = argparse.ArgumentParser(usage=instructions, add_help=False)
+    parser.add_argument("--help", "-h", action="store_true")
+    parser.add_argument("-chapters", type=int, default=4)
+    parser.add_argument("-sequentials", type=int, default=3)
+    parser.add_argument("-verticals", type=int, default=3)
+    parser.add_argument("-components", type=int, default=4)
+    parser.add_argument("-documents", type=int, default=1)
+    parser.add_argument("-seed", type=int, default=0)
+    parser.add_argument("-inline", action="store_true")
+    parser.add_argument("-tar", action="store_true")
+    parser.add_argument("file_names", nargs="*")
+
+    args = parser.parse_args(arguments)
+
+    if args.help or len(args.file_names) != 1:
+        sys.exit(instructions)
+
+    folder = args.file_names[0]
+    counts = makeTestCourse(
+        folder,
+        args.chapters,
+        args.sequentials,
+        args.verticals,
+        args.components,
+        args.documents,
+        args.seed,
+        args.inline,
+    )
+    print("Made test course in " + folder + ":")
+    for key, value in counts.items():
+        print("    " + key + ": " + str(value))
+    if args.tar:
+        print("Made " + makeTarball(folder))
+
+
+if __name__ == "__main__":
+    # this won't be run when imported
+    MakeTestCourse(sys.argv[1:])
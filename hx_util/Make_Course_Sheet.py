@@ -1,24 +1,41 @@
+import io
 import os
 import sys
 import csv
 import glob
 import json
+import time
+import shutil
 import argparse
+import tempfile
+import contextlib
+import textwrap
+import itertools
+import threading
+import multiprocessing
 from lxml import etree
-from typing import Union
-from bs4 import BeautifulSoup
+from typing import Union, Iterator
+from concurrent.futures import ProcessPoolExecutor
 
 from hx_util import GetWordLinks
 from hx_util import GetExcelLinks
 from hx_util import GetPPTLinks
 from hx_util import GetPDFLinks
+from hx_util import Profiler
+from hx_util.ParseCache import ParseCache, ParseMemo, DocumentCache
+from hx_util.ParseCache import defaultDocumentCachePath, default_document_cache_mb
+from hx_util.CourseSource import CourseFolder, CourseArchive, isCourseArchive
+from hx_util.CourseModel import CourseNode, CourseRow, CourseModel, row_columns
+from hx_util.CourseModel import no_items, itemList, nodeToJSON, mergeAuxFolders
+from hx_util.CourseDatabase import CourseDatabase, writeCourseDatabase
+from hx_util.LinkExtraction import describeLinkData, getHTMLLinks, getAltText
+from hx_util.LinkExtraction import parseMarkup, getLinks, getImages
 
 if __package__ is None:
     version = "unknown version"
 else:
     version = sys.modules[__package__].__version__
-instructions = (
-    """
+instructions = """
 To use:
 python3 Make_Course_Sheet.py path/to/course.xml (options)
 
@@ -37,12 +54,52 @@ You can specify the following options:
     -alttext   Lists all images with their alt text.
                Not compatible with above options.
     -o         Sets the output filename to the next argument.
+    -cache     Keeps what we read from each file in the course folder,
+               so later runs only re-read files that have changed.
+               With -links, also keeps the links from Word, Excel, PowerPoint,
+               and PDF files in a cache shared by all your courses, so the
+               same handout only gets read once (this part works for .tar.gz
+               files too).
+    -doccache FILE  Uses this file for the shared document cache instead of
+               ~/.cache/hx_util/document_links.sqlite. Turns it on without -cache.
+    -doccachesize MB  Size limit for the document cache. Default is 100.
+               When it's full, the documents used longest ago are dropped.
+    -jobs N    Reads the course's chapters in N processes at once.
+    -docjobs N Reads the Word, Excel, PowerPoint, and PDF files in static
+               in N processes at once, for -links.
+    -doctimeout S  Skips any one of those files that takes more than S seconds.
+               Default is 120 with -docjobs, and no limit without it.
+    -parser    Sets how we read links and images from HTML: "lxml" (default,
+               faster) or "soup" (BeautifulSoup, for comparison).
+    -json      Sets how we save the course structure: "pretty" (default,
+               course.json with indents), "compact" (course.json on one line),
+               "lines" (course.jsonl, one item per line), or "none".
+    -stream    For courses exported with everything inline in one big file.
+               Reads the course file a chapter at a time and writes each
+               chapter's rows before reading the next, so memory use stays
+               about the same however big the course is. Ignores -jobs.
+    -sqlite    Also saves the course in a SQLite database named by the next
+               argument, in the same folder as the sheet. It has tables for
+               nodes, videos, transcripts, links, and images, with everything
+               in them no matter which sheet you asked for. Running on a
+               course that's already in the database replaces it, so you
+               can keep many courses in one file.
+
+You can also run this on an exported .tar.gz file without extracting it.
+The sheet and course.json go in the same folder as the .tar.gz file.
+
+    -batch     Runs on every course folder and .tar.gz file inside the folders
+               you give, and writes one sheet for all of them, with a course_id
+               column. -jobs N reads N courses at once. Courses that fail are
+               listed at the end instead of stopping the batch.
+               Doesn't write course.json files.
+    --profile  Times each part of the run and counts the files we read.
+               Prints a report and saves it as Make_Course_Sheet_profile.json
+               in the same folder as the sheet.
 
 This script may fail on courses with empty containers.
 
-Last update: March 27th 2026, Version """
-    + version
-)
+Last update: March 27th 2026, Version """ + version
 
 
 # Many of these are being skipped because they're currently expressed in inline XML
@@ -60,17 +117,46 @@ skip_tags = [
     "wiki",
 ]
 
-# Canonical leaf node. Only for copying.
-canon_leaf = {
-    "type": "",
-    "name": "",
-    "url": "",
-    "filename": "",
-    "links": [],
-    "images": [],
-    "sub": [],
+# Cache of parsed files for the course we're working on. See ParseCache.py.
+# Only set when running with -cache.
+parse_cache = None
+
+# Where we read course files from. See CourseSource.py.
+# Swapped for a CourseArchive while we're reading a .tar.gz export.
+course_source = CourseFolder()
+
+# What we've already parsed during this run, for files that are used more than once.
+# Set while we're reading a course.
+parse_memo = None
+
+# Which XML files the course folder has, by (tag, url_name). See indexCourseFiles.
+# Set while we're reading a course.
+course_files = None
+
+# Links from documents in static, by content hash. Set between openCourse and closeCourse
+# with -cache or -doccache.
+document_cache = None
+
+# The globals above belong to one course at a time, so loadCourse calls take turns.
+load_lock = threading.Lock()
+
+# Node fields that end up in spreadsheet rows.
+row_column_set = frozenset(row_columns)
+
+# Functions that get links out of each kind of document in the static folder.
+doc_link_readers = {
+    "docx": GetWordLinks.getWordLinks,
+    "xlsx": GetExcelLinks.getExcelLinks,
+    "pptx": GetPPTLinks.getPPTLinks,
+    "pdf": GetPDFLinks.getPDFLinks,
 }
 
+# Seconds to wait for each document with -docjobs, unless there's a -doctimeout.
+default_doc_timeout = 120
+
+# Keys that getComponentInfo only adds to videos when we're listing videos.
+video_keys = ["download_url", "youtube", "edx_video_id", "upload_name", "duration"]
+
 
 def secToHMS(time: Union[float, int]) -> str:
     """Converts from seconds to hh:mm:ss format"""
@@ -102,242 +188,305 @@ def secToHMS(time: Union[float, int]) -> str:
     return str(hours) + ":" + str(minutes) + ":" + str(seconds)
 
 
-def describeLinkData(newlink: dict) -> dict:
-    """Adds notes to links based on file type, like (image link) or (PDF file)."""
-    image_types = [
-        ".png",
-        ".gif",
-        ".jpg",
-        ".jpeg",
-        ".svg",
-        ".tiff",
-        ".tif",
-        ".bmp",
-        ".jp2",
-        ".jif",
-        ".pict",
-        ".webp",
+def auxFolderNode(folder: str) -> CourseNode:
+    """Makes a node for an auxiliary folder. We place these at the "chapter" level."""
+    name = os.path.basename(folder)
+    return CourseNode("", name=name, url="", contents=[], extra={"chapter": name})
+
+
+def auxFileNode(folder: str, f: str) -> CourseNode:
+    """Makes a node for a file in an auxiliary folder, using the file's extension as its type."""
+    return CourseNode(
+        os.path.splitext(f)[1][1:],
+        name=f,
+        url=f,
+        filename=os.path.join(os.path.basename(folder), f),
+        links=no_items,
+        images=no_items,
+        sub=no_items,
+    )
+
+
+def getTabFiles(rootFileDir: str) -> list[str]:
+    """Gets the filenames of the tabs that the course's policy.json files say are in use."""
+    # Get the list of tabs from all policies/???/policy.json files
+    policy_files = []
+    tab_files = []
+    policy_folders = [
+        os.path.join(rootFileDir, "policies", x)
+        for x in course_source.listdir(os.path.join(rootFileDir, "policies"))
     ]
+    for folder in policy_folders:
+        if course_source.isdir(folder):
+            for f in course_source.listdir(folder):
+                if f == "policy.json":
+                    policy_files.append(os.path.join(folder, f))
 
-    if newlink["href"].endswith(tuple(image_types)):
-        newlink["text"] += " (image link)"
-    if newlink["href"].endswith(".pdf"):
-        newlink["text"] += " (PDF file)"
-    if newlink["href"].endswith(".ps"):
-        newlink["text"] += " (PostScript file)"
-    if newlink["href"].endswith(".zip"):
-        newlink["text"] += " (zip file)"
-    if newlink["href"].endswith(".tar.gz"):
-        newlink["text"] += " (tarred gzip file)"
-    if newlink["href"].endswith(".gz"):
-        newlink["text"] += " (gzip file)"
-    return newlink
-
-
-def getHTMLLinks(soup: BeautifulSoup) -> list[dict]:
-    """Gets a list of links from HTML pages, with href and link text."""
-    links = []
-
-    all_links = soup.find_all(["a", "iframe"])
-
-    for link in all_links:
-        if link.has_attr("href"):
-            # It's a link and not just an anchor.
-            if len(link.contents) > 0:
-                link_text = "".join(link.find_all(string=True))
-            else:
-                link_text = ""
-            links.append({"href": link.get("href"), "text": link_text})
+    for f in policy_files:
+        policy_data = json.loads(course_source.readText(f))
+        # Strip off the outer object wrapper.
+        policy_data = policy_data[list(policy_data.keys())[0]]
+        # If there's a URL slug, add it to the list of tabs.
+        for tab in policy_data["tabs"]:
+            if "url_slug" in tab:
+                tab_files.append(tab["url_slug"] + ".html")
 
-        if link.has_attr("src"):
-            # It's an iframe.
-            links.append({"href": link.get("src"), "text": "(iframe)"})
+    return tab_files
 
-    betterlinks = [describeLinkData(x) for x in links]
-    return betterlinks
 
+def readAuxFile(path: str, markup: str, backend: str = "lxml"):
+    """
+    Reads an html or xml file from an auxiliary folder and parses it for getLinks and getImages.
+    Each file is only read from disk once.
 
-def getAltText(soup: BeautifulSoup) -> list[dict]:
-    """Gets a list of images from HTML pages, with src and alt text."""
-    image_list = []
+    Args:
+        path (str): The file to read.
+        markup (str): "html" or "xml". XML files have to be well-formed.
+        backend (str): "lxml" or "soup", passed to parseMarkup.
 
-    all_images = soup.find_all(["img", "drag_and_drop_input"])
-    temp_alt = "No alt attribute"
-    temp_src = "No source attribute"
+    Returns:
+        The parsed document, or None if the file should be skipped.
+    """
+    data = course_source.read(path)
 
-    for img in all_images:
-        if img.has_attr("img"):
-            # This is a version-1 drag-and-drop problem.
-            temp_src = "¡Drag-and-drop v1 problem, replace!"
-            temp_alt = "¡Drag-and-drop v1 problem, replace!"
-        elif img.has_attr("src"):
-            temp_src = img.get("src")
-            if img.has_attr("alt"):
-                temp_alt = img.get("alt")
-        image_list.append({"src": temp_src, "alt": temp_alt})
+    if markup == "xml":
+        try:
+            etree.fromstring(data)
+        except etree.XMLSyntaxError:
+            # If we have broken XML, tell us and skip the file.
+            print("Broken XML in file " + path + ", skipping.")
+            return None
 
-    return image_list
+    try:
+        text = data.decode("utf8")
+    except UnicodeDecodeError:
+        # If we have a Unicode error, skip the file.
+        print("Unicode error in file " + path + ", skipping.")
+        return None
+    # Same line endings we'd get from reading in text mode.
+    text = text.replace("\r\n", "\n").replace("\r", "\n")
+
+    return parseMarkup(text, markup, backend)
+
+
+def scanAuxFolders(
+    rootFileDir: str,
+    links: bool = True,
+    images: bool = True,
+    backend: str = "lxml",
+    doc_jobs: int = 1,
+    doc_timeout: Union[float, None] = None,
+) -> tuple[list[CourseNode], list[CourseNode]]:
+    """
+    Gets links and alt text from auxiliary folders like tabs, info, and static.
+    Goes through the folders once and parses each file once, no matter how many
+    of the two we want.
 
+    Args:
+        rootFileDir (str): The directory where the course.xml file is located.
+        links (bool): Whether to get links. Includes Word, Excel, PowerPoint, and PDF files.
+        images (bool): Whether to get images and alt text. Only html and xml files.
+        backend (str): "lxml" or "soup", passed to parseMarkup.
+        doc_jobs (int): How many processes to read Word, Excel, PowerPoint, and PDF files with.
+        doc_timeout (float): Seconds before we skip one of those files, or None for no limit.
 
-def getAuxAltText(rootFileDir: str) -> list[dict]:
-    """Gets alt text from auxiliary folders like tabs, info, and static."""
+    Returns:
+        tuple: A list of folder nodes for links and one for images. Each is empty if we didn't ask for it.
+    """
     # Folders to check:
     aux_folders = ["tabs", "info", "static"]
     aux_paths = [os.path.join(rootFileDir, x) for x in aux_folders]
+    aux_links = []
     aux_images = []
+    # Documents to get links from once we've been through the folders: (node, type, path)
+    documents = []
+
+    if links:
+        # Ignore any links from tabs that aren't currently in use.
+        tab_files = getTabFiles(rootFileDir)
+        print("Tabs found in policy files: " + str(tab_files))
 
     for folder in aux_paths:
-        if os.path.isdir(folder):
-            folder_temp = {"type": "", "name": "", "url": "", "contents": []}
-
-            # Placing all of these folders at the "chapter" level.
-            for f in os.listdir(folder):
-                file_temp = canon_leaf.copy()
-                file_temp["filename"] = os.path.join(os.path.basename(folder), f)
-                # Use the file's extension as its type.
-                file_temp["type"] = os.path.splitext(f)[1][1:]
-                # Remove the leftmost character
-                file_temp["name"] = f
-                file_temp["url"] = f
-
-                if file_temp["type"] == "html" or file_temp["type"] == "htm":
-                    try:
-                        with open(os.path.join(folder, f), encoding="utf8") as file:
-                            text = file.read()
-                            soup = BeautifulSoup(text, "html.parser")
-                    except UnicodeDecodeError:
-                        # If we have a Unicode error, skip the file.
-                        print(
-                            "Unicode error in file "
-                            + os.path.join(folder, f)
-                            + ", skipping."
-                        )
-                        continue
-                    file_temp["images"] = getAltText(soup)
-                    folder_temp["contents"].append(file_temp)
-                elif file_temp["type"] == "xml":
-                    try:
-                        etree.parse(folder + "/" + f)
-                    except etree.XMLSyntaxError:
-                        # If we have broken XML, tell us and skip the file.
-                        print("Broken XML in file " + folder + "/" + f + ", skipping.")
-                        continue
-                    with open(os.path.join(folder, f), encoding="utf8") as file:
-                        text = file.read()
-                        soup = BeautifulSoup(text, "lxml")
-                    file_temp["images"] = getAltText(soup)
-                    folder_temp["contents"].append(file_temp)
+        if not course_source.isdir(folder):
+            continue
+        link_folder = auxFolderNode(folder)
+        image_folder = auxFolderNode(folder)
+
+        for f in course_source.listdir(folder):
+            path = os.path.join(folder, f)
+            file_type = os.path.splitext(f)[1][1:]
+
+            if file_type in ["html", "htm", "xml"]:
+                # Skip tabs that aren't in use, unless we're looking for images.
+                want_links = links and not (
+                    file_type != "xml"
+                    and "tabs" in folder
+                    and os.path.basename(f) not in tab_files
+                )
+                if not (want_links or images):
+                    continue
+                markup = "xml" if file_type == "xml" else "html"
+                with Profiler.readingFile("aux " + file_type, path, course_source.size):
+                    doc = readAuxFile(path, markup, backend)
+                if doc is None:
+                    continue
+                if want_links:
+                    file_temp = auxFileNode(folder, f)
+                    file_temp.links = itemList(getLinks(doc))
+                    link_folder.contents.append(file_temp)
+                if images:
+                    file_temp = auxFileNode(folder, f)
+                    file_temp.images = itemList(getImages(doc))
+                    image_folder.contents.append(file_temp)
+
+            elif links and file_type in doc_link_readers:
+                file_temp = auxFileNode(folder, f)
+                documents.append((file_temp, file_type, course_source.localPath(path)))
+                link_folder.contents.append(file_temp)
+
+        if links:
+            aux_links.append(link_folder)
+        if images:
+            aux_images.append(image_folder)
+
+    readAuxDocuments(documents, doc_jobs, doc_timeout)
+    return aux_links, aux_images
+
+
+def readAuxDocuments(
+    documents: list[tuple], jobs: int = 1, timeout: Union[float, None] = None
+) -> None:
+    """
+    Gets the links from Word, Excel, PowerPoint, and PDF files, and adds them to their nodes.
+    With more than one job or a timeout, reads them in other processes.
 
-            folder_temp["chapter"] = os.path.basename(folder)
-            folder_temp["name"] = os.path.basename(folder)
-            aux_images.append(folder_temp)
+    Args:
+        documents (list): (node, file type, path) for each file.
+        jobs (int): How many processes to use.
+        timeout (float): Seconds before we skip a file, or None for no limit.
+    """
+    if document_cache is not None:
+        unread = []
+        for node, file_type, path in documents:
+            doc_links = document_cache.get(path, file_type)
+            if doc_links is None:
+                unread.append((node, file_type, path))
+            else:
+                node.links = itemList(stampFilename(doc_links, path))
+        documents = unread
+
+    if jobs <= 1 and timeout is None:
+        results = []
+        for node, file_type, path in documents:
+            with Profiler.readingFile(file_type, path):
+                results.append(doc_link_readers[file_type]([path, "-l"]))
+    else:
+        results = readDocuments(
+            [(file_type, path) for node, file_type, path in documents], jobs, timeout
+        )
 
-    return aux_images
+    for (node, file_type, path), doc_links in zip(documents, results):
+        # Skipped files don't get cached, so we try them again next time.
+        if doc_links is None:
+            continue
+        node.links = itemList(doc_links)
+        if document_cache is not None:
+            document_cache.put(path, file_type, stampFilename(doc_links, ""))
 
 
-def getAuxLinks(rootFileDir: str) -> list[dict]:
-    """Gets links from auxiliary folders like tabs, info, and static."""
-    # Folders to check:
-    aux_folders = ["tabs", "info", "static"]
-    aux_paths = [os.path.join(rootFileDir, x) for x in aux_folders]
-    aux_links = []
+def stampFilename(doc_links: list, path: str) -> list:
+    """
+    Copies the links from a document with their filename set to path's.
+    Cache entries are shared by every file with the same contents,
+    so we save them without a filename and add it back when we use them.
+    Keeps the "filename" key where the reader put it, so the output doesn't change.
+    """
+    filename = os.path.basename(path)
+    stamped = []
+    for link in doc_links:
+        link = dict(link)
+        if "filename" in link:
+            link["filename"] = filename
+        stamped.append(link)
+    return stamped
 
-    # Ignore any links from tabs that aren't currently in use.
-    # Get the list of tabs from all policies/???/policy.json files
-    policy_files = []
-    tab_files = []
-    policy_folders = [
-        os.path.join(rootFileDir, "policies", x)
-        for x in os.listdir(os.path.join(rootFileDir, "policies"))
-    ]
-    for folder in policy_folders:
-        if os.path.isdir(folder):
-            for f in os.listdir(folder):
-                if f == "policy.json":
-                    policy_files.append(os.path.join(folder, f))
 
-    for f in policy_files:
-        with open(f, "r") as policy:
-            policy_data = json.load(policy)
-            # Strip off the outer object wrapper.
-            policy_data = policy_data[list(policy_data.keys())[0]]
-            # If there's a URL slug, add it to the list of tabs.
-            for tab in policy_data["tabs"]:
-                if "url_slug" in tab:
-                    tab_files.append(tab["url_slug"] + ".html")
+def readDocumentLinks(file_type: str, path: str) -> tuple[list, float]:
+    """
+    Gets the links from one document. Runs in a worker process for readDocuments.
 
-    print("Tabs found in policy files: " + str(tab_files))
+    Returns:
+        tuple: The links, and how many seconds it took.
+    """
+    started = time.perf_counter()
+    doc_links = doc_link_readers[file_type]([path, "-l"])
+    return doc_links, time.perf_counter() - started
 
-    for folder in aux_paths:
-        if os.path.isdir(folder):
-            folder_temp = {"type": "", "name": "", "url": "", "contents": []}
-
-            for f in os.listdir(folder):
-                file_temp = canon_leaf.copy()
-                file_temp["name"] = f
-                file_temp["url"] = f
-                file_temp["filename"] = os.path.join(os.path.basename(folder), f)
-                # Use the file's extension as its type.
-                file_temp["type"] = os.path.splitext(f)[1][1:]
-
-                if file_temp["type"] == "html" or file_temp["type"] == "htm":
-                    if "tabs" in folder:
-                        # Skip tabs that aren't in use.
-                        if os.path.basename(f) not in tab_files:
-                            continue
-                    try:
-                        with open(os.path.join(folder, f), encoding="utf8") as file:
-                            text = file.read()
-                            soup = BeautifulSoup(text, "html.parser")
-                    except UnicodeDecodeError:
-                        # If we have a Unicode error, skip the file.
-                        print(
-                            "Unicode error in file "
-                            + os.path.join(folder, f)
-                            + ", skipping."
-                        )
-                        continue
-                    file_temp["links"] = getHTMLLinks(soup)
-                    folder_temp["contents"].append(file_temp)
-                if file_temp["type"] == "xml":
-                    try:
-                        etree.parse(folder + "/" + f)
-                    except etree.XMLSyntaxError:
-                        # If we have broken XML, tell us and skip the file.
-                        print("Broken XML in file " + folder + "/" + f + ", skipping.")
-                        continue
-                    with open(os.path.join(folder, f), encoding="utf8") as file:
-                        text = file.read()
-                        soup = BeautifulSoup(text, "lxml")
-                    file_temp["links"] = getHTMLLinks(soup)
-                    folder_temp["contents"].append(file_temp)
-                if file_temp["type"] == "docx":
-                    file_temp["links"] = GetWordLinks.getWordLinks(
-                        [os.path.join(folder, f), "-l"]
-                    )
-                    folder_temp["contents"].append(file_temp)
-                if file_temp["type"] == "xlsx":
-                    file_temp["links"] = GetExcelLinks.getExcelLinks(
-                        [os.path.join(folder, f), "-l"]
-                    )
-                    folder_temp["contents"].append(file_temp)
-                if file_temp["type"] == "pptx":
-                    file_temp["links"] = GetPPTLinks.getPPTLinks(
-                        [os.path.join(folder, f), "-l"]
-                    )
-                    folder_temp["contents"].append(file_temp)
-                if file_temp["type"] == "pdf":
-                    file_temp["links"] = GetPDFLinks.getPDFLinks(
-                        [os.path.join(folder, f), "-l"]
+
+def readDocuments(
+    documents: list[tuple], jobs: int, timeout: Union[float, None]
+) -> list[Union[list, None]]:
+    """
+    Gets the links from documents in up to jobs processes at once.
+    Skips any file that's still going timeout seconds after we start waiting for it.
+
+    Args:
+        documents (list): (file type, path) for each document.
+        jobs (int): How many processes to use.
+        timeout (float): Seconds before we skip a file, or None for no limit.
+
+    Returns:
+        list: The links from each document, in the same order. None for files we skipped.
+    """
+    results = [None] * len(documents)
+
+    def keep(index: int, result) -> None:
+        doc_links, seconds = result
+        results[index] = doc_links
+        if Profiler.active is not None:
+            file_type, path = documents[index]
+            Profiler.active.addFile(file_type, path, os.path.getsize(path), seconds)
+
+    waiting = list(range(len(documents)))
+    while waiting:
+        # A Pool instead of a ProcessPoolExecutor, because leaving the
+        # with block stops any worker that's stuck on a file.
+        with multiprocessing.Pool(max(1, min(jobs, len(waiting)))) as pool:
+            pending = [
+                pool.apply_async(readDocumentLinks, documents[i]) for i in waiting
+            ]
+            for position, (i, result) in enumerate(zip(waiting, pending)):
+                try:
+                    keep(i, result.get(timeout))
+                except multiprocessing.TimeoutError:
+                    print(
+                        "Took more than %g seconds to read %s, skipping."
+                        % (timeout, documents[i][1])
                     )
-                    folder_temp["contents"].append(file_temp)
+                    Profiler.count("document timeouts")
+                    # Keep whatever the other workers finished, and start again
+                    # on the rest with new workers.
+                    later = zip(waiting[position + 1 :], pending[position + 1 :])
+                    waiting = []
+                    for j, other in later:
+                        if other.ready():
+                            keep(j, other.get())
+                        else:
+                            waiting.append(j)
+                    break
+            else:
+                waiting = []
+    return results
+
+
+def getAuxAltText(rootFileDir: str, backend: str = "lxml") -> list[CourseNode]:
+    """Gets alt text from auxiliary folders like tabs, info, and static."""
+    return scanAuxFolders(rootFileDir, links=False, backend=backend)[1]
 
-            # Placing all of these folders at the "chapter" level.
-            folder_temp["chapter"] = os.path.basename(folder)
-            folder_temp["name"] = os.path.basename(folder)
-            aux_links.append(folder_temp)
 
-    return aux_links
+def getAuxLinks(rootFileDir: str, backend: str = "lxml") -> list[CourseNode]:
+    """Gets links from auxiliary folders like tabs, info, and static."""
+    return scanAuxFolders(rootFileDir, images=False, backend=backend)[0]
 
 
 def getComponentInfo(
@@ -345,7 +494,8 @@ def getComponentInfo(
 ) -> dict:
     """
     Gets component information from XML files. Always gets display name.
-    For video and problem files, gets other info too, like video subtitles and problem XML.
+    For video, problem, and html components, gets whichever other details
+    the sheet needs, like video subtitles and problem XML (see component_extractors).
 
     Args:
         folder (str): The folder where the XML file is located.
@@ -356,13 +506,31 @@ def getComponentInfo(
     Returns:
         A dictionary containing the component information.
     """
-    # Try to open file.
-    try:
-        tree = etree.parse(folder + "/" + filename + ".xml")
-        root = tree.getroot()
-    except OSError:
-        # If we can't get a file, try to traverse inline XML.
+    filepath = findCourseFile(folder, filename)
+    if parse_memo is not None and filepath is not None:
+        memoized = parse_memo.get("component", filepath)
+        if memoized is not None:
+            return memoized
+
+    cache_key = "component:l%da%d:" % (args.links, args.alttext) + ",".join(
+        neededExtractors(args)
+    )
+    if parse_cache is not None and filepath is not None:
+        cached = parse_cache.get(cache_key, filepath)
+        if cached is not None:
+            if parse_memo is not None:
+                parse_memo.put("component", filepath, cached)
+            return cached
+
+    if filepath is not None:
+        kind = os.path.basename(folder)
+        with Profiler.readingFile(kind, filepath, course_source.size):
+            root = course_source.parseXML(filepath)
+        from_file = True
+    else:
+        # If there's no file, try to traverse inline XML.
         root = child
+        from_file = False
 
     temp = {
         "type": root.tag,
@@ -376,120 +544,19 @@ def getComponentInfo(
     else:
         temp["name"] = root.tag
 
-    # get video information
-    if root.tag == "video" and args.video:
-        # List of subscripts because multiple languages.
-        temp["sub"] = []
-
-        # Old-style course exports have non-blank 'sub' attributes.
-        if "sub" in root.attrib:
-            if root.attrib["sub"] != "":
-                temp["sub"] = ["subs_" + str(root.attrib["sub"]) + ".srt.sjson"]
-
-        # New-style course exports (Aug 15 2018) have a different hierarchy.
-        # Use this preferentially over the old-style formatting.
-        for va in root.iter("video_asset"):
-            for trs in va.iter("transcripts"):
-                for transcript in trs.iter("transcript"):
-                    temp["sub"].append(
-                        str(root.attrib["edx_video_id"])
-                        + "-"
-                        + str(transcript.attrib["language_code"])
-                        + ".srt"
-                    )
-            # The download URL looks a lot like the cloudfront URL.
-            # Guess we'll find out if we have a lot of courses without that.
-            for ev in va.iter("encoded_video"):
-                if ev.attrib["profile"] == "desktop_mp4":
-                    cloudfront_url = ev.attrib["url"]
-                    cloudfront_filename = str(cloudfront_url).split(".net")[-1]
-                    temp["download_url"] = "https://edx-video.net" + str(
-                        cloudfront_filename
-                    )
-
-        if len(temp["sub"]) == 0:
-            temp["sub"] = ["No subtitles found."]
-
-        if "youtube_id_1_0" in root.attrib:
-            temp["youtube"] = root.attrib["youtube_id_1_0"]
-        elif "youtube" in root.attrib:
-            # slice to remove the '1.00:' from the start of the ID
-            temp["youtube"] = root.attrib["youtube"][5:]
-        else:
-            temp["youtube"] = "No YouTube ID found."
-
-        if "edx_video_id" in root.attrib:
-            temp["edx_video_id"] = root.attrib["edx_video_id"]
-
-        # We need our original uploaded filename.
-        # It's not present in the old XML. :(
-        # In new XML, it's in a video_asset tag.
-        found_video_asset = False
-        for child in root:
-            if child.tag == "video_asset":
-                if "client_video_id" in child.attrib:
-                    found_video_asset = True
-                    # Get just filename, without host, folders, and extension.
-                    src = os.path.basename(child.attrib["client_video_id"])
-                    src = str(os.path.splitext(src)[0])
-                    if src == "":
-                        temp["upload_name"] = "No_Upload_Name_" + str(
-                            root.attrib["url_name"]
-                        )
-                    temp["upload_name"] = src
-
-                if "duration" in child.attrib:
-                    # Get duration in seconds
-                    try:
-                        duration = float(child.attrib["duration"])
-                        temp["duration"] = secToHMS(duration)
-                    except ValueError:
-                        temp["duration"] = "unknown"
-
-        # Need a placeholder if there's no video_asset tag or if it's less than informative.
-        if not found_video_asset:
-            temp["upload_name"] = "No_Upload_Name_" + str(root.attrib["url_name"])
-            temp["duration"] = "unknown"
-
     # get problem information
     if root.tag == "problem":
         if "rerandomize" in root.attrib:
             temp["rerandomize"] = root.attrib["rerandomize"]
         if "show_reset_button" in root.attrib:
             temp["show_reset_button"] = root.attrib["show_reset_button"]
-        if root.text is not None:
-            temp["inner_xml"] = root.text + "".join(
-                str(etree.tostring(e)) for e in root
-            )
-            soup = BeautifulSoup(temp["inner_xml"], "lxml")
-            temp["links"] = getHTMLLinks(soup)
-            temp["images"] = getAltText(soup)
-        else:
-            temp["inner_xml"] = "No XML."
-
-    # Right now all we get from HTML is links and images.
-    if root.tag == "html":
-        if args.links or args.alttext:
-            # Most of the time our XML will just point to a separate HTML file.
-            # In those cases, go open that file and get the links from it.
-            if root.text is None:
-                innerfilepath = os.path.join(
-                    os.path.dirname(folder),
-                    "html",
-                    (str(root.attrib["filename"]) + ".html"),
-                )
-                with open(innerfilepath, encoding="utf8") as file:
-                    text = file.read()
-                    soup = BeautifulSoup(text, "html.parser")
-            # If it's declared inline, just get the links right away.
-            else:
-                soup = BeautifulSoup(
-                    "".join(str(e) for e in root.itertext()), "html.parser"
-                )
-            if args.links:
-                temp["links"] = getHTMLLinks(soup)
-            if args.alttext:
-                temp["images"] = getAltText(soup)
+
+    # Only get the details that the sheet needs.
+    other_files = []
+    for name in neededExtractors(args):
+        extractor = component_extractors[name]
+        if root.tag == extractor["tag"]:
+            other_files.extend(extractor["function"](root, folder, args, temp))
 
     # special handlers for other xml:
     if root.tag == "drag-and-drop-v2":
@@ -504,7 +571,259 @@ def getComponentInfo(
     # Label all of them as components regardless of type.
     temp["component"] = temp["name"]
 
-    return {"contents": temp, "parent_name": temp["name"]}
+    component_info = {"contents": temp, "parent_name": temp["name"]}
+    if parse_cache is not None and from_file:
+        parse_cache.put(
+            cache_key,
+            filepath,
+            component_info,
+            other_files,
+        )
+    if parse_memo is not None and from_file:
+        parse_memo.put("component", filepath, component_info)
+
+    return component_info
+
+
+def getVideoInfo(
+    root: etree._Element, folder: str, args: argparse.Namespace, temp: dict
+) -> list[str]:
+    """
+    Gets a video's transcripts, YouTube ID, edX video ID, upload name, duration, and download URL.
+    Like all the component extractors, adds what it finds to temp,
+    and returns a list of any other files it had to read.
+
+    Args:
+        root (etree._Element): The component's XML.
+        folder (str): The folder where the component's XML file is located.
+        args (argparse.Namespace): The command line arguments passed to the script.
+        temp (dict): The component information so far.
+    """
+    # List of subscripts because multiple languages.
+    temp["sub"] = []
+
+    # Old-style course exports have non-blank 'sub' attributes.
+    if "sub" in root.attrib:
+        if root.attrib["sub"] != "":
+            temp["sub"] = ["subs_" + str(root.attrib["sub"]) + ".srt.sjson"]
+
+    # New-style course exports (Aug 15 2018) have a different hierarchy.
+    # Use this preferentially over the old-style formatting.
+    for va in root.iter("video_asset"):
+        for trs in va.iter("transcripts"):
+            for transcript in trs.iter("transcript"):
+                temp["sub"].append(
+                    str(root.attrib["edx_video_id"])
+                    + "-"
+                    + str(transcript.attrib["language_code"])
+                    + ".srt"
+                )
+        # The download URL looks a lot like the cloudfront URL.
+        # Guess we'll find out if we have a lot of courses without that.
+        for ev in va.iter("encoded_video"):
+            if ev.attrib["profile"] == "desktop_mp4":
+                cloudfront_url = ev.attrib["url"]
+                cloudfront_filename = str(cloudfront_url).split(".net")[-1]
+                temp["download_url"] = "https://edx-video.net" + str(
+                    cloudfront_filename
+                )
+
+    if len(temp["sub"]) == 0:
+        temp["sub"] = ["No subtitles found."]
+
+    if "youtube_id_1_0" in root.attrib:
+        temp["youtube"] = root.attrib["youtube_id_1_0"]
+    elif "youtube" in root.attrib:
+        # slice to remove the '1.00:' from the start of the ID
+        temp["youtube"] = root.attrib["youtube"][5:]
+    else:
+        temp["youtube"] = "No YouTube ID found."
+
+    if "edx_video_id" in root.attrib:
+        temp["edx_video_id"] = root.attrib["edx_video_id"]
+
+    # We need our original uploaded filename.
+    # It's not present in the old XML. :(
+    # In new XML, it's in a video_asset tag.
+    found_video_asset = False
+    for child in root:
+        if child.tag == "video_asset":
+            if "client_video_id" in child.attrib:
+                found_video_asset = True
+                # Get just filename, without host, folders, and extension.
+                src = os.path.basename(child.attrib["client_video_id"])
+                src = str(os.path.splitext(src)[0])
+                if src == "":
+                    temp["upload_name"] = "No_Upload_Name_" + str(
+                        root.attrib["url_name"]
+                    )
+                temp["upload_name"] = src
+
+            if "duration" in child.attrib:
+                # Get duration in seconds
+                try:
+                    duration = float(child.attrib["duration"])
+                    temp["duration"] = secToHMS(duration)
+                except ValueError:
+                    temp["duration"] = "unknown"
+
+    # Need a placeholder if there's no video_asset tag or if it's less than informative.
+    if not found_video_asset:
+        temp["upload_name"] = "No_Upload_Name_" + str(root.attrib["url_name"])
+        temp["duration"] = "unknown"
+
+    return []
+
+
+def problemInnerXML(root: etree._Element) -> Union[str, None]:
+    """Gets the XML inside a problem as a string, or None if there's no text before the first tag."""
+    if root.text is None:
+        return None
+    return root.text + "".join(str(etree.tostring(e)) for e in root)
+
+
+def getProblemXML(
+    root: etree._Element, folder: str, args: argparse.Namespace, temp: dict
+) -> list[str]:
+    """Gets the XML inside a problem, for the inner_xml column."""
+    inner_xml = problemInnerXML(root)
+    temp["inner_xml"] = inner_xml if inner_xml is not None else "No XML."
+    return []
+
+
+def getProblemMarkup(
+    root: etree._Element, folder: str, args: argparse.Namespace, temp: dict
+) -> list[str]:
+    """Gets the links and images in a problem."""
+    if root.text is None:
+        return []
+    # Don't turn the problem back into text twice.
+    inner_xml = temp.get("inner_xml") or problemInnerXML(root)
+    doc = parseMarkup(inner_xml, "xml", args.parser)
+    temp["links"] = getLinks(doc)
+    temp["images"] = getImages(doc)
+    return []
+
+
+def getHTMLMarkup(
+    root: etree._Element, folder: str, args: argparse.Namespace, temp: dict
+) -> list[str]:
+    """Gets the links and images in an html component, whichever ones we're looking for."""
+    # Most of the time our XML will just point to a separate HTML file.
+    # In those cases, go open that file and get the links from it.
+    if root.text is None:
+        innerfilepath = os.path.join(
+            os.path.dirname(folder),
+            "html",
+            (str(root.attrib["filename"]) + ".html"),
+        )
+        html_info = None
+        if parse_memo is not None:
+            html_info = parse_memo.get("html", innerfilepath)
+        if html_info is None:
+            with Profiler.readingFile("html file", innerfilepath, course_source.size):
+                text = course_source.readText(innerfilepath)
+                doc = parseMarkup(text, "html", args.parser)
+                html_info = getHTMLInfo(doc, args)
+            if parse_memo is not None:
+                parse_memo.put("html", innerfilepath, html_info)
+    # If it's declared inline, just get the links right away.
+    else:
+        doc = parseMarkup("".join(str(e) for e in root.itertext()), "html", args.parser)
+        html_info = getHTMLInfo(doc, args)
+        temp.update(html_info)
+        return []
+    temp.update(html_info)
+    return [innerfilepath]
+
+
+######################################
+# Component extractors
+#
+# Each one gets some of the details for one kind of component, and lists
+# the sheet columns those details fill. getComponentInfo only runs the ones
+# that the sheet we're writing needs (see neededExtractors).
+# Links and images also split a component into one row for each, so when
+# "rows" is True, the extractor runs whenever that kind of component is on the sheet.
+# "fields" are what the extractor adds, so projectNode can take them out again.
+######################################
+
+component_extractors = {
+    "video": {
+        "tag": "video",
+        "columns": ["sub"] + video_keys,
+        "rows": False,
+        "fields": ["sub"] + video_keys,
+        "function": getVideoInfo,
+    },
+    "problem_xml": {
+        "tag": "problem",
+        "columns": ["inner_xml"],
+        "rows": False,
+        "fields": ["inner_xml"],
+        "function": getProblemXML,
+    },
+    "problem_markup": {
+        "tag": "problem",
+        "columns": ["href", "linktext", "src", "alt"],
+        "rows": True,
+        "fields": ["links", "images"],
+        "function": getProblemMarkup,
+    },
+    "html_markup": {
+        "tag": "html",
+        "columns": ["href", "linktext", "src", "alt"],
+        "rows": False,
+        "fields": ["links", "images"],
+        "function": getHTMLMarkup,
+    },
+}
+
+# neededExtractors results, by which report options are on.
+needed_extractors = {}
+
+
+def neededExtractors(args: argparse.Namespace) -> tuple[str]:
+    """
+    Gets the names of the component extractors that a sheet with these arguments needs,
+    in the order they're listed in component_extractors.
+    """
+    key = (args.all, args.problems, args.html, args.video, args.links, args.alttext)
+    if key in needed_extractors:
+        return needed_extractors[key]
+
+    columns = set(sheetFieldnames(args))
+    row_types = set()
+    for types in sheetPasses(args):
+        row_types.update(types if types is not None else leaf_nodes)
+
+    needed = tuple(
+        name
+        for name, extractor in component_extractors.items()
+        if columns.intersection(extractor["columns"])
+        or (extractor["rows"] and extractor["tag"] in row_types)
+    )
+    needed_extractors[key] = needed
+    return needed
+
+
+def getHTMLInfo(doc, args: argparse.Namespace) -> dict:
+    """
+    Gets the links and images we want from an html component.
+
+    Args:
+        doc: The component's HTML, from parseMarkup.
+        args (argparse.Namespace): The command line arguments passed to the script.
+
+    Returns:
+        dict: "links" and "images" lists, if we're looking for them.
+    """
+    html_info = {}
+    if args.links:
+        html_info["links"] = getLinks(doc)
+    if args.alttext:
+        html_info["images"] = getImages(doc)
+    return html_info
 
 
 def drillDown(
@@ -523,12 +842,9 @@ def drillDown(
         dict: A dictionary containing the component information.
 
     """
-    # Try to open file.
-    try:
-        tree = etree.parse(os.path.join(folder, (filename + ".xml")))
-        root = tree.getroot()
-    except IOError:
-        # If we can't get a file, try to traverse inline XML.
+    filepath = findCourseFile(folder, filename)
+    if filepath is None:
+        # If there's no file, try to traverse inline XML.
         ddinfo = getXMLInfo(folder, root, args)
         if ddinfo:
             return ddinfo
@@ -539,129 +855,299 @@ def drillDown(
             )
             return {"contents": [], "parent_name": "", "found_file": False}
 
+    root = parseOutlineFile(filepath)
     return getXMLInfo(folder, root, args)
 
 
-def getXMLInfo(folder: str, root: etree._Element, args: argparse.Namespace) -> dict:
-    # We need lists of container nodes and leaf nodes so we can tell
-    # whether we have to do more recursion.
-    leaf_nodes = [
-        "discussion",
-        "done",
-        "drag-and-drop-v2",
-        "html",
-        "imageannotation",
-        "library_content",
-        "lti",
-        "lti_consumer",
-        "pb-dashboard",  # This is currently unique to HarvardX DataWise
-        "poll",
-        "problem",
-        "survey",
-        "textannotation",
-        "ubcpi",
-        "video",
-        "videoannotation",
-        "word_cloud",
-    ]
-    branch_nodes = [
-        "course",
-        "chapter",
-        "sequential",
-        "vertical",
-        "split_test",
-        "conditional",
-    ]
+def indexCourseFiles(rootFileDir: str) -> dict:
+    """
+    Lists the XML files in each folder of a course export, so we can tell which
+    components have their own file and which are inline without trying to open them.
+
+    Args:
+        rootFileDir (str): The directory where the course.xml file is located.
+
+    Returns:
+        dict: The path to each XML file, by (folder name, filename without .xml).
+            The folder name is the tag, and the filename is the url_name.
+    """
+    return course_source.xmlIndex(rootFileDir)
+
+
+def findCourseFile(folder: str, filename: str) -> Union[str, None]:
+    """
+    Finds the XML file for an outline element or component.
+
+    Args:
+        folder (str): The folder the file would be in, named after the element's tag.
+        filename (str): The file's name without the .xml extension. Normally the url_name.
+
+    Returns:
+        str: The path to the file, or None if there isn't one (like for inline XML).
+    """
+    if course_files is None:
+        # Not reading a whole course, so there's no index.
+        filepath = os.path.join(folder, filename + ".xml")
+        return filepath if course_source.isfile(filepath) else None
+    return course_files.get((os.path.basename(folder), filename))
 
-    contents = []
 
+def parseOutlineFile(filepath: str) -> etree._Element:
+    """
+    Parses an outline file (course, chapter, sequential, vertical...), using the parse cache if we have one.
+    We only cache files whose children are all pointers to other files,
+    so that we can rebuild them without losing anything.
+
+    Args:
+        filepath (str): The path to the XML file.
+
+    Returns:
+        etree._Element: The root element of the file. Shared by everything that asks for the same file, so don't change it.
+
+    Raises:
+        OSError: If the file can't be opened.
+    """
+    if parse_memo is not None:
+        root = parse_memo.get("outline", filepath)
+        if root is not None:
+            return root
+
+    root = None
+    if parse_cache is not None:
+        cached = parse_cache.get("outline", filepath)
+        if cached is not None:
+            root = etree.Element(cached["tag"], cached["attrib"])
+            for tag, attrib in cached["children"]:
+                etree.SubElement(root, tag, attrib)
+
+    if root is None:
+        root = readOutlineFile(filepath)
+
+    if parse_memo is not None:
+        parse_memo.put("outline", filepath, root)
+    return root
+
+
+def readOutlineFile(filepath: str) -> etree._Element:
+    """Parses an outline file and adds it to the parse cache if we have one."""
+    kind = os.path.basename(os.path.dirname(filepath))
+    with Profiler.readingFile(kind, filepath, course_source.size):
+        root = course_source.parseXML(filepath)
+
+    if parse_cache is not None:
+        pointers_only = all(
+            isinstance(child.tag, str)
+            and len(child) == 0
+            and (child.text is None or child.text.strip() == "")
+            for child in root
+        )
+        if pointers_only:
+            parse_cache.put(
+                "outline",
+                filepath,
+                {
+                    "tag": root.tag,
+                    "attrib": dict(root.attrib),
+                    "children": [[child.tag, dict(child.attrib)] for child in root],
+                },
+            )
+
+    return root
+
+
+# We need lists of container nodes and leaf nodes so we can tell
+# whether we have to do more recursion.
+leaf_nodes = [
+    "discussion",
+    "done",
+    "drag-and-drop-v2",
+    "html",
+    "imageannotation",
+    "library_content",
+    "lti",
+    "lti_consumer",
+    "pb-dashboard",  # This is currently unique to HarvardX DataWise
+    "poll",
+    "problem",
+    "survey",
+    "textannotation",
+    "ubcpi",
+    "video",
+    "videoannotation",
+    "word_cloud",
+]
+branch_nodes = [
+    "course",
+    "chapter",
+    "sequential",
+    "vertical",
+    "split_test",
+    "conditional",
+]
+
+
+def getXMLInfo(folder: str, root: etree._Element, args: argparse.Namespace) -> dict:
     # Some items are created without a display name; use their tag name instead.
     if "display_name" in root.attrib:
         display_name = root.attrib["display_name"]
     else:
         display_name = root.tag
 
-    for index, child in enumerate(root):
-        temp = {
-            "index": index,
-            "type": child.tag,
-            "name": "",
-            "url": "",
-            "filename": "",
-            "contents": [],
-            "links": [],
-            "images": [],
-            "sub": [],
-        }
-
-        # get display_name or use placeholder
-        if "display_name" in child.attrib:
-            temp["name"] = child.attrib["display_name"]
-        else:
-            temp["name"] = child.tag + str(index)
-            temp["tempname"] = True
-
-        # get url_name but there are no placeholders
-        # Note that even some inline XML have url_names.
-        if "url_name" in child.attrib:
-            temp["url"] = child.attrib["url_name"]
-            temp["filename"] = child.attrib["url_name"]
-        else:
-            temp["url"] = None
-
-        # In the future: check to see whether this child is a pointer tag or inline XML.
-        nextFile = os.path.join(os.path.dirname(folder), child.tag)
-        if child.tag in branch_nodes:
-            child_info = drillDown(nextFile, str(temp["url"]), child, args)
-            temp["contents"] = child_info["contents"]
-        elif child.tag in leaf_nodes:
-            child_info = getComponentInfo(nextFile, str(temp["url"]), child, args)
-            # For leaf nodes, add item info to the dict
-            # instead of adding a new contents entry
-            temp.update(child_info["contents"])
-            del temp["contents"]
-        elif child.tag in skip_tags:
-            child_info = {"contents": False, "parent_name": child.tag}
-            del temp["contents"]
-        else:
-            sys.exit("New tag type found: " + child.tag)
+    # Chapters don't depend on each other, so we can read them in separate processes.
+    if root.tag == "course" and args.jobs > 1:
+        contents = getChildrenInParallel(folder, root, args)
+    else:
+        contents = [
+            getChildInfo(folder, index, child, args) for index, child in enumerate(root)
+        ]
 
-        # If the display name was temporary, replace it.
-        if "tempname" in temp:
-            temp["name"] = child_info["parent_name"]
-            del temp["tempname"]
+    return {"contents": contents, "parent_name": display_name, "found_file": True}
 
-        # We need not only a name, but a custom key with that name.
-        temp[temp["type"]] = temp["name"]
 
-        contents.append(temp)
+def getChildInfo(
+    folder: str, index: int, child: etree._Element, args: argparse.Namespace
+) -> CourseNode:
+    """
+    Gets the information for one child of an outline element,
+    drilling down through its own children if it has any.
 
-    return {"contents": contents, "parent_name": display_name, "found_file": True}
+    Args:
+        folder (str): The folder where the parent's XML file is located.
+        index (int): The child's position within its parent.
+        child (etree._Element): The child element.
+        args (argparse.Namespace): The command line arguments passed to the script.
+
+    Returns:
+        CourseNode: The course structure for this child.
+    """
+    temp = CourseNode(
+        child.tag,
+        index=index,
+        filename="",
+        links=no_items,
+        images=no_items,
+        sub=no_items,
+    )
+
+    # get display_name or use placeholder
+    tempname = False
+    if "display_name" in child.attrib:
+        temp.name = child.attrib["display_name"]
+    else:
+        temp.name = child.tag + str(index)
+        tempname = True
+
+    # get url_name but there are no placeholders
+    # Note that even some inline XML have url_names.
+    if "url_name" in child.attrib:
+        temp.url = child.attrib["url_name"]
+        temp.filename = child.attrib["url_name"]
+
+    # In the future: check to see whether this child is a pointer tag or inline XML.
+    nextFile = os.path.join(os.path.dirname(folder), child.tag)
+    if child.tag in branch_nodes:
+        child_info = drillDown(nextFile, str(temp.url), child, args)
+        temp.contents = child_info["contents"]
+        # Section and unit names repeat on every row under them.
+        temp.name = sys.intern(temp.name)
+    elif child.tag in leaf_nodes:
+        child_info = getComponentInfo(nextFile, str(temp.url), child, args)
+        # For leaf nodes, add item info to the node
+        # instead of adding a new contents entry
+        temp.update(child_info["contents"])
+    elif child.tag in skip_tags:
+        child_info = {"contents": False, "parent_name": child.tag}
+    else:
+        sys.exit("New tag type found: " + child.tag)
 
+    # If the display name was temporary, replace it.
+    if tempname:
+        temp.name = child_info["parent_name"]
 
-# Gets the full set of data headers for the course.
-# flat_course is a list of dictionaries.
-def getAllKeys(flat_course: list[dict], key_set: set = set()) -> set:
-    for row in flat_course:
-        for key in row:
-            key_set.add(key)
+    return temp
 
-    return key_set
 
+def getChildrenInParallel(
+    folder: str, root: etree._Element, args: argparse.Namespace
+) -> list[CourseNode]:
+    """
+    Runs getChildInfo on each child of root in a pool of args.jobs processes.
+    Results come back in courseware order, same as a serial run.
+
+    Args:
+        folder (str): The folder where root's XML file is located.
+        root (etree._Element): The element whose children we're reading. Normally the course.
+        args (argparse.Namespace): The command line arguments passed to the script.
 
-# Ensure that all dicts have the same entries, adding blanks if needed.
-# flat_course is a list of dictionaries.
-def fillInRows(flat_course: list[dict]) -> list[dict]:
-    # Get a list of all dict keys from the entire nested structure and store it in a set.
-    key_set = getAllKeys(flat_course)
+    Returns:
+        list[CourseNode]: The course structure for each child.
+    """
+    # lxml elements can't be sent to other processes, so send them as text.
+    children = [etree.tostring(child, with_tail=False) for child in root]
+    cache_folder = parse_cache.folder if parse_cache is not None else None
+
+    contents = []
+    with ProcessPoolExecutor(
+        max_workers=args.jobs,
+        initializer=startWorker,
+        initargs=(
+            cache_folder,
+            course_files,
+            course_source,
+            Profiler.active is not None,
+        ),
+    ) as executor:
+        results = executor.map(
+            getChildInfoWorker,
+            itertools.repeat(folder),
+            range(len(children)),
+            children,
+            itertools.repeat(args),
+        )
+        for temp, cache_updates, memo_counts, profile in results:
+            contents.append(temp)
+            if parse_cache is not None:
+                parse_cache.addUpdates(cache_updates)
+            parse_memo.addCounts(memo_counts)
+            if Profiler.active is not None:
+                Profiler.active.merge(profile)
+
+    return contents
+
+
+def startWorker(
+    cache_folder: Union[str, None],
+    file_index: dict,
+    source: CourseFolder,
+    profiling: bool = False,
+) -> None:
+    """Sets up a process for getChildrenInParallel."""
+    global parse_cache, parse_memo, course_files, course_source
+    course_files = file_index
+    course_source = source
+    Profiler.startWorker(profiling)
+    # Each process keeps its own memo.
+    parse_memo = ParseMemo()
+    if cache_folder is None:
+        parse_cache = None
+    elif parse_cache is None:
+        # Processes that weren't forked from the parent need their own copy.
+        parse_cache = ParseCache(cache_folder)
+    else:
+        # Forked processes already have one. Don't count the parent's work twice.
+        parse_cache.takeUpdates()
 
-    # Iterate through the list and add blank entries for any keys in the set that aren't present.
-    for row in flat_course:
-        for key in key_set:
-            if key not in row:
-                row[key] = ""
 
-    return flat_course
+def getChildInfoWorker(
+    folder: str, index: int, child_xml: bytes, args: argparse.Namespace
+) -> tuple[CourseNode, Union[dict, None], dict, Union[dict, None]]:
+    """
+    Runs getChildInfo in a worker process and returns its result,
+    any new cache entries, the memo's hit and miss counts, and the profile if we're profiling.
+    """
+    temp = getChildInfo(folder, index, etree.fromstring(child_xml), args)
+    cache_updates = parse_cache.takeUpdates() if parse_cache is not None else None
+    return temp, cache_updates, parse_memo.takeCounts(), Profiler.takeWorkerReport()
 
 
 def makeURL(
@@ -713,220 +1199,331 @@ def courseFlattener(
     org: str,
     nickname: str,
     run: str,
-    new_row: dict = {},
-) -> list[dict]:
+) -> Iterator[CourseRow]:
     """
-    Flattens a nested course structure into a list of dictionaries.
-    Each dictionary is a single component, with the order of the list
+    Flattens a nested course structure into rows, one at a time.
+    Each row is a single component, with the order of the rows
     matching the order of the courseware.
+    Components with several transcripts, links, or images get one row for each.
 
     Args:
-        course_dict (dict): A dictionary representing the course structure at the current level of recursion.
+        course_dict (dict): A dictionary representing the course structure.
         parent_url (str): The URL of the parent component, used for constructing URLs for verticals and components.
         org (str): The organization code for the course, like HarvardX
         nickname (str): The course nickname, like CS109x
         run (str): The course run, like 1T2025
-        new_row (dict, optional): A dictionary representing the current row of data being built up through recursion.
-    
-    Returns:
-        list[dict]: A list of dictionaries, where each dictionary represents a single component in the course.
-    """
-    flat_course = []
-    temp_row = new_row.copy()
-
-    # Add all the data from the current level to the current row except 'contents'.
-    # For the "url" key, turn it into an actual URL.
-    for key in course_dict:
-        if key == "url":
-            if "filename" in course_dict:
-                temp_row["url"] = makeURL(
-                    course_dict["type"],
-                    course_dict["filename"],
-                    parent_url,
-                    org,
-                    nickname,
-                    run,
-                )
-            else:
-                temp_row["url"] = makeURL(
-                    course_dict["type"],
-                    course_dict["url"],
-                    parent_url,
-                    org,
-                    nickname,
-                    run,
-                )
-        elif key != "contents":
-            temp_row[key] = course_dict[key]
-
-    # If the current structure has "contents", we're not at the bottom of the hierarchy.
-    if "contents" in course_dict:
-        # Go down into each item in "contents" and add its contents to the course.
-        for entry in course_dict["contents"]:
-            temp = courseFlattener(entry, temp_row["url"], org, nickname, run, temp_row)
-            if temp:
-                flat_course = flat_course + temp
-        return flat_course
 
-    # If there are no contents, we're at the bottom.
-    else:
-        # Don't include the wiki and certain other items.
-        if temp_row["type"] not in skip_tags:
-            # If there are links, images, or transcripts in this row,
-            # break it into multiple entries.
-            if len(temp_row["sub"]) > 0:
-                transcript_rows = []
-                for sub in temp_row["sub"]:
-                    transcript_breakout = temp_row.copy()
-                    transcript_breakout["sub"] = sub
-                    transcript_rows.append(transcript_breakout)
-                return transcript_rows
-            if len(temp_row["links"]) > 0:
-                link_rows = []
-                for link in temp_row["links"]:
-                    link_breakout = temp_row.copy()
-                    link_breakout["href"] = link["href"]
-                    link_breakout["linktext"] = link["text"]
-                    link_rows.append(link_breakout)
-                return link_rows
-            if len(temp_row["images"]) > 0:
-                img_rows = []
-                for img in temp_row["images"]:
-                    img_breakout = temp_row.copy()
-                    img_breakout["src"] = img["src"]
-                    img_breakout["alt"] = img["alt"]
-                    img_rows.append(img_breakout)
-                return img_rows
-            else:
-                return [temp_row]
-        else:
-            return []
+    Yields:
+        CourseRow: One row of the spreadsheet. Only valid until the next row is requested,
+            so write it out or copy it before moving on.
+    """
+    course_row = CourseRow()
+    course_row.type = course_dict["type"]
+    course_row.url = makeURL(
+        course_dict["type"], course_dict["url"], parent_url, org, nickname, run
+    )
 
+    for entry in course_dict["contents"]:
+        yield from nodeFlattener(entry, course_row.url, org, nickname, run, course_row)
 
-def writeCourseSheet(
-    rootFileDir: str, rootFileName: str, course_dict: dict, args: argparse.Namespace
-):
+
+def nodeFlattener(
+    node: CourseNode,
+    parent_url: str,
+    org: str,
+    nickname: str,
+    run: str,
+    parent_row: CourseRow,
+) -> Iterator[CourseRow]:
     """
-    Takes in a course structure, flattens it, and writes it to a TSV file.
+    Recursion function for courseFlattener.
 
     Args:
-        rootFileDir (str): The directory where the course.xml file is located.
-        rootFileName (str): The name of the course.xml file (which can theoretically be something else)
-        course_dict (dict): A dictionary representing the course structure.
-        args (argparse.Namespace): The command line arguments passed to the script.
+        node (CourseNode): The part of the course structure at the current level of recursion.
+        parent_url (str): The URL of the parent component, used for constructing URLs for verticals and components.
+        org (str): The organization code for the course, like HarvardX
+        nickname (str): The course nickname, like CS109x
+        run (str): The course run, like 1T2025
+        parent_row (CourseRow): The row built up through recursion so far.
+
+    Yields:
+        CourseRow: One row of the spreadsheet. Only valid until the next row is requested.
     """
-    course_name = course_dict["name"]
+    temp_row = parent_row.copy()
+
+    # Add all the data from the current level to the current row.
+    # For the "url" column, turn it into an actual URL.
+    for key, value in node.items():
+        if key in row_column_set:
+            setattr(temp_row, key, value)
+    temp_row.url = makeURL(
+        node.type,
+        node.filename if node.filename is not None else node.url,
+        parent_url,
+        org,
+        nickname,
+        run,
+    )
+
+    # If the current node has contents, we're not at the bottom of the hierarchy.
+    if node.contents is not None:
+        # Go down into each item in contents and add its contents to the course.
+        for entry in node.contents:
+            yield from nodeFlattener(entry, temp_row.url, org, nickname, run, temp_row)
+        return
+
+    # If there are no contents, we're at the bottom.
+    # Don't include the wiki and certain other items.
+    if node.type in skip_tags:
+        return
+
+    # If there are links, images, or transcripts in this row,
+    # break it into multiple entries. This row is our own copy,
+    # so we can just change it for each one.
+    if node.sub:
+        for sub in node.sub:
+            temp_row.sub = sub
+            yield temp_row
+    elif node.links:
+        for link in node.links:
+            temp_row.href = link["href"]
+            temp_row.linktext = link["text"]
+            yield temp_row
+    elif node.images:
+        for img in node.images:
+            temp_row.src = img["src"]
+            temp_row.alt = img["alt"]
+            yield temp_row
+    else:
+        yield temp_row
+
+
+def sheetFieldnames(args: argparse.Namespace) -> list[str]:
+    """Gets the columns for a course sheet with these arguments."""
+    fieldnames = [
+        "chapter",
+        "sequential",
+        "vertical",
+        "component",
+        "type",
+        "url",
+        "filename",
+    ]
+
+    # Include the XML if we're dealing with problems
+    if args.problems:
+        fieldnames.append("inner_xml")
+    # Include link data if we're dealing with links
     if args.links:
-        course_name += " Links"
+        fieldnames = fieldnames + ["href", "linktext"]
+    # Include alt text data if we're dealing with images
     if args.alttext:
-        course_name += " Images"
-    course_name += ".tsv"
+        fieldnames = fieldnames + ["src", "alt"]
+    # Include video data if we're dealing with videos
+    if args.video:
+        fieldnames = fieldnames + [
+            "duration",
+            "sub",
+            "youtube",
+            "edx_video_id",
+            "upload_name",
+            "download_url",
+        ]
 
-    outFileName = args.o if args.o else course_name
+    return fieldnames
 
-    # Create a "csv" file with tabs as delimiters
-    with open(
-        os.path.join(rootFileDir, outFileName), "w", newline="", encoding="utf-8"
-    ) as outputfile:
-        fieldnames = [
-            "chapter",
-            "sequential",
-            "vertical",
-            "component",
-            "type",
-            "url",
-            "filename",
-        ]
 
-        # Include the XML if we're dealing with problems
-        if args.problems:
-            fieldnames.append("inner_xml")
-        # Include link data if we're dealing with links
-        if args.links:
-            fieldnames = fieldnames + ["href", "linktext"]
-        # Include alt text data if we're dealing with images
-        if args.alttext:
-            fieldnames = fieldnames + ["src", "alt"]
-        # Include video data if we're dealing with videos
-        if args.video:
-            fieldnames = fieldnames + [
-                "duration",
-                "sub",
-                "youtube",
-                "edx_video_id",
-                "upload_name",
-                "download_url",
-            ]
+def sheetRows(
+    rootFileName: str, course_dict: dict, args: argparse.Namespace
+) -> Iterator[CourseRow]:
+    """
+    Gets the rows for a course sheet with these arguments, in order.
 
-        writer = csv.DictWriter(
-            outputfile, delimiter="\t", fieldnames=fieldnames, extrasaction="ignore"
-        )
-        writer.writeheader()
+    Args:
+        rootFileName (str): The name of the course.xml file (which can theoretically be something else)
+        course_dict (dict): A dictionary representing the course structure.
+        args (argparse.Namespace): The command line arguments passed to the script.
 
-        spreadsheet = fillInRows(
+    Yields:
+        CourseRow: One row of the sheet. Only valid until the next row is requested.
+    """
+    for types in sheetPasses(args):
+        yield from passRows(
             courseFlattener(
                 course_dict,
                 os.path.basename(rootFileName),
                 course_dict["org"],
                 course_dict["nickname"],
                 course_dict["url"],
-            )
+            ),
+            types,
+            args,
         )
-        if not spreadsheet:
-            return
-        for index, row in enumerate(spreadsheet):
-            for key in row:
-                spreadsheet[index][key] = spreadsheet[index][key]
-        printable = []
 
-        if args.all:
-            printable = spreadsheet
+
+def sheetPasses(args: argparse.Namespace) -> list:
+    """
+    Gets which component types to print, in order.
+    Each entry is one pass through the course. None means everything.
+    """
+    passes = []
+    if args.all:
+        passes.append(None)
+    else:
+        if args.links:
+            passes.append(["html", "problem", "xml", "docx", "pptx", "xlsx", "pdf"])
+        if args.alttext:
+            passes.append(["html", "problem", "xml"])
+        if args.html:
+            passes.append(["html"])
+        if args.video:
+            passes.append(["video"])
+        if args.problems:
+            passes.append(["problem"])
+    return passes
+
+
+def passRows(
+    rows: Iterator[CourseRow], types: Union[list, None], args: argparse.Namespace
+) -> Iterator[CourseRow]:
+    """Picks out the rows for one pass from sheetPasses."""
+    for row in rows:
+        if types is not None and row.type not in types:
+            continue
+        # If we're printing links, skip entries with no links.
+        if args.links:
+            if row.href != "":
+                yield row
+        # If we're printing alt text, skip entries with no images.
+        elif args.alttext:
+            if row.src != "":
+                yield row
         else:
-            if args.links:
-                printable += [
-                    row
-                    for row in spreadsheet
-                    if row["type"]
-                    in ["html", "problem", "xml", "docx", "pptx", "xlsx", "pdf"]
-                ]
-            if args.alttext:
-                printable += [
-                    row
-                    for row in spreadsheet
-                    if row["type"] in ["html", "problem", "xml"]
-                ]
-            if args.html:
-                printable += [row for row in spreadsheet if row["type"] == "html"]
-            if args.video:
-                printable += [row for row in spreadsheet if row["type"] == "video"]
-            if args.problems:
-                printable += [row for row in spreadsheet if row["type"] == "problem"]
-
-        for row in printable:
-            # If we're printing links, skip entries with no links.
-            # Checking if "href" attrib exists. Case: course has no links at all.
-            if args.links:
-                if "href" in row:
-                    if row["href"] != "":
-                        writer.writerow(row)
-            # If we're printing alt text, skip entries with no images.
-            # Checking if "src" attrib exists. Case: course has no images at all.
-            elif args.alttext:
-                if "src" in row:
-                    if row["src"] != "":
-                        writer.writerow(row)
-            else:
-                writer.writerow(row)
+            yield row
+
+
+def writeCourseSheet(
+    outputDir: str, rootFileName: str, course_dict: dict, args: argparse.Namespace
+):
+    """
+    Takes in a course structure, flattens it, and writes it to a TSV file.
+    Rows go straight from the flattener to the file, so we never hold the whole sheet in memory.
+
+    Args:
+        outputDir (str): The directory to put the sheet in. Normally the course folder.
+        rootFileName (str): The name of the course.xml file (which can theoretically be something else)
+        course_dict (dict): A dictionary representing the course structure.
+        args (argparse.Namespace): The command line arguments passed to the script.
+    """
+    outFileName = sheetFileName(course_dict, args)
+
+    # Create a "csv" file with tabs as delimiters
+    with open(
+        os.path.join(outputDir, outFileName), "w", newline="", encoding="utf-8"
+    ) as outputfile:
+        # Missing keys get written as blanks.
+        writer = csv.DictWriter(
+            outputfile,
+            delimiter="\t",
+            fieldnames=sheetFieldnames(args),
+            extrasaction="ignore",
+        )
+        writer.writeheader()
+
+        found_rows = False
+        for row in sheetRows(rootFileName, course_dict, args):
+            found_rows = True
+            writer.writerow(row)
+
+        if not found_rows:
+            return
 
         print("Spreadsheet created for " + course_dict["name"] + ".")
         print("Location: " + outFileName)
 
 
-# Main function
-def Make_Course_Sheet(args=["-h"]):
-    print("Creating course sheet")
+def sheetFileName(course_dict: dict, args: argparse.Namespace) -> str:
+    """Gets the sheet's filename: the -o argument, or one based on the course name."""
+    if args.o:
+        return args.o
+    course_name = course_dict["name"]
+    if args.links:
+        course_name += " Links"
+    if args.alttext:
+        course_name += " Images"
+    return course_name + ".tsv"
 
-    # Handle arguments and flags
+
+def courseLines(course_dict: dict) -> Iterator[dict]:
+    """
+    Yields the course and every item in it as separate dictionaries, in courseware order.
+    Each one gets an "id" (its line number, starting at 0) and the id of its "parent",
+    instead of a "contents" list.
+    """
+    root = {key: value for key, value in course_dict.items() if key != "contents"}
+    root["id"] = 0
+    root["parent"] = None
+    yield root
+    yield from nodeLines(course_dict["contents"], 0, 1)
+
+
+def nodeLines(nodes: list, parent_id: int, next_id: int) -> Iterator[dict]:
+    """
+    Yields lines for courseLines: each node in a list and everything inside it.
+
+    Args:
+        nodes (list): The nodes, all children of the same parent.
+        parent_id (int): The id of their parent.
+        next_id (int): The id for the first node.
+    """
+    # Stack of (parent id, iterator over that parent's remaining contents)
+    stack = [(parent_id, iter(nodes))]
+    while stack:
+        parent_id, entries = stack[-1]
+        node = next(entries, None)
+        if node is None:
+            stack.pop()
+            continue
+        line = dict(node.items())
+        line["id"] = next_id
+        line["parent"] = parent_id
+        yield line
+        if node.contents is not None:
+            stack.append((next_id, iter(node.contents)))
+        next_id += 1
+
+
+def writeCourseJSON(outputDir: str, course_dict: dict, style: str = "pretty") -> None:
+    """
+    Saves the course structure in the course folder.
+    Writes straight to the file instead of building the whole thing as one string first.
+
+    Args:
+        outputDir (str): The directory to put the file in. Normally the course folder.
+        course_dict (dict): A dictionary representing the course structure.
+        style (str): "pretty" or "compact" for course.json, "lines" for course.jsonl, or "none" to skip it.
+    """
+    if style == "none":
+        return
+
+    if style == "lines":
+        with open(os.path.join(outputDir, "course.jsonl"), "w") as course_json:
+            for line in courseLines(course_dict):
+                course_json.write(json.dumps(line))
+                course_json.write("\n")
+        return
+
+    with open(os.path.join(outputDir, "course.json"), "w") as course_json:
+        if style == "compact":
+            json.dump(
+                course_dict, course_json, separators=(",", ":"), default=nodeToJSON
+            )
+        else:
+            json.dump(course_dict, course_json, indent=4, default=nodeToJSON)
+
+
+def makeArgumentParser() -> argparse.ArgumentParser:
+    """Makes the parser for our command line options. HXLiveTools uses it too."""
     parser = argparse.ArgumentParser(usage=instructions, add_help=False)
     parser.add_argument("--help", "-h", action="store_true")
     parser.add_argument("-all", action="store_true")
@@ -936,16 +1533,39 @@ def Make_Course_Sheet(args=["-h"]):
     parser.add_argument("-links", action="store_true")
     parser.add_argument("-alttext", action="store_true")
     parser.add_argument("-o", action="store")
+    parser.add_argument("-cache", action="store_true")
+    parser.add_argument("-doccache", action="store")
+    parser.add_argument("-doccachesize", type=float, default=default_document_cache_mb)
+    parser.add_argument("-jobs", "--jobs", type=int, default=1)
+    parser.add_argument("-docjobs", type=int, default=1)
+    parser.add_argument("-doctimeout", type=float, default=None)
+    parser.add_argument("-parser", choices=["lxml", "soup"], default="lxml")
+    parser.add_argument(
+        "-json", choices=["pretty", "compact", "lines", "none"], default="pretty"
+    )
+    parser.add_argument("-batch", action="store_true")
+    parser.add_argument("-stream", action="store_true")
+    parser.add_argument("-sqlite", action="store")
+    parser.add_argument("-profile", "--profile", action="store_true")
     parser.add_argument("file_names", nargs="*")
+    return parser
 
-    # "extra" will help us deal with out-of-order arguments.
-    args, extra = parser.parse_known_args(args)
 
-    print("Arguments:")
-    print(args, extra)
+def parseArguments(args: list) -> tuple[argparse.Namespace, list]:
+    """
+    Parses command line arguments and sorts out which options are compatible.
 
-    if args.help:
-        sys.exit(instructions)
+    Args:
+        args (list): The command line arguments, argv-style.
+
+    Returns:
+        A tuple containing the parsed arguments and any extra (out-of-order) arguments.
+    """
+    # Handle arguments and flags
+    parser = makeArgumentParser()
+
+    # "extra" will help us deal with out-of-order arguments.
+    args, extra = parser.parse_known_args(args)
 
     # Do video by default. Don't do it when we're doing other stuff,
     # unless someone intentionally turned it on.
@@ -961,6 +1581,15 @@ def Make_Course_Sheet(args=["-h"]):
     elif args.alttext:
         args.problems = args.html = args.all = args.video = args.links = False
 
+    # Documents read in other processes always get a time limit.
+    if args.docjobs > 1 and args.doctimeout is None:
+        args.doctimeout = default_doc_timeout
+
+    return args, extra
+
+
+def getFileNames(args: argparse.Namespace, extra: list) -> list[str]:
+    """Expands wildcards in the file arguments and quits if nothing is found."""
     # Replace arguments with wildcards with their expansion.
     # If a string does not contain a wildcard, glob will return it as is.
     # Mostly important if we run this on Windows systems.
@@ -978,49 +1607,868 @@ def Make_Course_Sheet(args=["-h"]):
     if file_names == []:
         sys.exit("No file or directory found by that name.")
 
-    # Get the course.xml file and root directory
-    for name in file_names:
-        rootFileDir = ""
-        if os.path.isdir(name):
-            if os.path.exists(os.path.join(name, "course.xml")):
-                rootFileDir = name
-        else:
-            if "course.xml" in name:
-                rootFileDir = os.path.dirname(name)
+    return file_names
+
+
+def getRootFileDir(name: str) -> str:
+    """Gets the course folder from either a course folder or its course.xml file."""
+    rootFileDir = ""
+    if os.path.isdir(name):
+        if os.path.exists(os.path.join(name, "course.xml")):
+            rootFileDir = name
+    else:
+        if "course.xml" in name:
+            rootFileDir = os.path.dirname(name)
+    return rootFileDir
+
+
+def isCourse(name: str) -> bool:
+    """Checks whether a path is a course folder, a course.xml file, or a .tar.gz export."""
+    if isCourseArchive(name):
+        return True
+    if os.path.isdir(name):
+        return os.path.exists(os.path.join(name, "course.xml"))
+    # A course.xml in the current folder has "" for its course folder.
+    return "course.xml" in name and os.path.isfile(name)
+
+
+def openCourse(name: str, args: argparse.Namespace) -> tuple[str, str]:
+    """
+    Gets ready to read a course from a course folder, a course.xml file, or a .tar.gz export.
+    Call closeCourse when done.
+
+    Args:
+        name (str): The folder, course.xml file, or tarball.
+        args (argparse.Namespace): The command line arguments passed to the script.
+
+    Returns:
+        tuple: The directory where the course.xml file is located, and the directory to write our files to.
+            For tarballs, the first is a path inside the tarball, and the second is the tarball's folder.
+    """
+    global course_source, document_cache
+    if args.links and (args.cache or args.doccache):
+        document_cache = DocumentCache(
+            args.doccache or defaultDocumentCachePath(), version, args.doccachesize
+        )
+
+    if isCourseArchive(name):
+        print("Reading " + name)
+        # Only keep documents if we're going to look for links in them.
+        course_source = CourseArchive(name, keep_documents=args.links)
+        return course_source.rootFileDir(), os.path.dirname(name)
+
+    course_source = CourseFolder()
+    rootFileDir = getRootFileDir(name)
+    return rootFileDir, rootFileDir
+
+
+def closeCourse() -> None:
+    """Cleans up after openCourse."""
+    global course_source, document_cache
+    course_source.close()
+    course_source = CourseFolder()
+
+    if document_cache is not None:
+        print(
+            "Document cache: reused "
+            + str(document_cache.hits)
+            + " documents, read "
+            + str(document_cache.misses)
+            + "."
+        )
+        Profiler.count("document cache hits", document_cache.hits)
+        Profiler.count("document cache misses", document_cache.misses)
+        document_cache.close()
+        document_cache = None
 
-        rootFilePath = os.path.join(rootFileDir, "course.xml")
-        course_tree = etree.parse(rootFilePath)
 
-        # Open course's root xml file
-        # Get the current course run filename
-        course_root = course_tree.getroot()
+def getCourseDict(rootFileDir: str, args: argparse.Namespace) -> dict:
+    """
+    Reads the course outline and all of its components into a nested dictionary.
+    Doesn't include the auxiliary folders (tabs, info, static).
+    With -cache, only files that changed since the last run get parsed.
 
-        course_dict = {
-            "type": course_root.tag,
-            "name": "",
-            "url": course_root.attrib["url_name"],
-            "nickname": course_root.attrib["course"],
-            "org": course_root.attrib["org"],
-            "contents": [],
-        }
+    Args:
+        rootFileDir (str): The directory where the course.xml file is located.
+        args (argparse.Namespace): The command line arguments passed to the script.
 
+    Returns:
+        dict: A dictionary representing the course structure.
+    """
+    course_root, course_dict = startReading(rootFileDir, args)
+
+    with Profiler.phase("read course"):
         course_info = drillDown(
             os.path.join(rootFileDir, course_dict["type"]),
             course_dict["url"],
             course_root,
             args,
         )
-        course_dict["name"] = course_info["parent_name"]
-        course_dict["contents"] = course_info["contents"]
+    course_dict["name"] = course_info["parent_name"]
+    course_dict["contents"] = course_info["contents"]
 
-        if args.links:
-            course_dict["contents"].extend(getAuxLinks(rootFileDir))
-        if args.alttext:
-            course_dict["contents"].extend(getAuxAltText(rootFileDir))
+    finishReading()
+    return course_dict
+
+
+def startReading(
+    rootFileDir: str, args: argparse.Namespace
+) -> tuple[etree._Element, dict]:
+    """
+    Sets up the parse cache, memo, and file index, and reads course.xml.
+    Call finishReading when done.
+
+    Args:
+        rootFileDir (str): The directory where the course.xml file is located.
+        args (argparse.Namespace): The command line arguments passed to the script.
+
+    Returns:
+        tuple: The root element of course.xml, and a course dictionary with no name or contents yet.
+    """
+    global parse_cache, parse_memo, course_files
+    if args.cache and isinstance(course_source, CourseArchive):
+        print("Only caching documents: -cache doesn't keep XML from .tar.gz files.")
+    elif args.cache:
+        parse_cache = ParseCache(rootFileDir)
+    parse_memo = ParseMemo()
+    course_files = indexCourseFiles(rootFileDir)
+
+    rootFilePath = os.path.join(rootFileDir, "course.xml")
+
+    # Open course's root xml file
+    # Get the current course run filename
+    course_root = course_source.parseXML(rootFilePath)
+
+    course_dict = {
+        "type": course_root.tag,
+        "name": "",
+        "url": course_root.attrib["url_name"],
+        "nickname": course_root.attrib["course"],
+        "org": course_root.attrib["org"],
+        "contents": [],
+    }
+    return course_root, course_dict
+
+
+def finishReading() -> None:
+    """Saves the parse cache, prints how much it and the memo helped, and cleans up."""
+    global parse_cache, parse_memo, course_files
+    if parse_cache is not None:
+        print(
+            "Parse cache: reused "
+            + str(parse_cache.hits)
+            + " files, parsed "
+            + str(parse_cache.misses)
+            + "."
+        )
+        parse_cache.save()
+        Profiler.count("parse cache hits", parse_cache.hits)
+        Profiler.count("parse cache misses", parse_cache.misses)
+        parse_cache = None
+
+    Profiler.count("parse memo hits", parse_memo.hits)
+    print(
+        "Parse memo: reused "
+        + str(parse_memo.hits)
+        + " results for repeat references, read "
+        + str(parse_memo.misses)
+        + " files."
+    )
+    parse_memo = None
+    course_files = None
+
+
+def streamCourse(
+    name: str, rootFileDir: str, outputDir: str, args: argparse.Namespace
+) -> None:
+    """
+    Writes the sheet and course.json (and -sqlite database) for a course
+    without holding the whole course in memory.
+    Reads the course file with iterparse, and when each chapter's end tag arrives,
+    reads that chapter, writes its rows, and throws it away.
+    Gives the same files as reading the course with getCourseDict.
+
+    Args:
+        name (str): The course folder or tarball we're reading.
+        rootFileDir (str): The directory where the course.xml file is located.
+        outputDir (str): The directory to put the sheet and course.json in.
+        args (argparse.Namespace): The command line arguments passed to the script.
+    """
+    read_args = databaseReadArgs(args)
+    course_root, course_dict = startReading(rootFileDir, read_args)
+    rootFilePath = os.path.join(rootFileDir, "course.xml")
+    folder = os.path.join(rootFileDir, course_dict["type"])
+
+    # Some courses are all in course.xml, with no file in the course folder.
+    filepath = findCourseFile(folder, course_dict["url"])
+    if filepath is None:
+        filepath = rootFilePath
+
+    sheet = None
+    database = None
+    depth = 0
+    index = 0
+    try:
+        with Profiler.phase("read course"), course_source.openFile(
+            filepath
+        ) as xml_file:
+            for event, element in etree.iterparse(xml_file, events=("start", "end")):
+                if event == "start":
+                    if depth == 0:
+                        # We need the course name for the sheet's filename.
+                        course_dict["name"] = element.attrib.get(
+                            "display_name", element.tag
+                        )
+                        sheet = SheetStream(outputDir, rootFilePath, course_dict, args)
+                        course_json = CourseJSONStream(
+                            outputDir, course_dict, args.json
+                        )
+                        if args.sqlite:
+                            database = CourseDatabase(
+                                os.path.join(outputDir, args.sqlite), makeURL
+                            )
+                            database.startCourse(course_dict, name)
+                    depth += 1
+                    continue
+
+                depth -= 1
+                if depth != 1:
+                    continue
+                # A chapter (or wiki, etc.) is finished.
+                node = getChildInfo(folder, index, element, read_args)
+                index += 1
+                if database is not None:
+                    database.addNodes([node])
+                    node = projectNode(node, args)
+                sheet.add(node)
+                course_json.add(node)
+                # Throw away this element and the ones before it.
+                element.clear(keep_tail=True)
+                while element.getprevious() is not None:
+                    del element.getparent()[0]
+
+        finishReading()
+
+        with Profiler.phase("aux folders"):
+            aux_links, aux_images = scanAuxFolders(
+                rootFileDir,
+                read_args.links,
+                read_args.alttext,
+                args.parser,
+                args.docjobs,
+                args.doctimeout,
+            )
+        if database is not None:
+            database.addNodes(mergeAuxFolders(aux_links, aux_images))
+            database.finishCourse()
+            print("Saved " + course_dict["name"] + " in " + database.path)
+    finally:
+        if database is not None:
+            database.close()
+
+    if args.links:
+        for node in aux_links:
+            sheet.add(node)
+            course_json.add(node)
+    if args.alttext:
+        for node in aux_images:
+            sheet.add(node)
+            course_json.add(node)
+
+    course_json.close()
+    sheet.close()
+
+
+class SheetStream:
+    """
+    Writes a course sheet a piece of the course at a time, for streamCourse.
+    Sheets with more than one pass (like -html -problems) keep the later passes
+    in temporary files until the end.
+
+    Args:
+        outputDir (str): The directory to put the sheet in.
+        rootFileName (str): The name of the course.xml file.
+        course_dict (dict): The course dictionary. Only needs the course's name, type, and IDs.
+        args (argparse.Namespace): The command line arguments passed to the script.
+    """
+
+    def __init__(
+        self,
+        outputDir: str,
+        rootFileName: str,
+        course_dict: dict,
+        args: argparse.Namespace,
+    ):
+        self.rootFileName = rootFileName
+        self.course_dict = course_dict
+        self.args = args
+        self.outFileName = sheetFileName(course_dict, args)
+        self.passes = sheetPasses(args)
+        self.found_rows = False
+
+        self.files = [
+            open(
+                os.path.join(outputDir, self.outFileName),
+                "w",
+                newline="",
+                encoding="utf-8",
+            )
+        ]
+        for types in self.passes[1:]:
+            self.files.append(
+                tempfile.TemporaryFile("w+", newline="", encoding="utf-8")
+            )
+        # Missing keys get written as blanks.
+        self.writers = [
+            csv.DictWriter(
+                f,
+                delimiter="\t",
+                fieldnames=sheetFieldnames(args),
+                extrasaction="ignore",
+            )
+            for f in self.files
+        ]
+        self.writers[0].writeheader()
+
+    def add(self, node: CourseNode) -> None:
+        """Writes the rows for one item at the top level of the course."""
+        part = dict(self.course_dict, contents=[node])
+        for types, writer in zip(self.passes, self.writers):
+            for row in passRows(
+                courseFlattener(
+                    part,
+                    os.path.basename(self.rootFileName),
+                    part["org"],
+                    part["nickname"],
+                    part["url"],
+                ),
+                types,
+                self.args,
+            ):
+                self.found_rows = True
+                writer.writerow(row)
+
+    def close(self) -> None:
+        """Puts the passes together and closes the sheet."""
+        sheet_file = self.files[0]
+        for f in self.files[1:]:
+            f.seek(0)
+            shutil.copyfileobj(f, sheet_file)
+            f.close()
+        sheet_file.close()
+
+        if self.found_rows:
+            print("Spreadsheet created for " + self.course_dict["name"] + ".")
+            print("Location: " + self.outFileName)
+
+
+class CourseJSONStream:
+    """
+    Writes course.json or course.jsonl a piece of the course at a time, for streamCourse.
+    Gives the same file as writeCourseJSON.
+
+    Args:
+        outputDir (str): The directory to put the file in.
+        course_dict (dict): The course dictionary. Its contents get added with add().
+        style (str): "pretty", "compact", "lines", or "none", like writeCourseJSON.
+    """
+
+    def __init__(self, outputDir: str, course_dict: dict, style: str = "pretty"):
+        self.style = style
+        self.count = 0
+        self.next_id = 1
+        if style == "none":
+            self.file = None
+            return
+
+        header = {key: value for key, value in course_dict.items() if key != "contents"}
+        if style == "lines":
+            self.file = open(os.path.join(outputDir, "course.jsonl"), "w")
+            header["id"] = 0
+            header["parent"] = None
+            self.file.write(json.dumps(header) + "\n")
+        elif style == "compact":
+            self.file = open(os.path.join(outputDir, "course.json"), "w")
+            text = json.dumps(header, separators=(",", ":"))
+            self.file.write(text[:-1] + ',"contents":[')
+        else:
+            self.file = open(os.path.join(outputDir, "course.json"), "w")
+            text = json.dumps(header, indent=4)
+            self.file.write(text[: -len("\n}")] + ',\n    "contents": [')
+
+    def add(self, node: CourseNode) -> None:
+        """Writes one item at the top level of the course, and everything in it."""
+        if self.file is None:
+            return
+        if self.style == "lines":
+            for line in nodeLines([node], 0, self.next_id):
+                self.file.write(json.dumps(line))
+                self.file.write("\n")
+                self.next_id += 1
+            return
+
+        if self.count > 0:
+            self.file.write(",")
+        if self.style == "compact":
+            self.file.write(json.dumps(node, separators=(",", ":"), default=nodeToJSON))
+        else:
+            text = json.dumps(node, indent=4, default=nodeToJSON)
+            self.file.write("\n" + textwrap.indent(text, " " * 8))
+        self.count += 1
+
+    def close(self) -> None:
+        if self.file is None:
+            return
+        if self.style == "compact":
+            self.file.write("]}")
+        elif self.style == "pretty":
+            self.file.write("\n    ]\n}" if self.count > 0 else "]\n}")
+        self.file.close()
+
+
+def projectCourse(course_dict: dict, args: argparse.Namespace) -> dict:
+    """
+    Takes a course that was read with every option turned on and returns
+    a copy holding only the data that a run with these arguments would have read.
+    Used to write several sheets from a single pass through the course.
+
+    Args:
+        course_dict (dict): A dictionary representing the course structure.
+        args (argparse.Namespace): The arguments for the sheet we're about to write.
+
+    Returns:
+        dict: A trimmed copy of the course structure. Lists that aren't trimmed are shared, not copied.
+    """
+    projected = course_dict.copy()
+    projected["contents"] = [projectNode(x, args) for x in course_dict["contents"]]
+    return projected
+
+
+def projectNode(node: CourseNode, args: argparse.Namespace) -> CourseNode:
+    """Recursion function for projectCourse."""
+    projected = node.copy()
+
+    if node.contents is not None:
+        projected.contents = [projectNode(x, args) for x in node.contents]
+        return projected
+
+    needed = neededExtractors(args)
+    for name, extractor in component_extractors.items():
+        if node.type != extractor["tag"] or name in needed:
+            continue
+        for key in extractor["fields"]:
+            if key in ("links", "images", "sub"):
+                setattr(projected, key, no_items)
+            elif projected.extra is not None:
+                projected.extra.pop(key, None)
+    # We only get the kinds of html markup we're looking for.
+    if node.type == "html":
+        if not args.links:
+            projected.links = no_items
+        if not args.alttext:
+            projected.images = no_items
+
+    return projected
+
+
+def readAllArgs(args: argparse.Namespace) -> argparse.Namespace:
+    """Returns a copy of the arguments that reads video, problem XML, links, and alt text."""
+    read_args = argparse.Namespace(**vars(args))
+    read_args.video = read_args.links = read_args.alttext = True
+    read_args.problems = True
+    return read_args
+
+
+def databaseReadArgs(args: argparse.Namespace) -> argparse.Namespace:
+    """
+    With -sqlite, we read everything, so the database has it all.
+    Returns the arguments to read with. Use sheetCourse to trim the course for the sheet.
+    """
+    return readAllArgs(args) if args.sqlite else args
+
+
+def readCourse(name: str, args: argparse.Namespace) -> tuple[CourseModel, str]:
+    """
+    Reads a course folder, course.xml file, or .tar.gz export, including the auxiliary folders.
+
+    Args:
+        name (str): The folder, course.xml file, or tarball.
+        args (argparse.Namespace): The command line arguments passed to the script.
+
+    Returns:
+        tuple: The course, and the directory to write our files to.
+    """
+    rootFileDir, outputDir = openCourse(name, args)
+    try:
+        course_dict = getCourseDict(rootFileDir, args)
+        with Profiler.phase("aux folders"):
+            aux_links, aux_images = scanAuxFolders(
+                rootFileDir,
+                args.links,
+                args.alttext,
+                args.parser,
+                args.docjobs,
+                args.doctimeout,
+            )
+    finally:
+        closeCourse()
+
+    model = CourseModel(
+        course_dict,
+        aux_links,
+        aux_images,
+        source=name,
+        root_file=os.path.join(rootFileDir, "course.xml"),
+        extractors=neededExtractors(args),
+        read_links=args.links,
+        read_alttext=args.alttext,
+    )
+    return model, outputDir
+
+
+def sheetCourse(model: CourseModel, args: argparse.Namespace) -> dict:
+    """
+    Gets the course structure that a sheet with these arguments prints, and that goes in course.json.
+    Leaves out anything we read that these arguments didn't ask for,
+    and adds the auxiliary folders for -links and -alttext.
+
+    Args:
+        model (CourseModel): The course.
+        args (argparse.Namespace): The arguments for the sheet we're about to write.
+
+    Returns:
+        dict: The course structure. Nodes are shared with the model unless they needed trimming.
+    """
+    if (
+        set(model.extractors).difference(neededExtractors(args))
+        or (model.read_links and not args.links)
+        or (model.read_alttext and not args.alttext)
+    ):
+        course_dict = projectCourse(model.course_dict, args)
+    else:
+        course_dict = dict(
+            model.course_dict, contents=list(model.course_dict["contents"])
+        )
+    if args.links:
+        course_dict["contents"].extend(model.aux_links)
+    if args.alttext:
+        course_dict["contents"].extend(model.aux_images)
+    return course_dict
+
+
+def saveCourseDatabase(path: str, model: CourseModel) -> None:
+    """
+    Saves a course in the -sqlite database, along with the auxiliary folders.
 
-        with open(os.path.join(rootFileDir, "course.json"), "w") as course_json:
-            course_json.write(json.dumps(course_dict, indent=4))
-        writeCourseSheet(rootFileDir, rootFilePath, course_dict, args)
+    Args:
+        path (str): The database file.
+        model (CourseModel): The course, read with databaseReadArgs.
+    """
+    course_dict = model.course_dict
+    full_course = dict(
+        course_dict,
+        contents=course_dict["contents"] + model.auxFolders(),
+    )
+    with Profiler.phase("sqlite"):
+        writeCourseDatabase(path, full_course, makeURL, model.source)
+    print("Saved " + course_dict["name"] + " in " + path)
+
+
+def loadCourse(
+    name: str, parser: str = "lxml", jobs: int = 1, cache: bool = False
+) -> CourseModel:
+    """
+    Reads a course for other Python code to use, with everything a sheet could show:
+    videos and transcripts, problems, HTML, links, and images.
+    Doesn't write any files (except the -cache file if cache is True), print anything, or quit.
+
+    Reading a course uses this module's globals, so calls from different threads
+    wait for each other. Use jobs, or separate processes, to read faster.
+    While it runs, sys.stdout is swapped out for the whole process, so other
+    threads' print() output goes missing until it's done.
+    The CourseModel it returns is safe to share between threads once its
+    indexes are built (call buildIndexes() before sharing it).
+
+    Args:
+        name (str): A course folder, course.xml file, or .tar.gz export.
+        parser (str): How to read links and images from HTML, "lxml" or "soup".
+        jobs (int): How many processes to read the course with.
+        cache (bool): Whether to keep what we read for next time, like -cache.
+
+    Returns:
+        CourseModel: The course.
+
+    Raises:
+        FileNotFoundError: If there's no course there.
+        ValueError: If the course has something we can't read, like an unknown tag.
+    """
+    if not isCourse(name):
+        raise FileNotFoundError("No course.xml found in " + name)
+    options = [name, "-parser", parser, "-jobs", str(jobs)]
+    if cache:
+        options.append("-cache")
+    args = readAllArgs(parseArguments(options)[0])
+
+    with load_lock, contextlib.redirect_stdout(io.StringIO()):
+        try:
+            model, outputDir = readCourse(name, args)
+        # Unknown tags call sys.exit.
+        except SystemExit as err:
+            raise ValueError(str(err)) from None
+    return model
+
+
+def findCourseExports(folder: str) -> list[str]:
+    """Lists the course folders and .tar.gz exports inside a folder, sorted by name."""
+    exports = []
+    for name in sorted(os.listdir(folder)):
+        path = os.path.join(folder, name)
+        if isCourse(path):
+            exports.append(path)
+    return exports
+
+
+def getBatchRows(name: str, args: argparse.Namespace) -> tuple[list, str]:
+    """
+    Reads one course for a batch and gets its rows.
+    Runs in a worker process when we have more than one job.
+
+    Args:
+        name (str): The course folder or tarball.
+        args (argparse.Namespace): The command line arguments passed to the script.
+
+    Returns:
+        tuple: The rows as lists of values, starting with the course ID,
+            and an error message if the course failed (None otherwise).
+    """
+    try:
+        model, outputDir = readCourse(name, databaseReadArgs(args))
+        if args.sqlite:
+            saveCourseDatabase(args.sqlite, model)
+    # Unknown tags call sys.exit, so catch that too.
+    except (Exception, SystemExit) as err:
+        return [], str(err) or repr(err)
+
+    course_dict = sheetCourse(model, args)
+    fieldnames = sheetFieldnames(args)
+    with Profiler.phase("flatten"):
+        rows = [
+            [model.course_id] + [row.get(key) for key in fieldnames]
+            for row in sheetRows(model.root_file, course_dict, args)
+        ]
+    return rows, None
+
+
+def getBatchRowsWorker(
+    name: str, args: argparse.Namespace
+) -> tuple[list, str, Union[dict, None]]:
+    """Runs getBatchRows in a worker process, and adds the profile if we're profiling."""
+    rows, error = getBatchRows(name, args)
+    return rows, error, Profiler.takeWorkerReport()
+
+
+def writeBatchRows(writer, exports: list[str], results) -> list[tuple[str, str]]:
+    """
+    Writes each course's rows for writeBatchSheet as they come in.
+
+    Args:
+        writer (csv.writer): The batch sheet.
+        exports (list): The courses, in order.
+        results: (rows, error, profile) for each course, from getBatchRowsWorker.
+
+    Returns:
+        list: (course, error message) for each course that failed.
+    """
+    failures = []
+    for name, (rows, error, profile) in zip(exports, results):
+        if profile is not None:
+            Profiler.active.merge(profile)
+        if error is not None:
+            print("Failed on " + name + ": " + error)
+            failures.append((name, error))
+            continue
+        with Profiler.phase("write sheet"):
+            writer.writerows(rows)
+    return failures
+
+
+def writeBatchSheet(folders: list[str], args: argparse.Namespace) -> None:
+    """
+    Writes one sheet for every course in a set of folders, with a course_id column.
+    With -jobs N, reads N courses at once. Courses that fail get listed at the end.
+
+    Args:
+        folders (list): The folders to look for course exports in.
+        args (argparse.Namespace): The command line arguments passed to the script.
+    """
+    exports = []
+    for folder in folders:
+        if os.path.isdir(folder) and not isCourse(folder):
+            exports.extend(findCourseExports(folder))
+        else:
+            # Course folders and tarballs can go in the list directly.
+            exports.append(folder)
+    if exports == []:
+        sys.exit("No course folders or .tar.gz files found.")
+
+    sheet_name = "All Courses"
+    if args.links:
+        sheet_name += " Links"
+    if args.alttext:
+        sheet_name += " Images"
+    sheet_name += ".tsv"
+    outFileName = args.o if args.o else os.path.join(folders[0], sheet_name)
+
+    # Courses are already split between processes, so read each one in a single process.
+    course_args = argparse.Namespace(**vars(args))
+    course_args.jobs = 1
+    course_args.cache = False
+    # The document cache is shared between courses, so keep that one.
+    if args.cache and not args.doccache:
+        course_args.doccache = defaultDocumentCachePath()
+    if args.sqlite:
+        # All the courses go in one database, next to the sheet.
+        course_args.sqlite = os.path.join(folders[0], args.sqlite)
+
+    with open(outFileName, "w", newline="", encoding="utf-8") as outputfile:
+        writer = csv.writer(outputfile, delimiter="\t")
+        writer.writerow(["course_id"] + sheetFieldnames(args))
+
+        if args.jobs > 1:
+            with ProcessPoolExecutor(
+                max_workers=args.jobs,
+                initializer=Profiler.startWorker,
+                initargs=(Profiler.active is not None,),
+            ) as executor:
+                results = executor.map(
+                    getBatchRowsWorker, exports, itertools.repeat(course_args)
+                )
+                failures = writeBatchRows(writer, exports, results)
+        else:
+            results = (getBatchRows(name, course_args) + (None,) for name in exports)
+            failures = writeBatchRows(writer, exports, results)
+
+    print(
+        "Batch sheet created for "
+        + str(len(exports) - len(failures))
+        + " of "
+        + str(len(exports))
+        + " courses."
+    )
+    print("Location: " + outFileName)
+    if failures:
+        print("These courses failed:")
+        for name, error in failures:
+            print("    " + name + ": " + error)
+
+
+# Main function
+def Make_Course_Sheet(args=["-h"]):
+    print("Creating course sheet")
+
+    args, extra = parseArguments(args)
+
+    print("Arguments:")
+    print(args, extra)
+
+    if args.help:
+        sys.exit(instructions)
+
+    file_names = getFileNames(args, extra)
+
+    new_profile = args.profile and Profiler.start("Make_Course_Sheet")
+    # The profile goes with the last course's files.
+    profile_folder = "."
+    try:
+        if args.batch:
+            writeBatchSheet(file_names, args)
+            profile_folder = file_names[0]
+        else:
+            # Get the course.xml file and root directory
+            for name in file_names:
+                if args.stream:
+                    rootFileDir, outputDir = openCourse(name, args)
+                    try:
+                        streamCourse(name, rootFileDir, outputDir, args)
+                    finally:
+                        closeCourse()
+                    profile_folder = outputDir
+                    continue
+
+                model, outputDir = readCourse(name, databaseReadArgs(args))
+                if args.sqlite:
+                    saveCourseDatabase(os.path.join(outputDir, args.sqlite), model)
+
+                course_dict = sheetCourse(model, args)
+                with Profiler.phase("course.json"):
+                    writeCourseJSON(outputDir, course_dict, args.json)
+                with Profiler.phase("flatten and write sheet"):
+                    writeCourseSheet(outputDir, model.root_file, course_dict, args)
+                profile_folder = outputDir
+
+        if new_profile:
+            Profiler.finish(profile_folder)
+    finally:
+        if new_profile:
+            Profiler.stop()
+
+
+def Make_Course_Sheets(args: list, reports: list[list]) -> None:
+    """
+    Writes several course sheets while only reading through each course once.
+    The sheets are the same as calling Make_Course_Sheet once per report.
+
+    Args:
+        args (list): The command line arguments shared by all the sheets, argv-style.
+        reports (list): One list of extra arguments for each sheet, like ["-links", "-o", "Links.tsv"]
+    """
+    print("Creating course sheets")
+
+    report_args = [parseArguments(args + report) for report in reports]
+
+    print("Arguments:")
+    for report, extra in report_args:
+        print(report, extra)
+
+    first_args, first_extra = report_args[0]
+    if first_args.help:
+        sys.exit(instructions)
+
+    file_names = getFileNames(first_args, first_extra)
+
+    # Read everything that any of the sheets will need.
+    read_args = argparse.Namespace(**vars(first_args))
+    read_args.video = any(report.video for report, extra in report_args)
+    read_args.links = any(report.links for report, extra in report_args)
+    read_args.alttext = any(report.alttext for report, extra in report_args)
+    read_args.problems = any(report.problems for report, extra in report_args)
+    read_args.html = any(report.html for report, extra in report_args)
+    read_args.all = any(report.all for report, extra in report_args)
+    read_args = databaseReadArgs(read_args)
+
+    new_profile = read_args.profile and Profiler.start("Make_Course_Sheet")
+    profile_folder = "."
+    try:
+        for name in file_names:
+            model, outputDir = readCourse(name, read_args)
+            if read_args.sqlite:
+                saveCourseDatabase(os.path.join(outputDir, read_args.sqlite), model)
+
+            for report, extra in report_args:
+                course_dict = sheetCourse(model, report)
+                with Profiler.phase("flatten and write sheet"):
+                    writeCourseSheet(outputDir, model.root_file, course_dict, report)
+
+            # Same course.json that the last sheet would have written on its own.
+            with Profiler.phase("course.json"):
+                writeCourseJSON(outputDir, course_dict, first_args.json)
+            profile_folder = outputDir
+
+        if new_profile:
+            Profiler.finish(profile_folder)
+    finally:
+        if new_profile:
+            Profiler.stop()
 
 
 if __name__ == "__main__":
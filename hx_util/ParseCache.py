@@ -0,0 +1,347 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+
+######################################
+# Parse cache for Make_Course_Sheet
+#
+# Stores what we pulled out of each course XML file in a json file
+# inside the course folder, so that re-runs on an unchanged course
+# don't have to parse every file again.
+# Each entry remembers the path, mtime, size, and content hash of the
+# files it came from. If the mtime and size match, we trust the entry.
+# If only the mtime changed (like after a fresh export), we check the hash.
+#
+# ParseMemo is the in-memory version for a single run, for files that
+# the course points to more than once.
+#
+# DocumentCache is shared between courses. It keeps the links from Word,
+# Excel, PowerPoint, and PDF files by the hash of their contents, so the
+# same handout is only read once, whichever course it's in.
+######################################
+
+cache_version = 1
+cache_filename = ".hx_util_cache.json"
+
+# Default size limit for the DocumentCache, in megabytes.
+default_document_cache_mb = 100
+
+
+def hashFile(path: str) -> str:
+    """Returns the sha1 hash of a file's contents."""
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        # Big handouts don't need to fit in memory.
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def defaultDocumentCachePath() -> str:
+    """Gets where the DocumentCache goes if we're not told: ~/.cache/hx_util/document_links.sqlite"""
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.path.join(cache_home, "hx_util", "document_links.sqlite")
+
+
+class ParseCache:
+    """
+    On-disk cache of the information read out of a course's XML files.
+
+    Args:
+        folder (str): The course folder. The cache file is kept here, and paths are stored relative to it.
+        filename (str): The cache file's name. Each script that uses a ParseCache keeps its own.
+    """
+
+    def __init__(self, folder: str, filename: str = cache_filename):
+        self.folder = folder
+        self.path = os.path.join(folder, filename)
+        self.entries = {}
+        self.updated = {}
+        self.dirty = False
+        self.hits = 0
+        self.misses = 0
+
+        try:
+            with open(self.path, "r", encoding="utf8") as cache_file:
+                data = json.load(cache_file)
+            if data.get("version") == cache_version:
+                self.entries = data["entries"]
+        except (OSError, ValueError):
+            # No cache yet, or a broken one. Start fresh.
+            pass
+
+    def _fileState(self, path: str) -> list:
+        """Gets [mtime, size, hash] for a file. Raises OSError if it's missing."""
+        stat = os.stat(path)
+        return [stat.st_mtime_ns, stat.st_size, hashFile(path)]
+
+    def _isCurrent(self, key: str, entry: dict) -> bool:
+        """Checks whether the files an entry came from are unchanged."""
+        for relpath, state in entry["files"].items():
+            path = os.path.join(self.folder, relpath)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                return False
+            if stat.st_size != state[1]:
+                return False
+            if stat.st_mtime_ns != state[0]:
+                # Same size, new timestamp. Compare contents.
+                if hashFile(path) != state[2]:
+                    return False
+                state[0] = stat.st_mtime_ns
+                self.updated[key] = entry
+                self.dirty = True
+        return True
+
+    def get(self, key: str, path: str):
+        """
+        Gets the cached value for a file, or None if it's missing or out of date.
+
+        Args:
+            key (str): Which kind of information we stored, like "outline" or "component:v1l0a0".
+            path (str): The path to the main file the information came from.
+        """
+        key = key + ":" + os.path.relpath(path, self.folder)
+        entry = self.entries.get(key)
+        if entry is not None and self._isCurrent(key, entry):
+            self.hits += 1
+            return entry["value"]
+        if os.path.exists(path):
+            self.misses += 1
+        return None
+
+    def put(self, key: str, path: str, value, extra_files: list[str] = []) -> None:
+        """
+        Stores information read from a file.
+
+        Args:
+            key (str): Which kind of information we're storing.
+            path (str): The path to the main file the information came from.
+            value: Anything json can handle.
+            extra_files (list): Other files the information depends on, like an html component's .html file.
+        """
+        files = {}
+        for f in [path] + extra_files:
+            try:
+                files[os.path.relpath(f, self.folder)] = self._fileState(f)
+            except OSError:
+                # Can't check this file later, so don't cache it.
+                return
+        key = key + ":" + os.path.relpath(path, self.folder)
+        self.entries[key] = {"files": files, "value": value}
+        self.updated[key] = self.entries[key]
+        self.dirty = True
+
+    def takeUpdates(self) -> dict:
+        """
+        Returns the entries added or refreshed since the last call, along with
+        the hit and miss counts, and then forgets them.
+        Used to send a worker process's results back to the main process.
+        """
+        updates = {"entries": self.updated, "hits": self.hits, "misses": self.misses}
+        self.updated = {}
+        self.hits = 0
+        self.misses = 0
+        return updates
+
+    def addUpdates(self, updates: dict) -> None:
+        """Merges in the results of takeUpdates from another process."""
+        self.entries.update(updates["entries"])
+        self.hits += updates["hits"]
+        self.misses += updates["misses"]
+        if updates["entries"]:
+            self.dirty = True
+
+    def prune(self) -> int:
+        """
+        Drops entries for files that aren't there anymore, so the cache doesn't keep growing.
+
+        Returns:
+            int: How many entries we dropped.
+        """
+        gone = [
+            key
+            for key, entry in self.entries.items()
+            if not os.path.exists(os.path.join(self.folder, next(iter(entry["files"]))))
+        ]
+        for key in gone:
+            del self.entries[key]
+        if gone:
+            self.dirty = True
+        return len(gone)
+
+    def save(self) -> None:
+        """Drops entries for missing files, and writes the cache back to the course folder if anything changed."""
+        self.prune()
+        if not self.dirty:
+            return
+        with open(self.path, "w", encoding="utf8") as cache_file:
+            json.dump({"version": cache_version, "entries": self.entries}, cache_file)
+        self.dirty = False
+
+
+class ParseMemo:
+    """
+    Remembers what we read from each file during a single run,
+    so files that are used more than once only get parsed once.
+    """
+
+    def __init__(self):
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, kind: str, path: str):
+        """
+        Gets what we stored for a file, or None if we haven't read it yet.
+
+        Args:
+            kind (str): Which kind of information we stored, like "outline" or "html".
+            path (str): The path to the file.
+        """
+        value = self.entries.get((kind, path))
+        if value is not None:
+            self.hits += 1
+        return value
+
+    def put(self, kind: str, path: str, value) -> None:
+        """Stores what we read from a file. Each call counts as one file parsed."""
+        self.entries[(kind, path)] = value
+        self.misses += 1
+
+    def takeCounts(self) -> dict:
+        """Returns the hit and miss counts and resets them. Used by worker processes."""
+        counts = {"hits": self.hits, "misses": self.misses}
+        self.hits = 0
+        self.misses = 0
+        return counts
+
+    def addCounts(self, counts: dict) -> None:
+        """Adds in the counts from takeCounts in another process."""
+        self.hits += counts["hits"]
+        self.misses += counts["misses"]
+
+
+class DocumentCache:
+    """
+    On-disk cache of the links in documents, shared between courses.
+    Entries are found by the document's content hash and which extractor read it,
+    so changing the extractor (or its version) means reading the document again.
+    When the cache gets bigger than its limit, the entries used longest ago get dropped.
+
+    Args:
+        path (str): The cache file. Made if it doesn't exist.
+        version (str): The extractors' version. Entries from other versions aren't used.
+        max_mb (float): The size limit, in megabytes of stored links.
+    """
+
+    def __init__(
+        self, path: str, version: str, max_mb: float = default_document_cache_mb
+    ):
+        self.path = path
+        self.version = version
+        self.max_bytes = int(max_mb * 1e6)
+        self.hits = 0
+        self.misses = 0
+        # Hashes of files we've looked up, so put() doesn't hash them again.
+        self.hashes = {}
+        # When we last used each entry we found. Saved all at once by evict(),
+        # so lookups don't hold the database's write lock.
+        self.used = {}
+
+        folder = os.path.dirname(path)
+        if folder != "":
+            os.makedirs(folder, exist_ok=True)
+        # Other processes might be using the cache too, so each write
+        # commits right away instead of keeping the database locked.
+        self.connection = sqlite3.connect(path, timeout=300, isolation_level=None)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS documents ("
+            "hash TEXT NOT NULL, extractor TEXT NOT NULL, links TEXT NOT NULL, "
+            "size INTEGER NOT NULL, used REAL NOT NULL, "
+            "PRIMARY KEY (hash, extractor))"
+        )
+        self.connection.execute(
+            "CREATE INDEX IF NOT EXISTS documents_used ON documents(used)"
+        )
+
+    def _key(self, path: str, kind: str) -> tuple[str, str]:
+        if path not in self.hashes:
+            self.hashes[path] = hashFile(path)
+        return self.hashes[path], kind + ":" + self.version
+
+    def get(self, path: str, kind: str):
+        """
+        Gets the links we saved for a document with the same contents, or None.
+
+        Args:
+            path (str): The document.
+            kind (str): Which extractor reads it, like "pdf" or "docx".
+        """
+        key = self._key(path, kind)
+        row = self.connection.execute(
+            "SELECT links FROM documents WHERE hash = ? AND extractor = ?", key
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.used[key] = time.time()
+        return json.loads(row[0])
+
+    def put(self, path: str, kind: str, links: list) -> None:
+        """Saves the links from a document."""
+        key = self._key(path, kind)
+        text = json.dumps(links)
+        self.connection.execute(
+            "INSERT OR REPLACE INTO documents VALUES (?, ?, ?, ?, ?)",
+            key
+            + (text, len(text.encode("utf8")) + len(key[0]) + len(key[1]), time.time()),
+        )
+
+    def evict(self) -> int:
+        """
+        Saves when we used the entries we found, then drops the entries
+        used longest ago until the cache fits in its size limit.
+
+        Returns:
+            int: How many entries we dropped.
+        """
+        # One short transaction, so other processes only wait for this part.
+        self.connection.execute("BEGIN IMMEDIATE")
+        try:
+            self.connection.executemany(
+                "UPDATE documents SET used = ? WHERE hash = ? AND extractor = ?",
+                [(used,) + key for key, used in self.used.items()],
+            )
+            total = self.connection.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM documents"
+            ).fetchone()[0]
+            dropped = []
+            rows = self.connection.execute(
+                "SELECT rowid, size FROM documents ORDER BY used"
+            ).fetchall()
+            for rowid, size in rows:
+                if total <= self.max_bytes:
+                    break
+                dropped.append((rowid,))
+                total -= size
+            self.connection.executemany(
+                "DELETE FROM documents WHERE rowid = ?", dropped
+            )
+        except BaseException:
+            self.connection.execute("ROLLBACK")
+            raise
+        self.connection.execute("COMMIT")
+        self.used = {}
+        return len(dropped)
+
+    def close(self) -> None:
+        """Saves when entries were used, trims the cache to its size limit, and closes it."""
+        self.evict()
+        self.connection.close()
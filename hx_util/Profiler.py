@@ -0,0 +1,233 @@
+import os
+import json
+import time
+import heapq
+from contextlib import contextmanager
+
+######################################
+# Timing and counters for the --profile option.
+#
+# Scripts call start() when they get --profile, record what they do with
+# phase(), readingFile() and count(), and call finish() at the end, which
+# prints a report and saves it as json.
+# If a profile is already running (like when HXLiveTools calls the other
+# scripts), they add to that one instead of starting their own.
+# When nothing is being profiled, all of these do nothing.
+# Worker processes call startWorker() when they start, and send
+# takeWorkerReport() back with each result for the main process to merge.
+######################################
+
+# How many of the slowest files to list.
+slowest_count = 10
+
+# The profile we're recording, if any.
+active = None
+
+
+class Profile:
+    """
+    Times and counts for a single run.
+
+    Args:
+        name (str): What we're profiling, usually the script name.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.started = time.perf_counter()
+        # phase name: [seconds, times entered]
+        self.phases = {}
+        # file kind: [files, bytes, seconds]
+        self.files = {}
+        # counter name: count
+        self.counters = {}
+        # Heap of [seconds, kind, path] for the slowest files.
+        self.slowest = []
+
+    def addPhase(self, name: str, seconds: float, calls: int = 1) -> None:
+        phase = self.phases.setdefault(name, [0.0, 0])
+        phase[0] += seconds
+        phase[1] += calls
+
+    def addFile(self, kind: str, path: str, size: int, seconds: float) -> None:
+        stats = self.files.setdefault(kind, [0, 0, 0.0])
+        stats[0] += 1
+        stats[1] += size
+        stats[2] += seconds
+        self.addSlowFile([seconds, kind, path])
+
+    def addSlowFile(self, entry: list) -> None:
+        """Keeps [seconds, kind, path] if it's one of the slowest files so far."""
+        if len(self.slowest) < slowest_count:
+            heapq.heappush(self.slowest, entry)
+        elif entry > self.slowest[0]:
+            heapq.heapreplace(self.slowest, entry)
+
+    def count(self, name: str, n: int = 1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def toDict(self) -> dict:
+        """Gets the report as a dictionary. Also used to send results between processes."""
+        return {
+            "name": self.name,
+            "total_seconds": time.perf_counter() - self.started,
+            "phases": {
+                name: {"seconds": seconds, "calls": calls}
+                for name, (seconds, calls) in self.phases.items()
+            },
+            "files": {
+                kind: {"files": files, "bytes": size, "seconds": seconds}
+                for kind, (files, size, seconds) in sorted(self.files.items())
+            },
+            "counters": dict(sorted(self.counters.items())),
+            "slowest_files": [
+                {"path": path, "kind": kind, "seconds": seconds}
+                for seconds, kind, path in sorted(self.slowest, reverse=True)
+            ],
+        }
+
+    def merge(self, report: dict) -> None:
+        """Adds in a report from toDict, like one from a worker process."""
+        for name, phase in report["phases"].items():
+            self.addPhase(name, phase["seconds"], phase["calls"])
+        for kind, stats in report["files"].items():
+            total = self.files.setdefault(kind, [0, 0, 0.0])
+            total[0] += stats["files"]
+            total[1] += stats["bytes"]
+            total[2] += stats["seconds"]
+        for name, n in report["counters"].items():
+            self.count(name, n)
+        for entry in report["slowest_files"]:
+            self.addSlowFile([entry["seconds"], entry["kind"], entry["path"]])
+
+
+def start(name: str) -> bool:
+    """
+    Starts profiling, unless we already are.
+
+    Returns:
+        bool: True if we started a new profile, which means the caller should call finish().
+    """
+    global active
+    if active is not None:
+        return False
+    active = Profile(name)
+    return True
+
+
+def finish(folder: str = ".") -> None:
+    """Prints the report, saves it as [name]_profile.json in the folder, and stops profiling."""
+    global active
+    if active is None:
+        return
+    report = active.toDict()
+    active = None
+
+    print("")
+    print("Profile for " + report["name"] + ": %.3f seconds" % report["total_seconds"])
+    print("Phases:")
+    for name, phase in report["phases"].items():
+        print("    %-32s %9.3f s  (%d)" % (name, phase["seconds"], phase["calls"]))
+    if report["files"]:
+        print("Files read:")
+        for kind, stats in report["files"].items():
+            print(
+                "    %-32s %6d files %12d bytes %9.3f s"
+                % (kind, stats["files"], stats["bytes"], stats["seconds"])
+            )
+    if report["counters"]:
+        print("Counters:")
+        for name, n in report["counters"].items():
+            print("    %-32s %9d" % (name, n))
+    if report["slowest_files"]:
+        print("Slowest files:")
+        for entry in report["slowest_files"]:
+            print("    %9.3f s  %s" % (entry["seconds"], entry["path"]))
+
+    report_path = os.path.join(folder, report["name"] + "_profile.json")
+    with open(report_path, "w", encoding="utf8") as report_file:
+        json.dump(report, report_file, indent=4)
+    print("Profile saved to " + report_path)
+
+
+def stop() -> None:
+    """
+    Stops profiling without a report. Call it in a finally block after start(),
+    so an error doesn't leave the profile running for whatever runs next.
+    Does nothing if finish() already ran.
+    """
+    global active
+    active = None
+
+
+def startWorker(profiling: bool) -> None:
+    """
+    Sets up profiling in a worker process, like a ProcessPoolExecutor initializer.
+    Send takeWorkerReport() back with each result, and merge it into the main profile.
+
+    Args:
+        profiling (bool): Whether the main process is profiling.
+    """
+    global active
+    # Forked processes have a copy of the parent's profile. Start over.
+    active = Profile("worker") if profiling else None
+
+
+def takeWorkerReport():
+    """
+    Gets what a worker recorded since the last call, and starts over.
+
+    Returns:
+        dict: The report from toDict, for Profile.merge, or None if we're not profiling.
+    """
+    global active
+    if active is None:
+        return None
+    report = active.toDict()
+    active = Profile("worker")
+    return report
+
+
+@contextmanager
+def phase(name: str):
+    """Times a phase of the run, like reading the course or writing the sheet."""
+    if active is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if active is not None:
+            active.addPhase(name, time.perf_counter() - started)
+
+
+@contextmanager
+def readingFile(kind: str, path: str, size_of=os.path.getsize):
+    """
+    Times reading and parsing one file.
+
+    Args:
+        kind (str): What sort of file it is, like "problem" or "docx".
+        path (str): The file's path.
+        size_of (function): Gets the file's size in bytes from its path. Only called when profiling.
+    """
+    if active is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if active is not None:
+            try:
+                size = size_of(path)
+            except OSError:
+                size = 0
+            active.addFile(kind, path, size, time.perf_counter() - started)
+
+
+def count(name: str, n: int = 1) -> None:
+    """Adds to a counter, like the number of times we called a parser."""
+    if active is not None:
+        active.count(name, n)
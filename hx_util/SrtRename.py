@@ -6,6 +6,8 @@ import shutil
 import argparse
 import xml.etree.ElementTree as ET
 
+from hx_util import Profiler
+
 instructions = """
 To use:
 python3 SrtRename.py course_folder (options)
@@ -20,6 +22,8 @@ Valid options:
   -z Zip the new SRTs into a single file.
   -i Open a specific named .tsv file using the following argument.
   -o Name the zip file using the following argument. Only works with -z.
+  --profile Times each step. Prints a report and saves it as
+            SrtRename_profile.json in the course folder.
 
 Last update: April 25th 2022
 """
@@ -54,7 +58,9 @@ def getOriginalNames(course_folder: str, args: argparse.Namespace) -> tuple[dict
     course_tsv_path = os.path.join(course_folder, course_outline_file)
 
     # Open the tsv file.
-    with open(course_tsv_path, "r", encoding="utf8") as tsvfile:
+    with Profiler.readingFile("tsv", course_tsv_path), open(
+        course_tsv_path, "r", encoding="utf8"
+    ) as tsvfile:
         reader = csv.reader(tsvfile, delimiter="\t")
 
         # Get the right columns
@@ -108,10 +114,11 @@ def setNewNames(course_folder: str, nameDict: dict[str,str], args: argparse.Name
 
         # Rename the files.
         if os.path.exists(oldname):
-            if args.c:
-                shutil.copyfile(oldname, newname)
-            else:
-                os.rename(oldname, newname)
+            with Profiler.phase("copy" if args.c else "rename"):
+                if args.c:
+                    shutil.copyfile(oldname, newname)
+                else:
+                    os.rename(oldname, newname)
             filecount += 1
 
     if args.z:
@@ -121,8 +128,9 @@ def setNewNames(course_folder: str, nameDict: dict[str,str], args: argparse.Name
             course_title = course_title.rsplit(".zip", 1)[0]
         target_file_path = os.path.join(target_folder, os.pardir, course_title)
 
-        shutil.make_archive(target_file_path, "zip", target_folder)
-        shutil.rmtree(target_folder)
+        with Profiler.phase("zip"):
+            shutil.make_archive(target_file_path, "zip", target_folder)
+            shutil.rmtree(target_folder)
         print("Zipped " + str(filecount) + " SRT files into " + course_title + ".zip.")
     else:
         print(
@@ -146,6 +154,7 @@ def SrtRename(arguments) -> None:
     parser.add_argument("-z", action="store_true")
     parser.add_argument("-i", action="store")
     parser.add_argument("-o", action="store")
+    parser.add_argument("-profile", "--profile", action="store_true")
     parser.add_argument("file_names", nargs="*")
 
     args = parser.parse_args(arguments)
@@ -169,23 +178,36 @@ def SrtRename(arguments) -> None:
         if sys.argv[0] in f:
             file_names.remove(f)
 
-    for name in file_names:
-
-        # If it's just a file...
-        if os.path.isfile(name):
-            # We dont' run on files, we run on course folders.
-            sys.exit(instructions)
-
-        # If it's a directory...
-        if os.path.isdir(name):
-            # Get the concordance for this course.
-            nameDict, course_title = getOriginalNames(os.path.abspath(name), args)
-
-            # Go into the static folder and rename the files.
-            assert os.path.exists(
-                os.path.join(name, "static")
-            ), "No static folder found."
-            setNewNames(name, nameDict, args, course_title)
+    new_profile = args.profile and Profiler.start("SrtRename")
+
+    try:
+        for name in file_names:
+
+            # If it's just a file...
+            if os.path.isfile(name):
+                # We dont' run on files, we run on course folders.
+                sys.exit(instructions)
+
+            # If it's a directory...
+            if os.path.isdir(name):
+                # Get the concordance for this course.
+                with Profiler.phase("read sheet"):
+                    nameDict, course_title = getOriginalNames(
+                        os.path.abspath(name), args
+                    )
+
+                # Go into the static folder and rename the files.
+                assert os.path.exists(
+                    os.path.join(name, "static")
+                ), "No static folder found."
+                setNewNames(name, nameDict, args, course_title)
+                Profiler.count("transcripts in sheet", len(nameDict))
+
+        if new_profile:
+            Profiler.finish(name if os.path.isdir(name) else ".")
+    finally:
+        if new_profile:
+            Profiler.stop()
 
 
 if __name__ == "__main__":
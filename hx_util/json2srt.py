@@ -1,86 +1,313 @@
+import io
 import os
 import sys
 import glob
 import html
 import json
 import argparse
+import itertools
+import contextlib
 from typing import Union
+from concurrent.futures import ProcessPoolExecutor
+
+from hx_util import Profiler
+from hx_util.ParseCache import ParseCache
 
 instructions = """
 To use:
 python3 sjson2srt.py file_or_directory (options)
 
-Creates a new .srt file for every .srt.sjson file found.
+Creates a new .srt file for every .srt.sjson file found,
+or whichever other formats you ask for with -formats.
 If it's a new-style export and there are no .sjson files, move on gracefully.
 
 Valid options:
   -o Overwrite. Deletes the .srt.sjson file after it has been converted.
   -r Recursive. Works on .srt.sjson files in subdirectories as well.
+  -j N Converts N files at once, in separate processes.
+  -u Update. Skips .srt.sjson files that haven't changed since their output
+     files were made. Remembers what it converted in .json2srt_cache.json
+     in the first folder (or next to the first file).
+  -width N Splits captions longer than N characters (default 44)
+           into lines of about the same length.
+  -lines N The most lines to split a caption into (default 2).
+           Use -lines 1 to keep every caption on one line.
+  -formats A,B Which files to make, comma-separated. Default is srt.
+               srt:  SubRip captions (name.srt)
+               vtt:  WebVTT captions (name.vtt)
+               txt:  Plain text, one caption per line (name.txt)
+               json: List of captions with times in ms (name.cues.json)
   -h Help. Print this message.
+  --profile Times the run and lists the slowest files. Prints a report and
+            saves it as json2srt_profile.json in the first folder, if any.
 
 Last update: September 26th 2018
 """
 
 
+# Where -u remembers what it converted, in the first folder.
+# Make_Course_Sheet -cache has its own file.
+srt_cache_filename = ".json2srt_cache.json"
+
+
 # Split long lines on a space near the middle.
 def splitString(line: str) -> tuple[str, str]:
+    return tuple(balanceLines(line, 2))
+
+
+def balanceLines(line: str, count: int) -> list[str]:
+    """
+    Splits a line into about equal-length lines at spaces.
+    Each break goes on the space nearest where it would be if all the lines
+    were the same length, or the first of two that are equally near.
+    Takes one pass through the line, however many lines and words there are.
+
+    Args:
+        line (str): The text to split.
+        count (int): How many lines we want. We get fewer if there aren't enough spaces.
+
+    Returns:
+        list: The lines, without the spaces we broke on.
+    """
+    # The locations of each space are the running total of the word lengths.
+    spaces = [i for i, x in enumerate(line) if x == " "]
+    count = min(count, len(spaces) + 1)
+
+    lines = []
+    start = 0
+    candidate = 0
+    for n in range(1, count):
+        # The ideal break is at n * (len + 1) / count - 1.
+        # Multiply through by count to stay in whole numbers.
+        target = n * (len(line) + 1) - count
+        # Leave a space for each of the breaks after this one.
+        last = len(spaces) - (count - n)
+        while candidate < last and abs(spaces[candidate + 1] * count - target) < abs(
+            spaces[candidate] * count - target
+        ):
+            candidate += 1
+        lines.append(line[start : spaces[candidate]])
+        start = spaces[candidate] + 1
+        candidate += 1
+    lines.append(line[start:])
+    return lines
+
+
+def wrapCaption(text: str, width: int = 44, max_lines: int = 2) -> list[str]:
+    """
+    Splits a caption into balanced lines if it's longer than width.
+
+    Args:
+        text (str): The caption.
+        width (int): The longest we'd like a line to be.
+        max_lines (int): The most lines to split it into. Lines can be longer than width if we hit this.
+
+    Returns:
+        list: The lines.
+    """
+    if len(text) <= width or max_lines <= 1 or text.find(" ") == -1:
+        return [text]
+    # Round up, and always at least two.
+    count = max(2, min(max_lines, -(-len(text) // width)))
+    return balanceLines(text, count)
 
-    words = line.split(" ")
 
-    # Get the locations of each space in the line
-    indices = [i for i, x in enumerate(line) if x == " "]
+def msecToHMS(time: Union[int, float]) -> str:
+    # Make sure it's an integer.
+    if type(time) is not int:
+        time = int(float(time))
 
-    # Get the difference in line length for each choice of break.
-    diffs = []
-    for index, word in enumerate(words):
-        lineA = " ".join(words[:index])
-        lineB = " ".join(words[index:])
-        diffs.append(abs(len(lineA) - len(lineB)))
+    # Downconvert through hours. SRTs don't handle days.
+    seconds, msec = divmod(time % 86400000, 1000)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
 
-    # Break the line on the location of the lowest difference between line lengths.
-    breakpoint = indices[diffs.index(min(diffs)) - 1]
+    return "%02d:%02d:%02d,%03d" % (hours, minutes, seconds, msec)
 
-    return line[:breakpoint], line[breakpoint + 1 :]
 
+def readCues(jdata: dict) -> list[tuple[int, int, str]]:
+    """
+    Gets the captions from a loaded .srt.sjson file.
 
-def msecToHMS(time: Union[int, float]) -> str:
-    # Make sure it's an integer.
-    time = int(float(time))
+    Args:
+        jdata (dict): The sjson, with "start", "end", and "text" lists.
 
-    # Downconvert through hours. SRTs don't handle days.
-    msec = time % 1000
-    time -= msec
-    seconds = (time // 1000) % 60
-    time -= seconds * 1000
-    minutes = (time // 60 // 1000) % 60
-    time -= minutes * 60 * 1000
-    hours = (time // 1000 // 3600) % 24
-
-    # Make sure we get enough zeroes.
-    if int(msec) == 0:
-        msec = "000"
-    elif int(msec) < 10:
-        msec = "00" + str(msec)
-    elif int(msec) < 100:
-        msec = "0" + str(msec)
-    if int(seconds) == 0:
-        seconds = "00"
-    elif int(seconds) < 10:
-        seconds = "0" + str(seconds)
-    if int(minutes) == 0:
-        minutes = "00"
-    elif int(minutes) < 10:
-        minutes = "0" + str(minutes)
-    if int(hours) == 0:
-        hours = "00"
-    elif int(hours) < 10:
-        hours = "0" + str(hours)
-
-    # Send back a string
-    return str(hours) + ":" + str(minutes) + ":" + str(seconds) + "," + str(msec)
-
-
-def ConvertToSRT(filename: str, args: argparse.Namespace, dirpath: str = "") -> None:
+    Returns:
+        list: (start, end, text) for each caption, with times in milliseconds.
+
+    Raises:
+        KeyError: If the start, end, or text list is missing.
+    """
+    # Get the start time, end time, and text as individual lists.
+    startList = jdata["start"]
+    endList = jdata["end"]
+    textList = jdata["text"]
+
+    Profiler.count("captions", len(textList))
+
+    cues = []
+    for i, text in enumerate(textList):
+        # Throw out any null entries.
+        # EdX escapes HTML entities like quotes and unicode in sjson files. Unescape them.
+        # Our output formats handle unicode just fine.
+        text = html.unescape(text) if type(text) is str else ""
+        start = startList[i]
+        end = endList[i]
+        cues.append(
+            (
+                start if type(start) is int else int(float(start)),
+                end if type(end) is int else int(float(end)),
+                text,
+            )
+        )
+    return cues
+
+
+def srtText(cues: list, wrapped: list) -> str:
+    """Makes an .srt file. Captions are numbered from 0, like we always have."""
+    return "".join(
+        [
+            "%d\n%s --> %s\n%s\n\n"
+            % (i, msecToHMS(start), msecToHMS(end), "\n".join(lines))
+            for i, ((start, end, text), lines) in enumerate(zip(cues, wrapped))
+        ]
+    )
+
+
+def vttText(cues: list, wrapped: list) -> str:
+    """Makes a WebVTT file. Caption text is escaped, because VTT treats < and & as markup."""
+    return "WEBVTT\n\n" + "".join(
+        [
+            "%s --> %s\n%s\n\n"
+            % (
+                msecToHMS(start).replace(",", "."),
+                msecToHMS(end).replace(",", "."),
+                html.escape("\n".join(lines), quote=False),
+            )
+            for (start, end, text), lines in zip(cues, wrapped)
+        ]
+    )
+
+
+def txtText(cues: list, wrapped: list) -> str:
+    """Makes a plain text transcript, one caption per line, without the times."""
+    return "".join([text + "\n" for start, end, text in cues if text])
+
+
+def jsonText(cues: list, wrapped: list) -> str:
+    """Makes a json list of captions, each with start and end times in milliseconds."""
+    return (
+        json.dumps(
+            [{"start": start, "end": end, "text": text} for start, end, text in cues],
+            ensure_ascii=False,
+            indent=4,
+        )
+        + "\n"
+    )
+
+
+# Output formats for -formats: the file extension and the function that writes it.
+# The functions take the cues from readCues and the wrapped lines of each caption.
+output_formats = {
+    "srt": (".srt", srtText),
+    "vtt": (".vtt", vttText),
+    "txt": (".txt", txtText),
+    "json": (".cues.json", jsonText),
+}
+
+
+def sjsonToFormats(
+    jdata: dict, formats: list[str], width: int = 44, max_lines: int = 2
+) -> dict:
+    """
+    Makes the text of each output format from a loaded .srt.sjson file.
+    The sjson only gets read and unescaped once, however many formats there are.
+
+    Args:
+        jdata (dict): The sjson, with "start", "end", and "text" lists.
+        formats (list): Keys of output_formats, like ["srt", "vtt"].
+        width (int): Captions longer than this get split into lines.
+        max_lines (int): The most lines to split a caption into.
+
+    Returns:
+        dict: The text of each file, by format.
+
+    Raises:
+        KeyError: If the start, end, or text list is missing.
+    """
+    cues = readCues(jdata)
+    wrapped = None
+    if "srt" in formats or "vtt" in formats:
+        # Short lines and ones without a space stay whole. Break up the others.
+        wrapped = [wrapCaption(text, width, max_lines) for start, end, text in cues]
+        Profiler.count("lines split", sum(len(lines) > 1 for lines in wrapped))
+    return {
+        output_format: output_formats[output_format][1](cues, wrapped)
+        for output_format in formats
+    }
+
+
+def sjsonToSRT(jdata: dict, width: int = 44, max_lines: int = 2) -> str:
+    """
+    Makes the text of an .srt file from a loaded .srt.sjson file.
+
+    Args:
+        jdata (dict): The sjson, with "start", "end", and "text" lists.
+        width (int): Captions longer than this get split into lines.
+        max_lines (int): The most lines to split a caption into.
+
+    Returns:
+        str: The SRT file's text.
+
+    Raises:
+        KeyError: If the start, end, or text list is missing.
+    """
+    return sjsonToFormats(jdata, ["srt"], width, max_lines)["srt"]
+
+
+def convertSJSON(
+    data: Union[bytes, str],
+    width: int = 44,
+    max_lines: int = 2,
+    output_format: str = "srt",
+) -> bytes:
+    """
+    Turns the contents of an .srt.sjson file into the contents of an .srt file
+    (or another format), for code that wants to zip it or send it somewhere
+    instead of saving it.
+
+    Args:
+        data (bytes): The .srt.sjson file's contents.
+        width (int): Captions longer than this get split into lines.
+        max_lines (int): The most lines to split a caption into.
+        output_format (str): srt, vtt, txt, or json.
+
+    Returns:
+        bytes: The file, in UTF-8.
+
+    Raises:
+        ValueError: If it isn't valid JSON.
+        KeyError: If the start, end, or text list is missing.
+    """
+    texts = sjsonToFormats(json.loads(data), [output_format], width, max_lines)
+    return texts[output_format].encode("utf8")
+
+
+def outputFileName(filename: str, output_format: str = "srt") -> str:
+    """Gets the name of the file we make from an .srt.sjson file, like the .srt file."""
+    newFileName = filename.replace(".srt", "")
+    newFileName = newFileName.replace(".sjson", "")
+    return newFileName + output_formats[output_format][0]
+
+
+def ConvertToSRT(filename: str, args: argparse.Namespace, dirpath: str = "") -> bool:
+    """
+    Writes an .srt file next to an .srt.sjson file,
+    along with any other formats we asked for with -formats.
+
+    Returns:
+        bool: True if we wrote the files, False if we skipped them.
+    """
     # Open the SJSON file
     with open(os.path.join(dirpath or "", filename), "r", encoding="utf8") as inputfile:
         # Read in the JSON as a dictionary.
@@ -88,51 +315,93 @@ def ConvertToSRT(filename: str, args: argparse.Namespace, dirpath: str = "") ->
             jdata = json.load(inputfile)
         except json.JSONDecodeError:
             print("Skipping " + filename + ": possible invalid JSON")
-            return
-
-        # Get the start time, end time, and text as individual lists.
-        try:
-            startList = jdata["start"]
-            endList = jdata["end"]
-            textList = jdata["text"]
-        except KeyError:
-            print("Skipping " + filename + ": file is missing needed data.")
-            return
+            return False
 
-        # Convert all the times to strings of format H:M:S,ms
-        newStartList = [msecToHMS(time) for time in startList]
-        newEndList = [msecToHMS(time) for time in endList]
-
-        # Throw out any null entries.
-        textWithoutNull = [x if type(x) is type("string") else "" for x in textList]
-        # EdX escapes HTML entities like quotes and unicode in sjson files. Unescape them.
-        # SRT files handle unicode just fine.
-        newTextList = [html.unescape(text) for text in textWithoutNull]
+    try:
+        texts = sjsonToFormats(jdata, args.formats, args.width, args.lines)
+    except KeyError:
+        print("Skipping " + filename + ": file is missing needed data.")
+        return False
 
-        # Create a file for output
-        newFileName = filename.replace(".srt", "")
-        newFileName = newFileName.replace(".sjson", "")
-        newFileName += ".srt"
+    # Create a file for each output, and write it all at once.
+    for output_format, text in texts.items():
         with open(
-            os.path.join(dirpath or "", newFileName), "w", encoding="utf8"
+            os.path.join(dirpath or "", outputFileName(filename, output_format)),
+            "w",
+            encoding="utf8",
         ) as outfile:
-            # Step through the lists and write rows of the output file.
-            for i, txt in enumerate(newTextList):
-                outfile.write(str(i) + "\n")
-                outfile.write(newStartList[i] + " --> " + newEndList[i] + "\n")
-                # If it's a short line or one without a space, output the whole thing.
-                if len(txt) < 45 or txt.find(" ") == -1:
-                    outfile.write(str(txt) + "\n")
-                # Otherwise, break it up.
-                else:
-                    lineA, lineB = splitString(txt)
-                    outfile.write(str(lineA) + "\n")
-                    outfile.write(str(lineB) + "\n")
-                outfile.write("\n")
+            outfile.write(text)
 
     # If the -o option is set, delete the original
     if args.o:
-        os.remove(filename)
+        os.remove(os.path.join(dirpath or "", filename))
+
+    return True
+
+
+def findSJSONFiles(file_names: list[str], recursive: bool) -> list[tuple[str, str]]:
+    """
+    Lists the .sjson files to convert, in the order we convert them.
+
+    Args:
+        file_names (list): Files and directories from the command line.
+        recursive (bool): Whether to look in subdirectories too.
+
+    Returns:
+        list: (directory, filename) for each file. Files named on the command line have a blank directory.
+    """
+    found = []
+    for name in file_names:
+        # Make sure single files exist.
+        assert os.path.exists(name), "File or directory not found."
+
+        # If it's just a file, make sure this is an sjson file (just check extension)
+        if os.path.isfile(name):
+            if name.lower().endswith(".sjson"):
+                found.append(("", name))
+
+        # If it's a directory:
+        if os.path.isdir(name):
+            for dirpath, dirnames, files in os.walk(name):
+                for eachfile in files:
+                    if eachfile.lower().endswith(".sjson"):
+                        found.append((dirpath, eachfile))
+                # Non-recursive version breaks os.walk after the first level.
+                if not recursive:
+                    break
+    return found
+
+
+def convertFile(
+    dirpath: str, filename: str, args: argparse.Namespace
+) -> tuple[bool, Union[str, None]]:
+    """
+    Converts one file for json2srt, and catches anything that goes wrong with it.
+
+    Returns:
+        tuple: Whether we wrote an .srt file, and an error message if it failed (None otherwise).
+    """
+    path = os.path.join(dirpath, filename)
+    try:
+        with Profiler.readingFile("sjson", path):
+            converted = ConvertToSRT(filename, args, dirpath)
+    except Exception as err:
+        return False, str(err) or repr(err)
+    return converted, None
+
+
+def convertFileWorker(
+    dirpath: str, filename: str, args: argparse.Namespace
+) -> tuple[bool, Union[str, None], str, Union[dict, None]]:
+    """
+    Runs convertFile in a worker process.
+    Also returns what it printed, so the main process can print it in order,
+    and the profile if we're profiling.
+    """
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        converted, error = convertFile(dirpath, filename, args)
+    return converted, error, output.getvalue(), Profiler.takeWorkerReport()
 
 
 # Main function:
@@ -145,9 +414,19 @@ def json2srt(args):
     parser.add_argument("--help", "-h", action="store_true")
     parser.add_argument("-o", action="store_true")
     parser.add_argument("-r", action="store_true")
+    parser.add_argument("-j", "-jobs", "--jobs", dest="j", type=int, default=1)
+    parser.add_argument("-u", "-update", dest="u", action="store_true")
+    parser.add_argument("-width", type=int, default=44)
+    parser.add_argument("-lines", type=int, default=2)
+    parser.add_argument("-formats", default="srt")
+    parser.add_argument("-profile", "--profile", action="store_true")
     parser.add_argument("file_names", nargs="*")
 
     args = parser.parse_args(args)
+    if args.width < 1:
+        parser.error("-width must be at least 1.")
+    if args.lines < 1:
+        parser.error("-lines must be at least 1.")
 
     # Replace arguments with wildcards with their expansion.
     # If a string does not contain a wildcard, glob will return it as is.
@@ -163,44 +442,126 @@ def json2srt(args):
     if args.help:
         sys.exit(instructions)
 
-    filecount = 0
-
-    for name in file_names:
-        dirpath = ""
-        # Make sure single files exist.
-        assert os.path.exists(name), "File or directory not found."
-
-        # If it's just a file...
-        if os.path.isfile(name):
-            # Make sure this is an sjson file (just check extension)
-            if name.lower().endswith(".sjson"):
-                # Convert it to an SRT file
-                ConvertToSRT(name, args, dirpath)
+    # Make them in a set order, so -u recognizes the same list of formats.
+    requested = [x.strip().lower() for x in args.formats.split(",")]
+    unknown = [x for x in requested if x not in output_formats]
+    if unknown:
+        sys.exit(
+            "Unknown formats: "
+            + ", ".join(unknown)
+            + ". Choose from "
+            + ", ".join(output_formats)
+            + "."
+        )
+    args.formats = [x for x in output_formats if x in requested]
+
+    new_profile = args.profile and Profiler.start("json2srt")
+    try:
+        filecount = 0
+        skipcount = 0
+        failures = []
+        folders = [name for name in file_names if os.path.isdir(name)]
+
+        sjson_files = findSJSONFiles(file_names, args.r)
+
+        # With -u, leave out files whose outputs we made last time,
+        # unless the file or any of its outputs have changed since.
+        # The splitting options and formats change the outputs, so we keep those too.
+        srt_cache = None
+        currentcount = 0
+        if args.u and sjson_files:
+            if folders:
+                cache_folder = folders[0]
+            else:
+                cache_folder = os.path.dirname(os.path.join(*sjson_files[0])) or "."
+            srt_cache = ParseCache(cache_folder, srt_cache_filename)
+            settings = "w%dl%d:%s" % (args.width, args.lines, ",".join(args.formats))
+            changed_files = []
+            for dirpath, filename in sjson_files:
+                if srt_cache.get("srt", os.path.join(dirpath, filename)) != settings:
+                    changed_files.append((dirpath, filename))
+                elif args.o:
+                    os.remove(os.path.join(dirpath, filename))
+            currentcount = len(sjson_files) - len(changed_files)
+            Profiler.count("srt up to date", currentcount)
+            sjson_files = changed_files
+
+        dirpaths = [dirpath for dirpath, filename in sjson_files]
+        filenames = [filename for dirpath, filename in sjson_files]
+
+        if args.j > 1 and len(sjson_files) > 1:
+            executor = ProcessPoolExecutor(
+                max_workers=args.j,
+                initializer=Profiler.startWorker,
+                initargs=(Profiler.active is not None,),
+            )
+            # Send files over in batches. Each one is quick.
+            results = executor.map(
+                convertFileWorker,
+                dirpaths,
+                filenames,
+                itertools.repeat(args),
+                chunksize=max(1, len(sjson_files) // (args.j * 8)),
+            )
+        else:
+            executor = None
+            results = (
+                convertFile(dirpath, filename, args) + ("", None)
+                for dirpath, filename in sjson_files
+            )
+
+        for dirpath, filename, (converted, error, output, profile) in zip(
+            dirpaths, filenames, results
+        ):
+            print(output, end="")
+            if profile is not None:
+                Profiler.active.merge(profile)
+            if error is not None:
+                print("Error converting " + filename + ": " + error)
+                failures.append((os.path.join(dirpath, filename), error))
+            elif converted:
                 filecount += 1
-
-        # If it's a directory:
-        if os.path.isdir(name):
-            # Recursive version using os.walk for all levels.
-            if args.r:
-                for dirpath, dirnames, files in os.walk(name):
-                    for eachfile in files:
-                        # Convert every file in that directory.
-                        if eachfile.lower().endswith(".sjson"):
-                            ConvertToSRT(eachfile, args, dirpath)
-                            filecount += 1
-            # Non-recursive version breaks os.walk after the first level.
+                if srt_cache is not None:
+                    srt_cache.put(
+                        "srt",
+                        os.path.join(dirpath, filename),
+                        settings,
+                        [
+                            os.path.join(
+                                dirpath, outputFileName(filename, output_format)
+                            )
+                            for output_format in args.formats
+                        ],
+                    )
             else:
-                topfiles = []
-                dirpath = ""
-                for dirpath, dirnames, files in os.walk(name):
-                    topfiles.extend(files)
-                    break
-                for eachfile in topfiles:
-                    if eachfile.lower().endswith(".sjson"):
-                        ConvertToSRT(eachfile, args, dirpath)
-                        filecount += 1
-
-    print("Converted " + str(filecount) + " SJSON files to SRT.")
+                skipcount += 1
+
+        if executor is not None:
+            executor.shutdown()
+        if srt_cache is not None:
+            srt_cache.save()
+
+        print(
+            "Converted "
+            + str(filecount)
+            + " SJSON files to "
+            + ", ".join(x.upper() for x in args.formats)
+            + "."
+        )
+        if currentcount:
+            print(str(currentcount) + " SJSON files were already up to date.")
+        if skipcount:
+            print("Skipped " + str(skipcount) + " files.")
+        if failures:
+            print("These files failed:")
+            for path, error in failures:
+                print("    " + path + ": " + error)
+
+        if new_profile:
+            Profiler.finish(folders[0] if folders else ".")
+    finally:
+        if new_profile:
+            Profiler.stop()
 
 
 if __name__ == "__main__":
@@ -5,38 +5,872 @@
 test_hx_util
 ----------------------------------
 
-Tests for `hx_util` module.
+Tests for `hx_util`, run on small made-up courses from MakeTestCourse.
 """
 
-import pytest
+import os
+import re
+import csv
+import json
+import time
+import random
+import multiprocessing
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
 
-from contextlib import contextmanager
-#from click.testing import CliRunner
+import pytest
 
-from hx_util import hx_util
+from hx_util import Make_Course_Sheet
+from hx_util import json2srt
+from hx_util import SrtRename
+from hx_util import Benchmark
+from hx_util import Profiler
+from hx_util import HXLiveTools
+from hx_util import MakeTestCourse
+from hx_util import LinkExtraction
+from hx_util import ParseCache
+from hx_util.ParseCache import DocumentCache
+from hx_util.CourseSource import CourseFolder
 
 
 @pytest.fixture
-def response():
-    """Sample pytest fixture.
-    See more at: http://doc.pytest.org/en/latest/fixture.html
-    """
-    # import requests
-    # return requests.get('https://github.com/audreyr/cookiecutter-pypackage')
+def course(tmp_path):
+    """A small test course. Returns the course folder and what's in it."""
+    folder = str(tmp_path / "course")
+    counts = MakeTestCourse.makeTestCourse(
+        folder, chapters=2, sequentials=2, verticals=2, components=3, seed=1
+    )
+    return folder, counts
+
+
+def readSheet(path):
+    with open(path, encoding="utf8", newline="") as sheet:
+        return list(csv.DictReader(sheet, delimiter="\t"))
+
+
+def test_make_test_course_is_repeatable(tmp_path):
+    first = MakeTestCourse.makeTestCourse(str(tmp_path / "a"), seed=5)
+    second = MakeTestCourse.makeTestCourse(str(tmp_path / "b"), seed=5)
+    assert first == second
+    assert first["chapter"] == 4
+    assert first["vertical"] == 4 * 3 * 3
+    assert first["transcript"] == first["video"] * 2
+    for dirpath, dirnames, filenames in os.walk(tmp_path / "a"):
+        for filename in filenames:
+            path_a = os.path.join(dirpath, filename)
+            path_b = path_a.replace(str(tmp_path / "a"), str(tmp_path / "b"), 1)
+            with open(path_a, "rb") as a, open(path_b, "rb") as b:
+                assert a.read() == b.read()
+
+
+def test_video_sheet(course):
+    folder, counts = course
+    Make_Course_Sheet.Make_Course_Sheet([folder, "-o", "videos.tsv"])
+    rows = readSheet(os.path.join(folder, "videos.tsv"))
+    videos = [row for row in rows if row["type"] == "video"]
+    # One row for each transcript.
+    assert len(videos) == counts["transcript"]
+    assert len({row["component"] for row in videos}) == counts["video"]
+    assert all(row["upload_name"].startswith("Lecture_") for row in videos)
+    assert os.path.exists(os.path.join(folder, "course.json"))
+
+
+def test_run_on_course_xml_inside_course(course, monkeypatch):
+    folder, counts = course
+    Make_Course_Sheet.Make_Course_Sheet([folder, "-all", "-o", "outside.tsv"])
+    monkeypatch.chdir(folder)
+    Make_Course_Sheet.Make_Course_Sheet(["course.xml", "-all", "-o", "inside.tsv"])
+    assert readSheet("inside.tsv") == readSheet("outside.tsv")
+    assert len(list(Make_Course_Sheet.loadCourse("course.xml").videos())) == (
+        counts["video"]
+    )
+
+
+def test_only_needed_details(course):
+    folder, counts = course
+    course_json = os.path.join(folder, "course.json")
+    Make_Course_Sheet.Make_Course_Sheet([folder, "-o", "videos.tsv"])
+    with open(course_json, encoding="utf8") as f:
+        assert "inner_xml" not in f.read()
+    Make_Course_Sheet.Make_Course_Sheet([folder, "-problems", "-o", "problems.tsv"])
+    with open(course_json, encoding="utf8") as f:
+        assert "inner_xml" in f.read()
+    rows = readSheet(os.path.join(folder, "problems.tsv"))
+    assert all(row["inner_xml"] for row in rows if row["type"] == "problem")
+
+    video_args = Make_Course_Sheet.parseArguments([folder])[0]
+    assert Make_Course_Sheet.neededExtractors(video_args) == ("video",)
+
+
+def test_links_sheet(course):
+    folder, counts = course
+    Make_Course_Sheet.Make_Course_Sheet([folder, "-links", "-o", "links.tsv"])
+    rows = readSheet(os.path.join(folder, "links.tsv"))
+    hrefs = [row["href"] for row in rows]
+    assert any(href.startswith("https://example.com/reading/") for href in hrefs)
+    assert any(href.startswith("https://example.org/problems/") for href in hrefs)
+    # Links from the Word, Excel, PowerPoint and PDF files in /static/.
+    assert {row["type"] for row in rows} >= {"docx", "xlsx", "pptx", "pdf"}
+
+
+@pytest.mark.skipif(
+    multiprocessing.get_start_method() != "fork",
+    reason="Workers need to see the patched reader.",
+)
+def test_document_jobs_and_timeout(course, monkeypatch):
+    folder, counts = course
+    Make_Course_Sheet.Make_Course_Sheet([folder, "-links", "-o", "serial.tsv"])
+    Make_Course_Sheet.Make_Course_Sheet(
+        [folder, "-links", "-docjobs", "2", "-o", "parallel.tsv"]
+    )
+    serial_rows = readSheet(os.path.join(folder, "serial.tsv"))
+    assert serial_rows == readSheet(os.path.join(folder, "parallel.tsv"))
+
+    def stuck(args):
+        time.sleep(60)
+
+    monkeypatch.setitem(Make_Course_Sheet.doc_link_readers, "pdf", stuck)
+    started = time.perf_counter()
+    Make_Course_Sheet.Make_Course_Sheet(
+        [folder, "-links", "-docjobs", "2", "-doctimeout", "1", "-o", "timeout.tsv"]
+    )
+    assert time.perf_counter() - started < 30
+    rows = readSheet(os.path.join(folder, "timeout.tsv"))
+    assert rows == [row for row in serial_rows if row["type"] != "pdf"]
+
+
+@pytest.mark.skipif(
+    multiprocessing.get_start_method() != "fork",
+    reason="Workers need to see the patched reader.",
+)
+def test_document_timeout_keeps_finished(tmp_path, monkeypatch):
+    log = str(tmp_path / "reads.txt")
+
+    def reader(args):
+        with open(log, "a") as f:
+            f.write(args[0] + "\n")
+        if args[0] == "slow":
+            time.sleep(60)
+        return [{"href": args[0], "text": ""}]
+
+    monkeypatch.setitem(Make_Course_Sheet.doc_link_readers, "test", reader)
+    documents = [("test", "slow")] + [("test", "quick%d" % i) for i in range(4)]
+    results = Make_Course_Sheet.readDocuments(documents, 2, 1)
+    assert results[0] is None
+    assert [links[0]["href"] for links in results[1:]] == [
+        "quick0",
+        "quick1",
+        "quick2",
+        "quick3",
+    ]
+    # The quick ones finished while we waited for the slow one, so none get read again.
+    with open(log) as f:
+        assert sorted(f.read().split()) == [
+            "quick0",
+            "quick1",
+            "quick2",
+            "quick3",
+            "slow",
+        ]
+
+
+def test_document_cache(tmp_path, monkeypatch):
+    # Two copies of each document, so the copies share cache entries.
+    folder = str(tmp_path / "course")
+    counts = MakeTestCourse.makeTestCourse(
+        folder, chapters=2, sequentials=2, verticals=2, documents=2, seed=1
+    )
+    cache_path = str(tmp_path / "documents.sqlite")
+    options = ["-links", "-doccache", cache_path]
+    Make_Course_Sheet.Make_Course_Sheet([folder, "-o", "first.tsv"] + options)
+
+    # A copy of the course with the same documents doesn't read any of them.
+    def unused(args):
+        raise AssertionError("Read " + args[0] + " again")
+
+    for extension in Make_Course_Sheet.doc_link_readers:
+        monkeypatch.setitem(Make_Course_Sheet.doc_link_readers, extension, unused)
+    copy = MakeTestCourse.makeTarball(folder)
+    Make_Course_Sheet.Make_Course_Sheet([copy, "-o", "second.tsv"] + options)
+    key = lambda row: list(row.values())
+    first_rows = readSheet(os.path.join(folder, "first.tsv"))
+    second_rows = readSheet(str(tmp_path / "second.tsv"))
+    assert sorted(first_rows, key=key) == sorted(second_rows, key=key)
+
+    # Each copy's links still carry its own filename.
+    first_links = documentLinks(os.path.join(folder, "course.json"))
+    second_links = documentLinks(str(tmp_path / "course.json"))
+    assert len(first_links) == counts["documents"]
+    assert second_links == first_links
+    for filename, links in second_links.items():
+        assert all(
+            link["filename"] == os.path.basename(filename)
+            for link in links
+            if "filename" in link
+        )
+
+    # Entries used longest ago go first.
+    cache = DocumentCache(str(tmp_path / "small.sqlite"), "1", max_mb=0.0002)
+    paths = []
+    for i in range(3):
+        paths.append(str(tmp_path / ("doc%d.pdf" % i)))
+        with open(paths[i], "w") as f:
+            f.write("document %d" % i)
+        cache.put(paths[i], "pdf", [{"href": "https://example.com/%d" % i}])
+        time.sleep(0.01)
+    assert cache.get(paths[0], "pdf") is not None
+    assert cache.evict() == 1
+    assert cache.get(paths[1], "pdf") is None
+    assert cache.get(paths[2], "pdf") is not None
+    cache.close()
+
+
+def documentLinks(course_json):
+    """The links from each Word, Excel, PowerPoint and PDF file in course.json."""
+    with open(course_json, encoding="utf8") as f:
+        nodes = [json.load(f)]
+    found = {}
+    while nodes:
+        node = nodes.pop()
+        if node["type"] in Make_Course_Sheet.doc_link_readers:
+            found[node["filename"]] = node["links"]
+        nodes.extend(node.get("contents") or [])
+    return found
+
+
+def putInDocumentCache(cache_path, doc_path):
+    """Uses a DocumentCache from another process."""
+    cache = DocumentCache(cache_path, "1")
+    if cache.get(doc_path, "pdf") is None:
+        cache.put(doc_path, "pdf", [{"href": "https://example.com/b"}])
+    cache.close()
+
+
+def test_document_cache_shared(tmp_path):
+    cache_path = str(tmp_path / "shared.sqlite")
+    docs = []
+    for name in ["a.pdf", "b.pdf"]:
+        docs.append(str(tmp_path / name))
+        with open(docs[-1], "w") as f:
+            f.write(name)
+
+    # One run has used the cache, but hasn't closed it yet.
+    cache = DocumentCache(cache_path, "1")
+    cache.put(docs[0], "pdf", [{"href": "https://example.com/a"}])
+    assert cache.get(docs[0], "pdf") is not None
+    assert cache.get(docs[1], "pdf") is None
+
+    # Another process can still read and write it.
+    other = multiprocessing.Process(
+        target=putInDocumentCache, args=(cache_path, docs[1])
+    )
+    other.start()
+    other.join(30)
+    if other.is_alive():
+        other.terminate()
+    assert other.exitcode == 0
+    assert cache.get(docs[1], "pdf") == [{"href": "https://example.com/b"}]
+    cache.close()
+
+
+@pytest.mark.parametrize("options", [["-all"], ["-links"]])
+def test_jobs_match(course, options):
+    folder, counts = course
+    outputs = []
+    for jobs in ["1", "2"]:
+        Make_Course_Sheet.Make_Course_Sheet(
+            [folder, "-jobs", jobs, "-o", "jobs.tsv"] + options
+        )
+        with open(os.path.join(folder, "jobs.tsv"), "rb") as sheet:
+            outputs.append(sheet.read())
+        with open(os.path.join(folder, "course.json"), "rb") as course_json:
+            outputs.append(course_json.read())
+    assert outputs[:2] == outputs[2:]
+
+
+def test_live_tools_options():
+    args = ["HXLiveTools.py", "course", "-jobs", "2", "-links", "-sqlite", "c.db"]
+    assert HXLiveTools.removeSheetOptions(args + ["--profile"]) == [
+        "HXLiveTools.py",
+        "course",
+        "--profile",
+    ]
+    # Every option Make_Course_Sheet takes gets handled.
+    parser = Make_Course_Sheet.makeArgumentParser()
+    for option in parser._option_string_actions:
+        assert (option in HXLiveTools.sheet_options) != (
+            option in HXLiveTools.shared_options
+        )
+
+
+@pytest.mark.parametrize("jobs", ["1", "2"])
+def test_batch(course, tmp_path, capsys, jobs):
+    folder, counts = course
+    os.mkdir(tmp_path / "broken")
+    with open(tmp_path / "broken" / "course.xml", "w") as f:
+        f.write("<course")
+    Make_Course_Sheet.Make_Course_Sheet([str(tmp_path), "-batch", "-jobs", jobs])
+    printed = capsys.readouterr().out
+    assert "Batch sheet created for 1 of 2 courses." in printed
+    assert str(tmp_path / "broken") in printed.split("These courses failed:")[1]
+
+    rows = readSheet(str(tmp_path / "All Courses.tsv"))
+    assert {row["course_id"] for row in rows} == {"HarvardX+HX1+2026_Fall"}
+    Make_Course_Sheet.Make_Course_Sheet([folder, "-o", "single.tsv"])
+    single = readSheet(os.path.join(folder, "single.tsv"))
+    assert [{k: v for k, v in row.items() if k != "course_id"} for row in rows] == (
+        single
+    )
+
+
+def test_profile(course):
+    folder, counts = course
+    # With workers, so their reports get merged in.
+    Make_Course_Sheet.Make_Course_Sheet([folder, "-all", "-jobs", "2", "--profile"])
+    with open(os.path.join(folder, "Make_Course_Sheet_profile.json")) as f:
+        report = json.load(f)
+    for phase in [
+        "read course",
+        "aux folders",
+        "course.json",
+        "flatten and write sheet",
+    ]:
+        assert phase in report["phases"]
+    assert report["files"]["video"]["files"] == counts["video"]
+
+    json2srt.json2srt([folder, "-r", "-j", "2", "--profile"])
+    with open(os.path.join(folder, "json2srt_profile.json")) as f:
+        report = json.load(f)
+    assert report["files"]["sjson"]["files"] == counts["transcript"]
+    assert report["counters"]["captions"] > 0
+
+    os.remove(os.path.join(folder, "Make_Course_Sheet_profile.json"))
+    Make_Course_Sheet.Make_Course_Sheet([folder, "-stream", "--profile"])
+    assert os.path.exists(os.path.join(folder, "Make_Course_Sheet_profile.json"))
+
+    # A run that fails doesn't leave its profile going for the next one.
+    with pytest.raises(OSError):
+        Make_Course_Sheet.Make_Course_Sheet(
+            [os.path.join(folder, "static"), "--profile"]
+        )
+    assert Profiler.active is None
+    with pytest.raises(OSError):
+        Make_Course_Sheet.Make_Course_Sheets(
+            [os.path.join(folder, "static"), "--profile"], [["-o", "x.tsv"]]
+        )
+    assert Profiler.active is None
+
+
+def test_sheets_from_one_read(course):
+    folder, counts = course
+    reports = [
+        ["-o", "video.tsv"],
+        ["-links", "-o", "links.tsv"],
+        ["-alttext", "-o", "images.tsv"],
+        ["-all", "-o", "full.tsv"],
+    ]
+    Make_Course_Sheet.Make_Course_Sheets([folder], reports)
+    together = []
+    for report in reports:
+        with open(os.path.join(folder, report[-1]), "rb") as sheet:
+            together.append(sheet.read())
+    assert all(len(sheet_bytes.splitlines()) > 1 for sheet_bytes in together)
+
+    for report, sheet_bytes in zip(reports, together):
+        Make_Course_Sheet.Make_Course_Sheet([folder] + report)
+        with open(os.path.join(folder, report[-1]), "rb") as sheet:
+            assert sheet.read() == sheet_bytes, report
+
+
+def test_files_read_once(course, capsys, monkeypatch):
+    folder, counts = course
+    # Use a component and a unit a second time.
+    sequential = os.path.join(folder, "sequential", "sequential0_0.xml")
+    vertical = os.path.join(folder, "vertical", "vertical0_0_1.xml")
+    for path, extra in [
+        (sequential, '<vertical url_name="vertical0_0_0"/>'),
+        (vertical, '<html url_name="html1"/>'),
+    ]:
+        with open(path, encoding="utf8") as f:
+            text = f.read()
+        with open(path, "w", encoding="utf8") as f:
+            f.write(text.replace("</", extra + "</", 1))
+    reads = []
+    for method in ["parseXML", "readText"]:
+        original = getattr(CourseFolder, method)
+        monkeypatch.setattr(
+            CourseFolder,
+            method,
+            lambda self, path, method=method, original=original: (
+                reads.append((method, path)) or original(self, path)
+            ),
+        )
+    for extension, reader in list(Make_Course_Sheet.doc_link_readers.items()):
+        monkeypatch.setitem(
+            Make_Course_Sheet.doc_link_readers,
+            extension,
+            lambda args, reader=reader: reads.append(("document", args[0]))
+            or reader(args),
+        )
+
+    Make_Course_Sheet.Make_Course_Sheets(
+        [folder],
+        [["-o", "a.tsv"], ["-links", "-o", "b.tsv"], ["-all", "-o", "c.tsv"]],
+    )
+    assert len(reads) > counts["vertical"]
+    assert [read for read in reads if reads.count(read) > 1] == []
+    assert any(kind == "document" for kind, path in reads)
+    assert "Parse memo: reused 0 " not in capsys.readouterr().out
+
+
+def test_parsers_and_tarball_match(course, tmp_path):
+    folder, counts = course
+    Make_Course_Sheet.Make_Course_Sheet([folder, "-all", "-links", "-o", "lxml.tsv"])
+    Make_Course_Sheet.Make_Course_Sheet(
+        [folder, "-all", "-links", "-parser", "soup", "-o", "soup.tsv"]
+    )
+    tar_path = MakeTestCourse.makeTarball(folder)
+    Make_Course_Sheet.Make_Course_Sheet(
+        [tar_path, "-all", "-links", "-o", str(tmp_path / "tar.tsv")]
+    )
+    lxml_rows = readSheet(os.path.join(folder, "lxml.tsv"))
+    assert lxml_rows == readSheet(os.path.join(folder, "soup.tsv"))
+    # Files in /static/ can come out of the tarball in a different order.
+    tar_rows = readSheet(str(tmp_path / "tar.tsv"))
+    key = lambda row: list(row.values())
+    assert sorted(lxml_rows, key=key) == sorted(tar_rows, key=key)
 
 
-def test_content(response):
-    """Sample pytest test function with the pytest fixture as an argument.
+# Markup that lxml and html.parser build different trees from.
+malformed_markup = [
+    '<a href="a">one<a href="b">two</a>',
+    '<p><p><a href="y">t<a name="n">&amp;',
+    '<a href="a">never closed <div>block</div>',
+    '<A HREF="c"><table><tr><td>cell</td></tr></table>',
+    '<a href="a"><li>item</a> after',
+    '</a><a href="a">stray end tag first</a>',
+    '<a href="a">x</a><a href="b">y',
+    '<a href="a"><p>one</p><p>two</p></a>',
+    '<a href="x"/>self-closed',
+    '<a href="a">&nosuch; &amp entity</a>',
+    '<textarea><a href="a">raw</a></textarea>',
+    '<a href="a" href="b">repeated</a>',
+]
+
+# Pieces that random fragments are made of.
+markup_pieces = (
+    [
+        '<a href="a">',
+        '<A HREF="c">',
+        '<a name="n">',
+        "</a>",
+        '<img src="x.png" alt="i">',
+        '<img src="y">',
+        '<iframe src="f"></iframe>',
+        "<!-- c -->",
+        "one",
+        " ",
+        "\n",
+        "&amp;",
+        "&",
+        "<br>",
+    ]
+    + ["<%s>" % tag for tag in ["p", "div", "table", "tr", "td", "li", "ul", "b"]]
+    + ["</%s>" % tag for tag in ["p", "div", "table", "td", "li", "ul", "b"]]
+    + ["<option>", "<select>", "<button>", "<h1>", "<pre>", "</pre>", "<nobr>"]
+)
+
+
+def test_lxml_matches_soup():
+    rng = random.Random(4)
+    fragments = malformed_markup + [
+        "".join(rng.choice(markup_pieces) for x in range(rng.randint(1, 12)))
+        for y in range(1000)
+    ]
+    for text in fragments:
+        for markup in ["html", "xml"]:
+            lxml_doc = LinkExtraction.parseMarkup(text, markup, "lxml")
+            soup_doc = LinkExtraction.parseMarkup(text, markup, "soup")
+            assert LinkExtraction.getLinks(lxml_doc) == LinkExtraction.getLinks(
+                soup_doc
+            ), text
+            assert LinkExtraction.getImages(lxml_doc) == LinkExtraction.getImages(
+                soup_doc
+            ), text
+
+
+@pytest.mark.parametrize(
+    "options",
+    [
+        ["-all"],
+        ["-links", "-json", "lines"],
+        ["-html", "-problems", "-json", "compact"],
+    ],
+)
+def test_stream_matches(tmp_path, options):
+    folder = str(tmp_path / "course")
+    MakeTestCourse.makeTestCourse(
+        folder, chapters=2, sequentials=2, verticals=2, components=3, inline=True
+    )
+    outputs = []
+    for stream in [[], ["-stream"]]:
+        Make_Course_Sheet.Make_Course_Sheet(
+            [folder, "-o", "sheet.tsv"] + options + stream
+        )
+        output = {}
+        for name in ["sheet.tsv", "course.json", "course.jsonl"]:
+            path = os.path.join(folder, name)
+            if os.path.exists(path):
+                with open(path, "rb") as f:
+                    output[name] = f.read()
+                os.remove(path)
+        outputs.append(output)
+    assert outputs[0] == outputs[1]
+
+
+def cachedSheet(folder, capsys):
+    """
+    Makes a full sheet with -cache, and checks it against one made without.
+    Returns the rows and how many files the cache reused and parsed.
     """
-    # from bs4 import BeautifulSoup
-    # assert 'GitHub' in BeautifulSoup(response.content).title.string
-
-
-#def test_command_line_interface():
-#    runner = CliRunner()
-#    result = runner.invoke(cli.main)
-#    assert result.exit_code == 0
-#    assert 'hx_util.cli.main' in result.output
-#    help_result = runner.invoke(cli.main, ['--help'])
-#    assert help_result.exit_code == 0
-#    assert '--help  Show this message and exit.' in help_result.output
+    capsys.readouterr()
+    Make_Course_Sheet.Make_Course_Sheet([folder, "-all", "-cache", "-o", "cached.tsv"])
+    counts = re.search(r"reused (\d+) files, parsed (\d+)", capsys.readouterr().out)
+    Make_Course_Sheet.Make_Course_Sheet([folder, "-all", "-o", "uncached.tsv"])
+    rows = readSheet(os.path.join(folder, "cached.tsv"))
+    assert rows == readSheet(os.path.join(folder, "uncached.tsv"))
+    return rows, int(counts.group(1)), int(counts.group(2))
+
+
+def test_parse_cache(course, capsys, monkeypatch):
+    folder, counts = course
+    rows, reused, parsed = cachedSheet(folder, capsys)
+    assert reused == 0
+    rows, reused, uncached = cachedSheet(folder, capsys)
+    assert reused == parsed - uncached
+
+    # Same size, new contents and timestamp.
+    video = os.path.join(folder, "video", "video2.xml")
+    with open(video, encoding="utf8") as f:
+        text = f.read()
+    with open(video, "w", encoding="utf8") as f:
+        f.write(text.replace('display_name="Video 2"', 'display_name="Video X"'))
+    rows, reused, parsed = cachedSheet(folder, capsys)
+    assert parsed == uncached + 1
+    assert "Video X" in [row["component"] for row in rows]
+
+    # New timestamp, same contents.
+    os.utime(video, (0, 0))
+    rows, reused, parsed = cachedSheet(folder, capsys)
+    assert parsed == uncached
+
+    # Removed and added files.
+    os.remove(os.path.join(folder, "html", "html1.xml"))
+    with open(os.path.join(folder, "video", "video99.xml"), "w") as f:
+        f.write('<video url_name="video99" display_name="Added video"/>')
+    vertical = os.path.join(folder, "vertical", "vertical0_0_0.xml")
+    with open(vertical, encoding="utf8") as f:
+        text = f.read()
+    with open(vertical, "w", encoding="utf8") as f:
+        f.write(text.replace("</vertical>", '<video url_name="video99"/></vertical>'))
+    rows, reused, parsed = cachedSheet(folder, capsys)
+    assert "Added video" in [row["component"] for row in rows]
+    assert "Text 1" not in [row["component"] for row in rows]
+
+    # A new cache version throws out the old entries.
+    monkeypatch.setattr(ParseCache, "cache_version", ParseCache.cache_version + 1)
+    rows, reused, parsed = cachedSheet(folder, capsys)
+    assert reused == 0
+
+
+def test_stream_cleans_up(course, tmp_path):
+    folder, counts = course
+    chapters = os.path.join(folder, "chapter")
+    with open(os.path.join(chapters, sorted(os.listdir(chapters))[-1]), "w") as f:
+        f.write("<chapter")
+    tarball = MakeTestCourse.makeTarball(folder)
+    options = ["-stream", "-links", "-doccache", str(tmp_path / "documents.sqlite")]
+    with pytest.raises(SyntaxError):
+        Make_Course_Sheet.Make_Course_Sheet([tarball] + options)
+    # The tarball's temporary folder and the document cache got closed.
+    assert type(Make_Course_Sheet.course_source) is CourseFolder
+    assert Make_Course_Sheet.document_cache is None
+
+
+def test_sqlite(course):
+    folder, counts = course
+    Make_Course_Sheet.Make_Course_Sheet([folder, "-o", "plain.tsv"])
+    for x in range(2):
+        Make_Course_Sheet.Make_Course_Sheet(
+            [folder, "-sqlite", "course.db", "-o", "sqlite.tsv"]
+        )
+    # The sheet only has what we asked for, even though the database has everything.
+    assert readSheet(os.path.join(folder, "plain.tsv")) == readSheet(
+        os.path.join(folder, "sqlite.tsv")
+    )
+
+    database = sqlite3.connect(os.path.join(folder, "course.db"))
+    # Running again replaces the course instead of adding it twice.
+    assert database.execute("SELECT COUNT(*) FROM courses").fetchone()[0] == 1
+    assert database.execute("SELECT COUNT(*) FROM videos").fetchone()[0] == (
+        counts["video"]
+    )
+    assert database.execute("SELECT COUNT(*) FROM transcripts").fetchone()[0] == (
+        counts["transcript"]
+    )
+    verticals = database.execute(
+        "SELECT DISTINCT vertical.url_name FROM links"
+        " JOIN nodes AS component ON links.node = component.id"
+        " JOIN nodes AS vertical ON component.parent = vertical.id"
+        " WHERE links.domain = 'example.com' AND vertical.type = 'vertical'"
+    ).fetchall()
+    assert verticals
+    database.close()
+
+    # Files in tabs, info and static get one node, with their links and images,
+    # whether or not we stream the course.
+    Make_Course_Sheet.Make_Course_Sheet(
+        [folder, "-stream", "-sqlite", "stream.db", "-o", "stream.tsv"]
+    )
+    for name in ["course.db", "stream.db"]:
+        database = sqlite3.connect(os.path.join(folder, name))
+        assert not database.execute(
+            "SELECT type, filename FROM nodes WHERE filename != ''"
+            " GROUP BY type, filename HAVING COUNT(*) > 1"
+        ).fetchall()
+        syllabus = "SELECT id FROM nodes WHERE filename = 'tabs/syllabus.html'"
+        for table in ["links", "images"]:
+            assert database.execute(
+                "SELECT COUNT(*) FROM %s WHERE node IN (%s)" % (table, syllabus)
+            ).fetchone()[0]
+        database.close()
+
+
+def test_course_model(course):
+    folder, counts = course
+    model = Make_Course_Sheet.loadCourse(folder)
+    assert model.name == "Test Course 1"
+    # Split tests have verticals too.
+    units = [
+        node
+        for node in model.ofType("vertical")
+        if model.parentOf(node).type == "sequential"
+    ]
+    assert len(units) == counts["vertical"]
+    assert len(list(model.videos())) == counts["video"]
+
+    video = model.ofType("video")[0]
+    assert model.get(video.url) is video
+    assert model.videosById(video.extra["edx_video_id"]) == [video]
+    vertical = model.parentOf(video)
+    assert vertical.type == "vertical"
+    assert video in model.childrenOf(vertical.url)
+    assert model.parentOf(model.parentOf(vertical)).type == "chapter"
+
+    hrefs = [link["href"] for node, link in model.links()]
+    assert any(href.startswith("https://example.com/reading/") for href in hrefs)
+    assert all("alt" in image for node, image in model.images())
+    # Files with both links and images only show up once.
+    aux_files = [
+        node.filename for folder in model.auxFolders() for node in folder.contents
+    ]
+    assert len(aux_files) == len(set(aux_files))
+    assert any(node.links and node.images for node in model.ofType("html"))
+
+    with pytest.raises(FileNotFoundError):
+        Make_Course_Sheet.loadCourse(os.path.join(folder, "static"))
+
+    # Reads from different threads take turns.
+    with ThreadPoolExecutor(2) as pool:
+        models = list(pool.map(Make_Course_Sheet.loadCourse, [folder, folder]))
+    assert [len(model.ofType("video")) for model in models] == [counts["video"]] * 2
+
+
+def test_json2srt(course):
+    folder, counts = course
+    json2srt.json2srt([folder, "-r"])
+    static = os.path.join(folder, "static")
+    srts = [f for f in os.listdir(static) if f.endswith(".srt")]
+    assert len(srts) == counts["transcript"]
+
+    with open(os.path.join(static, sorted(srts)[0]), encoding="utf8") as srt:
+        text = srt.read()
+    assert text.startswith("0\n00:00:00,000 --> ")
+    # Entities get unescaped.
+    assert "&quot;" not in text
+
+
+def test_json2srt_update(course, capsys):
+    folder, counts = course
+    static = os.path.join(folder, "static")
+    json2srt.json2srt([folder, "-r", "-u"])
+    assert "Converted %d SJSON" % counts["transcript"] in capsys.readouterr().out
+
+    json2srt.json2srt([folder, "-r", "-u"])
+    printed = capsys.readouterr().out
+    assert "Converted 0 SJSON" in printed
+    assert "%d SJSON files were already up to date" % counts["transcript"] in printed
+
+    # A missing .srt gets made again. A new timestamp on the same contents doesn't count as a change.
+    sjsons = sorted(f for f in os.listdir(static) if f.endswith(".sjson"))
+    os.remove(os.path.join(static, json2srt.outputFileName(sjsons[0])))
+    os.utime(os.path.join(static, sjsons[1]), (0, 0))
+    json2srt.json2srt([folder, "-r", "-u"])
+    assert "Converted 1 SJSON" in capsys.readouterr().out
+
+    # Different line splitting makes different files.
+    json2srt.json2srt([folder, "-r", "-u", "-width", "20"])
+    assert "Converted %d SJSON" % counts["transcript"] in capsys.readouterr().out
+
+    # json2srt keeps its own cache file, with one entry for each transcript.
+    cache_path = os.path.join(folder, json2srt.srt_cache_filename)
+    assert not os.path.exists(os.path.join(folder, ".hx_util_cache.json"))
+    with open(cache_path) as f:
+        assert len(json.load(f)["entries"]) == counts["transcript"]
+
+    # Transcripts that are gone get dropped from it.
+    os.remove(os.path.join(static, sjsons[0]))
+    json2srt.json2srt([folder, "-r", "-u", "-width", "30"])
+    with open(cache_path) as f:
+        assert len(json.load(f)["entries"]) == counts["transcript"] - 1
+
+
+def test_json2srt_update_one_file(course, tmp_path, monkeypatch):
+    folder, counts = course
+    static = os.path.join(folder, "static")
+    sjson = sorted(f for f in os.listdir(static) if f.endswith(".sjson"))[0]
+    monkeypatch.chdir(tmp_path)
+    json2srt.json2srt([os.path.join(static, sjson), "-u"])
+    # The cache goes next to the file, not wherever we ran from.
+    assert os.path.exists(os.path.join(static, json2srt.srt_cache_filename))
+    assert not os.path.exists(tmp_path / json2srt.srt_cache_filename)
+
+
+def test_json2srt_formats(tmp_path, capsys):
+    data = {"start": [0, 1500], "end": [1500, 3000], "text": ["a &lt; b", None]}
+    with open(tmp_path / "intro.srt.sjson", "w") as f:
+        json.dump(data, f)
+    json2srt.json2srt([str(tmp_path), "-formats", "txt,vtt,json", "-j", "2"])
+    assert "to VTT, TXT, JSON." in capsys.readouterr().out
+    assert not (tmp_path / "intro.srt").exists()
+
+    assert (tmp_path / "intro.vtt").read_text(encoding="utf8") == (
+        "WEBVTT\n\n00:00:00.000 --> 00:00:01.500\na &lt; b\n\n"
+        "00:00:01.500 --> 00:00:03.000\n\n\n"
+    )
+    assert (tmp_path / "intro.txt").read_text(encoding="utf8") == "a < b\n"
+    with open(tmp_path / "intro.cues.json", encoding="utf8") as f:
+        assert json.load(f) == [
+            {"start": 0, "end": 1500, "text": "a < b"},
+            {"start": 1500, "end": 3000, "text": ""},
+        ]
+    assert json2srt.convertSJSON(json.dumps(data), output_format="txt") == b"a < b\n"
+
+
+def test_wrap_caption():
+    assert json2srt.splitString("aaa bb cc dddd") == ("aaa bb", "cc dddd")
+    # Ties go to the first space.
+    assert json2srt.splitString("aa bb") == ("aa", "bb")
+    text = "The quick brown fox jumps over the lazy dog and keeps on running far away"
+    assert json2srt.wrapCaption(text) == [
+        "The quick brown fox jumps over the",
+        "lazy dog and keeps on running far away",
+    ]
+    lines = json2srt.wrapCaption(text, width=20, max_lines=4)
+    assert len(lines) == 4 and " ".join(lines) == text
+    assert max(len(line) for line in lines) <= 20
+    assert json2srt.wrapCaption("short") == ["short"]
+    assert json2srt.wrapCaption(text, width=20, max_lines=1) == [text]
+
+
+def test_json2srt_one_line(course):
+    folder, counts = course
+    json2srt.json2srt([folder, "-r", "-lines", "1", "-width", "10"])
+    static = os.path.join(folder, "static")
+    for srt in [f for f in os.listdir(static) if f.endswith(".srt")]:
+        with open(os.path.join(static, srt), encoding="utf8") as f:
+            cues = f.read().split("\n\n")[:-1]
+        # Number, times, and one line of text.
+        assert all(len(cue.split("\n")) == 3 for cue in cues)
+
+
+@pytest.mark.parametrize(
+    "options", [["-width", "0"], ["-width", "-3"], ["-lines", "0"]]
+)
+def test_json2srt_bad_options(course, capsys, options):
+    folder, counts = course
+    with pytest.raises(SystemExit) as err:
+        json2srt.json2srt([folder, "-r"] + options)
+    assert err.value.code == 2
+    assert "must be at least 1" in capsys.readouterr().err
+    assert not any(
+        f.endswith(".srt") for f in os.listdir(os.path.join(folder, "static"))
+    )
+
+
+def test_srt_bytes():
+    assert json2srt.msecToHMS(3723004) == "01:02:03,004"
+    assert json2srt.msecToHMS("1500.7") == "00:00:01,500"
+    # Negative times wrap around the day, like they always have.
+    assert json2srt.msecToHMS(-5) == "23:59:59,995"
+    data = {"start": [0, 1500], "end": [1500, 3000], "text": ["caf&eacute;", None]}
+    assert json2srt.convertSJSON(json.dumps(data)) == (
+        "0\n00:00:00,000 --> 00:00:01,500\ncafé\n\n"
+        "1\n00:00:01,500 --> 00:00:03,000\n\n\n"
+    ).encode("utf8")
+    with pytest.raises(KeyError):
+        json2srt.convertSJSON(b'{"start": [], "end": []}')
+
+
+def test_json2srt_jobs(course, capsys):
+    folder, counts = course
+    static = os.path.join(folder, "static")
+    with open(os.path.join(static, "broken.srt.sjson"), "w") as f:
+        f.write("{not json")
+    # More text than start times, so converting it fails partway.
+    with open(os.path.join(static, "short.srt.sjson"), "w") as f:
+        json.dump({"start": [0], "end": [10], "text": ["one", "two"]}, f)
+
+    outputs = []
+    for jobs in [[], ["-j", "2"]]:
+        json2srt.json2srt([folder, "-r"] + jobs)
+        printed = capsys.readouterr().out
+        assert "Converted %d SJSON files" % counts["transcript"] in printed
+        assert "Skipping broken.srt.sjson" in printed
+        assert "short.srt.sjson" in printed.split("These files failed:")[1]
+        output = {}
+        for name in sorted(os.listdir(static)):
+            if name.endswith(".srt"):
+                with open(os.path.join(static, name), "rb") as srt:
+                    output[name] = srt.read()
+                os.remove(os.path.join(static, name))
+        outputs.append(output)
+    assert outputs[0] == outputs[1]
+
+
+def test_srt_rename(course, tmp_path):
+    folder, counts = course
+    Make_Course_Sheet.Make_Course_Sheet([folder, "-o", "videos.tsv"])
+    json2srt.json2srt([folder, "-r"])
+    SrtRename.SrtRename([folder, "-c", "-n", "-i", "videos.tsv"])
+    renamed = os.listdir(str(tmp_path / "Test Course 1_SRTs"))
+    assert len(renamed) == counts["transcript"]
+    assert all(name.startswith("Lecture_") for name in renamed)
+
+
+def test_benchmark(tmp_path):
+    results_path = str(tmp_path / "results.json")
+    Benchmark.Benchmark(
+        ["-size", "small", "-repeat", "1", "-o", results_path, "-cases", "sheet video"]
+    )
+    with open(results_path, encoding="utf8") as results_file:
+        results = json.load(results_file)
+    assert list(results["cases"]) == ["sheet video"]
+    assert results["cases"]["sheet video"]["min_seconds"] > 0
+
+    # Comparing a run with itself never finds anything slower.
+    assert Benchmark.compareResults(results, results, 1.0) == []
+    slower = dict(
+        results, cases={"sheet video": {"min_seconds": 0.0, "peak_memory_bytes": 1}}
+    )
+    assert Benchmark.compareResults(slower, results, 1.25) == ["sheet video"]